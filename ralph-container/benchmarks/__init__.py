@@ -0,0 +1,9 @@
+"""
+Benchmarks for Ralph.
+
+The suites drive `run_loop`, `run_react` and the agent's tools with a scripted chat model
+that answers instantly, so the numbers measure Ralph's own overhead (graph, tools,
+checkpointing, context management) rather than model latency. Run them with
+`python -m benchmarks.run`; results are compared against the JSON baselines in
+`benchmarks/baselines/`.
+"""
@@ -0,0 +1,124 @@
+"""
+Scripted chat model for the benchmarks.
+
+`ScriptedChatModel` answers with whatever its script returns for the conversation so far,
+without any network access, and records when each call started and ended (and, while
+`tracemalloc` is tracing, how much memory was allocated) so the suites can attribute the
+time between calls to Ralph. `WorkloadScript` is a deterministic script that exercises the
+agent's tools the way a coding session does: listing, searching, reading, editing and
+writing files, running commands and updating the PRD.
+"""
+
+import time
+import tracemalloc
+from typing import Any, Callable, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that replies with scripted messages.
+
+    Attributes:
+        script (Callable[[list[BaseMessage]], AIMessage]): Returns the reply to a conversation.
+        latency (float): Seconds to sleep per call, to simulate a model. Defaults to 0.
+        calls (list[tuple[float, float, int]]): (start, end, traced memory) of each call.
+    """
+
+    script: Callable[[list[BaseMessage]], AIMessage]
+    latency: float = 0.0
+    calls: list[tuple[float, float, int]] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        if self.latency:
+            time.sleep(self.latency)
+        message = self.script(messages)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(str(message.content)) // 4 + 10 * len(message.tool_calls),
+            "total_tokens": prompt_chars // 4 + len(str(message.content)) // 4,
+        }
+        self.calls.append((started, time.perf_counter(), memory))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        # The script decides which tools to call, so binding is a no-op
+        return self
+
+    def gaps(self) -> list[float]:
+        """
+        Return the seconds between the end of each call and the start of the next one.
+
+        Returns:
+            list[float]: The gaps, i.e. the time spent outside the model.
+        """
+        return [self.calls[i + 1][0] - self.calls[i][1] for i in range(len(self.calls) - 1)]
+
+
+class WorkloadScript:
+    """
+    Deterministic tool-calling script over a generated workspace.
+
+    Each reply calls one tool, cycling through a fixed sequence of actions. After `steps`
+    actions the script calls `done` (single-step loop) or answers without a tool call
+    (ReAct, where every iteration starts a new conversation).
+
+    Attributes:
+        files (list[str]): Workspace files the actions refer to.
+        steps (int): Number of actions before finishing.
+        finish_with_done (bool): Whether to finish by calling `done`.
+        thought_chars (int): Size of the text accompanying each tool call.
+    """
+
+    def __init__(self, files: list[str], steps: int, finish_with_done: bool = True, thought_chars: int = 400):
+        self.files = files
+        self.steps = steps
+        self.finish_with_done = finish_with_done
+        self.thought_chars = thought_chars
+
+    def _action(self, step: int) -> tuple[str, dict]:
+        path = self.files[step % len(self.files)]
+        others = [self.files[(step + k) % len(self.files)] for k in range(1, 4)]
+        actions = [
+            ("list_files", {"path": ".", "max_depth": 2}),
+            ("search_code", {"query": f"def helper_{step % 7}_", "max_results": 20}),
+            ("read_file", {"path": path}),
+            ("read_files", {"paths": others}),
+            ("edit_file", {"path": path, "edits": [{"search": "    return value + 0\n", "replace": f"    return value + 0  # step {step}\n"}]}),
+            ("write_file", {"path": f"notes/step_{step}.md", "content": f"# Step {step}\n\n" + "Progress notes. " * 20}),
+            ("run_command", {"command": f"echo step {step} && ls | head -5"}),
+            ("update_prd", {"story_title": f"Story {step}", "story_id": f"S{step % 10}", "priority": step % 5 + 1}),
+            ("next_story", {}),
+        ]
+        return actions[step % len(actions)]
+
+    @staticmethod
+    def _next_step(messages: list[BaseMessage]) -> int:
+        # Derived from the id of the last call rather than a message count, because the
+        # context manager may have evicted older turns
+        for message in reversed(messages):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                return int(message.tool_calls[-1]["id"].rsplit("-", 1)[1]) + 1
+        return 0
+
+    def __call__(self, messages: list[BaseMessage]) -> AIMessage:
+        step = self._next_step(messages)
+        thought = (f"Step {step}: checking the workspace and making progress. " * 20)[: self.thought_chars]
+        if step >= self.steps:
+            last = messages[-1]
+            if not self.finish_with_done or (isinstance(last, ToolMessage) and last.content == "RALPH_DONE"):
+                return AIMessage(content="Finished.")
+            return AIMessage(content=thought, tool_calls=[{"name": "done", "args": {}, "id": f"call-{step}"}])
+        name, args = self._action(step)
+        return AIMessage(content=thought, tool_calls=[{"name": name, "args": args, "id": f"call-{step}"}])
@@ -0,0 +1,167 @@
+"""
+Run the benchmark suites and compare them with a baseline.
+
+Usage:
+    python -m benchmarks.run [--profile quick|full] [--suite loop --suite tools ...] [--repeat 3]
+        [--output results.json] [--baseline FILE] [--tolerance 0.5] [--update-baseline]
+
+Each suite runs `--repeat` times and the best value of each measurement is kept, which
+filters out interference from other processes.
+Without `--baseline`, results are compared with `benchmarks/baselines/<profile>.json` if it
+exists. The command exits with status 1 if a measurement regressed by more than the
+tolerance. Baselines are machine-specific: refresh them with `--update-baseline` when the
+benchmark machine changes.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any
+
+import click
+
+from benchmarks.suites import PROFILES, SUITES
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Counts describing the workload rather than its cost
+_INFORMATIONAL = {"iterations", "model_calls"}
+
+# Cost changes smaller than this (in ms or KiB) are noise, whatever their relative size
+MIN_DELTA = 5.0
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """Flatten nested results to {"suite/tool/metric": value}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and key not in _INFORMATIONAL:
+            flat[name] = value
+    return flat
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    Measurements named `*_per_s` regress when they drop below `baseline * (1 - tolerance)`;
+    all others when they exceed `baseline * (1 + tolerance)` by at least `MIN_DELTA`.
+    Measurements missing from either side are ignored.
+
+    Args:
+        results (dict[str, Any]): The suite results of this run.
+        baseline (dict[str, Any]): The suite results of the baseline.
+        tolerance (float): Allowed relative change.
+
+    Returns:
+        list[str]: One line per regression.
+    """
+    current, expected = _flatten(results), _flatten(baseline)
+    regressions = []
+    for name, value in sorted(current.items()):
+        base = expected.get(name)
+        if not base:
+            continue
+        if name.endswith("_per_s"):
+            regressed = value < base * (1 - tolerance)
+        else:
+            regressed = value > base * (1 + tolerance) and value - base >= MIN_DELTA
+        if regressed:
+            regressions.append(f"{name}: {value} (baseline {base}, {value / base - 1:+.0%})")
+    return regressions
+
+
+def best_of(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Merge repeated results of a suite, keeping the best value of each measurement.
+
+    Args:
+        runs (list[dict[str, Any]]): The results of each repetition.
+
+    Returns:
+        dict[str, Any]: The highest `*_per_s` values and the lowest of the other measurements.
+    """
+    merged: dict[str, Any] = {}
+    for key, value in runs[0].items():
+        values = [run[key] for run in runs]
+        if isinstance(value, dict):
+            merged[key] = best_of(values)
+        elif key in _INFORMATIONAL or not isinstance(value, (int, float)):
+            merged[key] = value
+        else:
+            merged[key] = max(values) if key.endswith("_per_s") else min(values)
+    return merged
+
+
+def _print_results(results: dict[str, Any]):
+    """Print the results as one line per measurement group."""
+    for suite, values in results.items():
+        click.echo(f"[{suite}]")
+        rows = values.items() if all(isinstance(v, dict) for v in values.values()) else [("", values)]
+        for name, metrics in rows:
+            cells = "  ".join(f"{key}={value}" for key, value in metrics.items())
+            click.echo(f"  {name:<20}{cells}" if name else f"  {cells}")
+
+
+@click.command()
+@click.option("--profile", type=click.Choice(sorted(PROFILES)), default="quick", show_default=True, help="Workload sizes")
+@click.option("--suite", "suites", multiple=True, type=click.Choice(sorted(SUITES)), help="Suites to run (default: all)")
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True, help="Runs per suite; the best is kept")
+@click.option("--output", type=click.Path(dir_okay=False), help="Write the results to this JSON file")
+@click.option("--baseline", type=click.Path(dir_okay=False), help="Baseline to compare with (default: baselines/<profile>.json)")
+@click.option("--tolerance", type=float, default=0.5, show_default=True, help="Allowed relative regression")
+@click.option("--update-baseline", is_flag=True, help="Write the results as the new baseline")
+def main(profile: str, suites: tuple[str, ...], repeat: int, output: str | None, baseline: str | None, tolerance: float, update_baseline: bool):
+    """
+    Run Ralph's benchmarks against a scripted model.
+    """
+    sizes = PROFILES[profile]
+    results: dict[str, Any] = {}
+    for name in suites or SUITES:
+        started = time.perf_counter()
+        click.echo(f"Running {name} ({profile})...", err=True)
+        results[name] = best_of([SUITES[name](sizes) for _ in range(repeat)])
+        click.echo(f"  done in {time.perf_counter() - started:.1f}s", err=True)
+
+    document = {
+        "profile": profile,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    _print_results(results)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    baseline = baseline or os.path.join(BASELINE_DIR, f"{profile}.json")
+    if update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline)), exist_ok=True)
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+        click.echo(f"Baseline written to {baseline}")
+        return
+    if not os.path.exists(baseline):
+        click.echo(f"No baseline at {baseline}; run with --update-baseline to create one.")
+        return
+
+    with open(baseline, "r", encoding="utf-8") as f:
+        expected = json.load(f)["results"]
+    regressions = compare(results, expected, tolerance)
+    if regressions:
+        click.echo(f"Regressions against {baseline} (tolerance {tolerance:.0%}):")
+        for line in regressions:
+            click.echo(f"  {line}")
+        sys.exit(1)
+    click.echo(f"No regressions against {baseline}.")
+
+
+if __name__ == "__main__":
+    main()
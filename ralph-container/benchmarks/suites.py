@@ -0,0 +1,255 @@
+"""
+Benchmark suites.
+
+Each suite returns a dict of named measurements. Names ending in `_per_s` are
+throughputs (higher is better); every other measurement is a cost (lower is better).
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from benchmarks.fake_model import ScriptedChatModel, WorkloadScript
+from benchmarks.workspace import make_workspace
+from ralph.config import LangchainConfig, MetricsConfig, RalphConfig
+
+
+@dataclass(frozen=True)
+class Profile:
+    """
+    Sizes of one benchmark run.
+
+    Attributes:
+        workspace_files (int): Modules in the generated workspace.
+        loop_iterations (int): Iterations of `run_loop`; the history grows by two messages each.
+        react_iterations (int): Invocations of the ReAct agent.
+        react_steps (int): Tool calls per ReAct invocation.
+        tool_repeats (int): Timed calls per tool.
+    """
+    workspace_files: int
+    loop_iterations: int
+    react_iterations: int
+    react_steps: int
+    tool_repeats: int
+
+
+PROFILES = {
+    "quick": Profile(workspace_files=200, loop_iterations=12, react_iterations=3, react_steps=6, tool_repeats=20),
+    "full": Profile(workspace_files=2000, loop_iterations=60, react_iterations=10, react_steps=12, tool_repeats=100),
+}
+
+
+def bench_config() -> RalphConfig:
+    """
+    Return the configuration the suites run with.
+
+    Responses are whole messages (no streaming) and metrics files are disabled; the
+    context window is large enough that the loop history is not compacted.
+
+    Returns:
+        RalphConfig: The configuration.
+    """
+    return RalphConfig(
+        aiclient=LangchainConfig(model_provider="ollama", model="scripted", streaming=False, context_length=200000),
+        metrics=MetricsConfig(enabled=False),
+    )
+
+
+@contextlib.contextmanager
+def _quiet_in(directory: str):
+    """Silence the agent's console output and restore the working directory afterwards."""
+    cwd = os.getcwd()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+
+
+def _workspace(tmp: str, profile: Profile) -> tuple[str, list[str], str]:
+    """Create a workspace and an instruction file under `tmp`."""
+    workdir = os.path.join(tmp, "work")
+    files = make_workspace(workdir, profile.workspace_files)
+    instruction_file = os.path.join(tmp, "instructions.md")
+    with open(instruction_file, "w", encoding="utf-8") as f:
+        f.write("Refactor the helpers and keep notes of the progress.\n")
+    return workdir, files, instruction_file
+
+
+def _ms(seconds: list[float]) -> dict[str, float]:
+    """Summarise durations in milliseconds."""
+    ordered = sorted(seconds)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def _growth_kb(model: ScriptedChatModel) -> float:
+    """Average traced memory growth between consecutive model calls, in KiB."""
+    memory = [call[2] for call in model.calls]
+    if len(memory) < 2:
+        return 0.0
+    return round((memory[-1] - memory[0]) / (len(memory) - 1) / 1024, 3)
+
+
+def _run_traced(run: Callable[[ScriptedChatModel], Any], script: WorkloadScript) -> tuple[ScriptedChatModel, ScriptedChatModel, int]:
+    """Run a workload twice: once timed, once under tracemalloc. Return both models and the peak memory."""
+    timed = ScriptedChatModel(script=script)
+    run(timed)
+    traced = ScriptedChatModel(script=script)
+    tracemalloc.start()
+    try:
+        run(traced)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timed, traced, peak
+
+
+def bench_loop(profile: Profile) -> dict[str, Any]:
+    """
+    Drive `run_loop` through `loop_iterations` tool-calling iterations.
+
+    Returns:
+        dict[str, Any]: Overhead per iteration (time between model calls: graph, tools,
+            checkpointing and context management), memory growth per iteration and peak memory.
+    """
+    from ralph.graph import run_loop
+
+    config = bench_config()
+    script = WorkloadScript([], profile.loop_iterations - 1)
+    reports = []
+
+    def run(model: ScriptedChatModel):
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir, files, instruction_file = _workspace(tmp, profile)
+            script.files = files
+            with _quiet_in(workdir):
+                reports.append(run_loop(instruction_file, workdir, profile.loop_iterations, config, llm=model))
+
+    timed, traced, peak = _run_traced(run, script)
+    if not all(report.done for report in reports):
+        raise RuntimeError(f"run_loop did not finish: {[report.error for report in reports]}")
+    return {
+        "iterations": reports[0].iterations,
+        **{f"iteration_overhead_{k}": v for k, v in _ms(timed.gaps()).items()},
+        "memory_growth_kb_per_iteration": _growth_kb(traced),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_react(profile: Profile) -> dict[str, Any]:
+    """
+    Drive `run_react` for `react_iterations` invocations of `react_steps` tool calls each.
+
+    Returns:
+        dict[str, Any]: Overhead per step (time between model calls), memory growth per step and peak memory.
+    """
+    from ralph.react import run_react
+
+    config = bench_config()
+    script = WorkloadScript([], profile.react_steps, finish_with_done=False)
+
+    def run(model: ScriptedChatModel):
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir, files, instruction_file = _workspace(tmp, profile)
+            script.files = files
+            with _quiet_in(workdir):
+                run_react(instruction_file, workdir, profile.react_iterations, config, llm=model)
+
+    timed, traced, peak = _run_traced(run, script)
+    return {
+        "model_calls": len(timed.calls),
+        **{f"step_overhead_{k}": v for k, v in _ms(timed.gaps()).items()},
+        "memory_growth_kb_per_step": _growth_kb(traced),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def _tool_calls(files: list[str]) -> dict[str, Callable[[int], dict]]:
+    """Return, per tool, a function building the arguments of its n-th benchmark call."""
+    def edit(n: int) -> dict:
+        # Each round over the files edits a different function, so the search text always matches once
+        line = f"    return value + {1 + n // len(files) % 19}\n"
+        return {"path": files[n % len(files)], "edits": [{"search": line, "replace": line.rstrip() + "  # edited\n"}]}
+
+    def patch(n: int) -> dict:
+        # Each call patches a different module, below its docstring
+        path = files[(n + len(files) // 2) % len(files)]
+        module = os.path.basename(path)[len("module_"):-len(".py")]
+        diff = f'--- a/{path}\n+++ b/{path}\n@@ -1,2 +1,3 @@\n """Module {module}."""\n+# patched {n}\n import os\n'
+        return {"patch": diff}
+
+    return {
+        "list_files": lambda n: {"path": ".", "max_depth": 3},
+        "read_file": lambda n: {"path": files[n % len(files)]},
+        "read_files": lambda n: {"paths": [files[(n + k) % len(files)] for k in range(5)]},
+        "search_code": lambda n: {"query": f"def helper_{n % 50}_", "max_results": 50},
+        "write_file": lambda n: {"path": f"notes/file_{n}.md", "content": "notes\n" * 200},
+        "write_files": lambda n: {"files": [{"path": f"notes/batch_{n}_{k}.md", "content": "notes\n" * 50} for k in range(5)]},
+        "edit_file": edit,
+        "apply_patch": patch,
+        "run_command": lambda n: {"command": "echo ok"},
+        "update_prd": lambda n: {"story_title": f"Story {n}", "story_id": f"S{n % 50}", "priority": n % 5 + 1},
+        "update_stories": lambda n: {"story_ids": [f"S{k}" for k in range(10)], "passes": n % 2 == 0},
+        "next_story": lambda n: {},
+        "update_instruction": lambda n: {"new_instruction": f"Instruction revision {n}\n"},
+        "done": lambda n: {},
+    }
+
+
+def bench_tools(profile: Profile) -> dict[str, Any]:
+    """
+    Call each tool of the agent `tool_repeats` times in a generated workspace.
+
+    The first call of each tool is reported separately, since it builds the workspace
+    and content indexes the later calls reuse. `ask_user` is interactive and not measured.
+
+    Returns:
+        dict[str, Any]: Per tool, the first call latency, the median latency of the later calls
+            and the calls per second at that latency.
+    """
+    from ralph import agent
+
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir, files, _ = _workspace(tmp, profile)
+        instruction_path = os.path.join(tmp, "instruction.md")
+        with open(instruction_path, "w", encoding="utf-8") as f:
+            f.write("Instruction\n")
+        config = {"configurable": {"workdir": workdir, "instruction_path": instruction_path}}
+
+        for name, args in _tool_calls(files).items():
+            tool = getattr(agent, name)
+            outputs, durations = [], []
+            for n in range(profile.tool_repeats + 1):
+                started = time.perf_counter()
+                outputs.append(tool.invoke(args(n), config=config))
+                durations.append(time.perf_counter() - started)
+
+            # A workload that fails would only measure the error path
+            errors = [out for out in outputs if isinstance(out, str) and out.startswith("Error")]
+            if errors:
+                raise RuntimeError(f"{name} failed during the benchmark: {errors[0]}")
+            median = statistics.median(durations[1:])
+            results[name] = {
+                "first_call_ms": round(durations[0] * 1000, 3),
+                "p50_ms": round(median * 1000, 3),
+                "calls_per_s": round(1 / median, 1),
+            }
+    return results
+
+
+SUITES: dict[str, Callable[[Profile], dict[str, Any]]] = {
+    "loop": bench_loop,
+    "react": bench_react,
+    "tools": bench_tools,
+}
@@ -0,0 +1,44 @@
+"""
+Synthetic workspaces for the benchmarks.
+"""
+
+import os
+import subprocess
+
+
+def make_workspace(root: str, files: int, functions_per_file: int = 20, git: bool = False) -> list[str]:
+    """
+    Generate a Python project with `files` modules spread over nested packages.
+
+    Every module defines functions `helper_<module>_<n>` returning `value + n`, so searches
+    and edits have unique, predictable targets.
+
+    Args:
+        root (str): The directory to create the project in.
+        files (int): Number of modules.
+        functions_per_file (int, optional): Functions per module. Defaults to 20.
+        git (bool, optional): Initialise a git repository, as in a real checkout. Defaults to False.
+
+    Returns:
+        list[str]: The module paths, relative to `root`.
+    """
+    paths = []
+    for i in range(files):
+        package = os.path.join("src", f"pkg{i % 10}", f"sub{i % 7}")
+        rel = os.path.join(package, f"module_{i}.py")
+        os.makedirs(os.path.join(root, package), exist_ok=True)
+        body = [f'"""Module {i}."""\n', "import os\n"]
+        for n in range(functions_per_file):
+            body.append(f"\n\ndef helper_{i}_{n}(value):\n    \"\"\"Return value plus {n}.\"\"\"\n    return value + {n}\n")
+        with open(os.path.join(root, rel), "w", encoding="utf-8") as f:
+            f.write("".join(body))
+        paths.append(rel)
+
+    with open(os.path.join(root, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write("build/\n*.pyc\n")
+    os.makedirs(os.path.join(root, "build"), exist_ok=True)
+    with open(os.path.join(root, "build", "ignored.txt"), "w", encoding="utf-8") as f:
+        f.write("ignored\n")
+    if git:
+        subprocess.run(["git", "init", "-q", root], check=False)
+    return paths
@@ -6,19 +6,47 @@ LLM initialization, and agent creation functions using LangGraph.
 """
 
 from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.runnables import RunnableConfig
-from ralph.config import RalphConfig, LangchainConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.messages import AIMessage, message_chunk_to_message
+from ralph.config import RalphConfig
+from ralph.config.tool import ToolConfig
 from ralph.state import AgentState
+from ralph.context import ContextManager, MESSAGE_OVERHEAD_TOKENS
+from ralph.cache import llm_cache
+from ralph.prompt import build_system_prompt, instruction_cache, system_message
+from ralph.prompt_cache import prompt_cache_for
+from ralph.models import llm_model
+from ralph.workspace import workspace_index
+from ralph.files import read_window, atomic_write, atomic_write_many
+from ralph.search import content_index, notify_write
+from ralph.prefetch import run_prefetcher
+from ralph.prd import PRD_FILE, prd_store
+from ralph.metrics import run_metrics
+from ralph import tracing
+from ralph.patch import PatchError, apply_hunks, parse_unified_diff, replace_blocks
+from ralph.command import run_shell, arun_shell
 import os
-import subprocess
+import asyncio
+import functools
 import json
+import time
 import uuid
 import click
 from typing import List, Optional, Any
+from typing_extensions import TypedDict
 import re
 
+# Page size of list_files, and the largest page it will return
+LIST_FILES_DEFAULT_LIMIT = 200
+LIST_FILES_MAX_LIMIT = 1000
+
+# Largest number of files handled by one read_files or write_files call
+MAX_BATCH_FILES = 20
+
+# Default and largest number of matches returned by search_code
+SEARCH_DEFAULT_RESULTS = 50
+SEARCH_MAX_RESULTS = 500
+
 def _get_workdir(config: RunnableConfig) -> str:
     """
     Extract and validate the working directory from the runtime config.
@@ -37,6 +65,22 @@ def _get_workdir(config: RunnableConfig) -> str:
         raise ValueError("Workdir not found in context configuration")
     return os.path.abspath(workdir)
 
+def _tool_config(config: RunnableConfig, name: str) -> ToolConfig:
+    """
+    Return the settings of a tool from the toolbox in the runtime config.
+
+    Args:
+        config (RunnableConfig): The runtime configuration, optionally containing the 'toolbox'.
+        name (str): The name of the tool.
+
+    Returns:
+        ToolConfig: The tool settings, or the defaults if no toolbox is configured.
+    """
+    toolbox = config.get("configurable", {}).get("toolbox")
+    if toolbox is None:
+        return ToolConfig.for_tool(name)
+    return toolbox.tool_config(name)
+
 def _resolve_path(path: str, workdir: str) -> str:
     """
     Resolve a path relative to the workdir and ensure it is within the workdir.
@@ -64,16 +108,34 @@ def _resolve_path(path: str, workdir: str) -> str:
     return target_path
 
 @tool
-def list_files(config: RunnableConfig, path: str = ".") -> List[str]:
+def list_files(
+    config: RunnableConfig,
+    path: str = ".",
+    max_depth: Optional[int] = None,
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    limit: int = LIST_FILES_DEFAULT_LIMIT,
+) -> List[str]:
     """
-    List all files in the given directory.
+    List the files in the given directory.
+
+    Files ignored by .gitignore and directories such as .git, node_modules and virtualenvs
+    are skipped. Results are sorted and paginated: when more files match than `limit`, the
+    last entry says how many remain and which offset to request next.
 
     Args:
         config (RunnableConfig): The runtime configuration.
         path (str, optional): The directory path to list files from. Defaults to ".".
+        max_depth (Optional[int], optional): How many directory levels to descend (1 lists only
+            the files directly in `path`). Defaults to no limit.
+        pattern (Optional[str], optional): Glob filter applied to the relative path or file name,
+            e.g. "*.py" or "src/**/*.ts". Defaults to None.
+        offset (int, optional): Number of matching files to skip. Defaults to 0.
+        limit (int, optional): Maximum number of files to return. Defaults to 200.
 
     Returns:
-        List[str]: A list of file paths relative to the target directory.
+        List[str]: A list of file paths relative to the target directory, or `[path]` if
+            `path` is a file.
     """
     try:
         workdir = _get_workdir(config)
@@ -81,28 +143,47 @@ def list_files(config: RunnableConfig, path: str = ".") -> List[str]:
 
         if not os.path.exists(target_path):
             return []
-
-        files = []
-        for root, _, filenames in os.walk(target_path):
-            for filename in filenames:
-                # Calculate relative path from the target_path, not from workdir necessarily
-                # The user expects listing relative to 'path' argument usually, but
-                # strictly speaking, we want paths relative to the requested 'path'.
-                # However, the tool usually returns paths relative to the root of the listing.
-                # Let's keep existing behavior: relpath from the scanned root.
-                files.append(os.path.relpath(os.path.join(root, filename), target_path))
-        return files
+        if os.path.isfile(target_path):
+            return [path]
+
+        index = workspace_index(workdir)
+        files = index.files(target_path, max_depth=max_depth, pattern=pattern)
+        if not files and not index.indexed(target_path):
+            return [f"Note: {path} is excluded from listings (.gitignore or a default exclude such as .git or node_modules)"]
+
+        offset = max(0, offset)
+        limit = max(1, min(limit, LIST_FILES_MAX_LIMIT))
+        page = files[offset:offset + limit]
+        remaining = len(files) - offset - len(page)
+        if remaining > 0:
+            page.append(f"... {remaining} more files; call list_files again with offset={offset + len(page)}")
+        return page
     except Exception as e:
         return [f"Error: {str(e)}"]
 
 @tool
-def read_file(path: str, config: RunnableConfig) -> str:
+def read_file(
+    path: str,
+    config: RunnableConfig,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+) -> str:
     """
-    Read the content of a file.
+    Read the content of a file, or part of it.
+
+    Large files are returned in windows: output is capped (see the toolbox `max_output_bytes`
+    setting) and, when only part of the file is returned, a header gives the file's total
+    size and line count. Use a line range or a byte range to page through the file.
 
     Args:
         path (str): The path to the file to read.
         config (RunnableConfig): The runtime configuration.
+        start_line (Optional[int], optional): First line to read (1-based). Defaults to None.
+        end_line (Optional[int], optional): Last line to read (inclusive). Defaults to the end of the file.
+        offset (Optional[int], optional): First byte to read, when no line range is given. Defaults to None.
+        length (Optional[int], optional): Number of bytes to read from `offset`. Defaults to the end of the file.
 
     Returns:
         str: The content of the file, or an error message if reading fails.
@@ -111,11 +192,66 @@ def read_file(path: str, config: RunnableConfig) -> str:
         workdir = _get_workdir(config)
         target_path = _resolve_path(path, workdir)
 
-        with open(target_path, "r", encoding="utf-8") as f:
-            return f.read()
+        max_bytes = _tool_config(config, "read_file").max_output_bytes
+        prefetcher = run_prefetcher(config)
+        data = prefetcher.lookup(target_path, config) if prefetcher is not None else None
+        return read_window(target_path, start_line, end_line, offset, length, max_bytes=max_bytes, data=data)
     except Exception as e:
         return f"Error reading file {path}: {str(e)}"
 
+@tool
+def search_code(
+    query: str,
+    config: RunnableConfig,
+    path: str = ".",
+    pattern: Optional[str] = None,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    context_lines: int = 1,
+    max_results: int = SEARCH_DEFAULT_RESULTS,
+) -> str:
+    """
+    Search the contents of the workspace files, like grep.
+
+    Prefer this to reading files one by one when looking for a definition, a usage or a
+    string. Files ignored by .gitignore, binary files and files over 1 MiB are not searched.
+    Each match is returned as "path:line: text", with context lines as "path-line- text".
+
+    Args:
+        query (str): The text to find, or a regular expression if `regex` is true.
+        config (RunnableConfig): The runtime configuration.
+        path (str, optional): The directory to search. Defaults to ".".
+        pattern (Optional[str], optional): Glob restricting the files searched, e.g. "*.py". Defaults to None.
+        regex (bool, optional): Treat `query` as a regular expression. Defaults to False.
+        case_sensitive (bool, optional): Match case exactly. Defaults to False.
+        context_lines (int, optional): Lines of context shown around each match. Defaults to 1.
+        max_results (int, optional): Maximum number of matches returned. Defaults to 50.
+
+    Returns:
+        str: The matching lines, or a message saying nothing matched.
+    """
+    try:
+        workdir = _get_workdir(config)
+        target_path = _resolve_path(path, workdir)
+
+        max_results = max(1, min(max_results, SEARCH_MAX_RESULTS))
+        lines, total = content_index(workdir).search(
+            query,
+            path=target_path,
+            pattern=pattern,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            context_lines=max(0, min(context_lines, 10)),
+            max_results=max_results,
+        )
+        if total == 0:
+            return f"No matches for {query!r} in {path}"
+        if total > max_results:
+            lines.append(f"... {total - max_results} more matches; narrow the search with path or pattern")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error searching for {query!r}: {str(e)}"
+
 @tool
 def write_file(path: str, content: str, config: RunnableConfig) -> str:
     """
@@ -133,72 +269,276 @@ def write_file(path: str, content: str, config: RunnableConfig) -> str:
         workdir = _get_workdir(config)
         target_path = _resolve_path(path, workdir)
 
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-        with open(target_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        atomic_write(target_path, content)
+        notify_write(workdir, target_path)
         return f"Successfully wrote to {path}"
     except Exception as e:
         return f"Error writing to file {path}: {str(e)}"
 
+class TextEdit(TypedDict):
+    """A search/replace block for `edit_file`."""
+    search: str
+    replace: str
+
+@tool
+def edit_file(path: str, edits: List[TextEdit], config: RunnableConfig) -> str:
+    """
+    Edit a file by replacing exact blocks of text, without resending the whole file.
+
+    Edits are applied in order. Each `search` text must appear exactly once in the file
+    (copy it verbatim, including indentation, and add surrounding lines if needed to make
+    it unique); it is replaced by `replace`. If any edit does not match, the file is left
+    unchanged.
+
+    Args:
+        path (str): The path to the file to edit.
+        edits (List[TextEdit]): The edits, each with the `search` text and its `replace`ment.
+        config (RunnableConfig): The runtime configuration.
+
+    Returns:
+        str: A success message or an error message saying which edit did not match.
+    """
+    try:
+        workdir = _get_workdir(config)
+        target_path = _resolve_path(path, workdir)
+
+        with open(target_path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+        content = replace_blocks(content, [(e["search"], e["replace"]) for e in edits])
+        atomic_write(target_path, content)
+        notify_write(workdir, target_path)
+        return f"Successfully applied {len(edits)} edits to {path}"
+    except PatchError as e:
+        return f"Error editing {path} (file unchanged): {str(e)}"
+    except Exception as e:
+        return f"Error editing {path}: {str(e)}"
+
+@tool
+def apply_patch(patch: str, config: RunnableConfig, path: Optional[str] = None) -> str:
+    """
+    Apply a unified diff (as produced by `diff -u` or `git diff`) to one or more files.
+
+    Every hunk is checked against the current files before anything is written; if any
+    hunk does not match, no file is changed. Hunks whose context moved are applied where
+    the context matches. Use "--- /dev/null" to create a file and "+++ /dev/null" to delete one.
+
+    Args:
+        patch (str): The unified diff, with "--- a/path" and "+++ b/path" headers and "@@" hunks.
+        config (RunnableConfig): The runtime configuration.
+        path (Optional[str], optional): The file to patch when the diff has no headers. Defaults to None.
+
+    Returns:
+        str: A success message listing the patched files, or an error message saying which hunk did not match.
+    """
+    try:
+        workdir = _get_workdir(config)
+        writes = []
+        deletes = []
+        for file_patch in parse_unified_diff(patch):
+            name = file_patch.path or path
+            if not name:
+                raise PatchError("the diff has no '--- a/path' / '+++ b/path' headers; pass `path`")
+            target_path = _resolve_path(name, workdir)
+            exists = os.path.exists(target_path)
+            if file_patch.creates and exists:
+                raise PatchError(f"{name} already exists; the diff creates it (--- /dev/null)")
+            if not file_patch.creates and not exists:
+                raise PatchError(f"{name} does not exist")
+            content = ""
+            if exists:
+                with open(target_path, "r", encoding="utf-8", newline="") as f:
+                    content = f.read()
+            content = apply_hunks(content, file_patch.hunks, name)
+            if file_patch.deletes:
+                if content:
+                    raise PatchError(f"the diff deletes {name} but does not remove all of its lines")
+                deletes.append((name, target_path))
+            else:
+                writes.append((name, target_path, content))
+
+        atomic_write_many([(target_path, content) for _, target_path, content in writes])
+        for _, target_path in deletes:
+            os.remove(target_path)
+        for target_path in [t for _, t, _ in writes] + [t for _, t in deletes]:
+            notify_write(workdir, target_path)
+        names = [name for name, _, _ in writes] + [f"{name} (deleted)" for name, _ in deletes]
+        return "Successfully patched " + ", ".join(names)
+    except PatchError as e:
+        return f"Error applying patch (no files were changed): {str(e)}"
+    except Exception as e:
+        return f"Error applying patch: {str(e)}"
+
+class FileWrite(TypedDict):
+    """A file to write with `write_files`."""
+    path: str
+    content: str
+
+@tool
+def read_files(paths: List[str], config: RunnableConfig) -> str:
+    """
+    Read several files in one call.
+
+    Use this instead of consecutive read_file calls when you already know which files you
+    need. Each file is preceded by a "==> path <==" line and capped like read_file; use
+    read_file with a line range to page through large files.
+
+    Args:
+        paths (List[str]): The paths of the files to read (at most 20).
+        config (RunnableConfig): The runtime configuration.
+
+    Returns:
+        str: The contents of the files, with an error message in place of any file that could not be read.
+    """
+    try:
+        workdir = _get_workdir(config)
+        if len(paths) > MAX_BATCH_FILES:
+            return f"Error: read_files accepts at most {MAX_BATCH_FILES} paths per call, got {len(paths)}"
+
+        max_bytes = _tool_config(config, "read_file").max_output_bytes
+        prefetcher = run_prefetcher(config)
+        sections = []
+        for path in paths:
+            try:
+                target_path = _resolve_path(path, workdir)
+                data = prefetcher.lookup(target_path, config) if prefetcher is not None else None
+                content = read_window(target_path, max_bytes=max_bytes, data=data)
+            except Exception as e:
+                content = f"Error reading file {path}: {str(e)}"
+            sections.append(f"==> {path} <==\n{content}")
+        return "\n\n".join(sections)
+    except Exception as e:
+        return f"Error reading files: {str(e)}"
+
+@tool
+def write_files(files: List[FileWrite], config: RunnableConfig) -> str:
+    """
+    Write several files in one call.
+
+    All paths are checked before anything is written, and every file is replaced
+    atomically: either all files are written or, on error, none are changed.
+
+    Args:
+        files (List[FileWrite]): The files to write (at most 20), each with a `path` and its full `content`.
+        config (RunnableConfig): The runtime configuration.
+
+    Returns:
+        str: A success message listing the files, or an error message if nothing was written.
+    """
+    try:
+        workdir = _get_workdir(config)
+        if not files:
+            return "Error: write_files needs at least one file"
+        if len(files) > MAX_BATCH_FILES:
+            return f"Error: write_files accepts at most {MAX_BATCH_FILES} files per call, got {len(files)}"
+
+        targets = [(_resolve_path(f["path"], workdir), f["content"]) for f in files]
+        atomic_write_many(targets)
+        for target_path, _ in targets:
+            notify_write(workdir, target_path)
+        return f"Successfully wrote {len(files)} files: " + ", ".join(f["path"] for f in files)
+    except Exception as e:
+        return f"Error writing files (no files were changed): {str(e)}"
+
 @tool
-def update_prd(story_title: str, config: RunnableConfig, story_id: Optional[str] = None, notes: Optional[str] = None) -> str:
+def update_prd(
+    story_title: str,
+    config: RunnableConfig,
+    story_id: Optional[str] = None,
+    notes: Optional[str] = None,
+    priority: Optional[int] = None,
+    passes: Optional[bool] = None,
+) -> str:
     """
-    Add a new User Story to the PRD (prd.json).
+    Add a User Story to the PRD (prd.json), or update the story with the given ID.
 
     Use this tool to track requirements and progress.
 
     Args:
         story_title (str): The title of the user story.
         config (RunnableConfig): The runtime configuration.
-        story_id (Optional[str], optional): The ID of the story. Defaults to a generated UUID.
+        story_id (Optional[str], optional): The ID of the story. If a story with this ID exists it
+            is updated; otherwise a new story is added. Defaults to a generated UUID.
         notes (Optional[str], optional): Additional notes for the story. Defaults to None.
+        priority (Optional[int], optional): The priority (1 is the most urgent). Defaults to None.
+        passes (Optional[bool], optional): Whether the story is done. New stories default to False.
 
     Returns:
         str: A success message or an error message if updating the PRD fails.
     """
     try:
         workdir = _get_workdir(config)
-        prd_path = _resolve_path("prd.json", workdir)
 
-        # Load existing PRD or create new structure
-        if os.path.exists(prd_path):
-            with open(prd_path, "r", encoding="utf-8") as f:
-                try:
-                    prd_data = json.load(f)
-                except json.JSONDecodeError:
-                    prd_data = {"branchName": "main", "userStories": []}
-        else:
-            prd_data = {"branchName": "main", "userStories": []}
+        story, created = prd_store(workdir).upsert(
+            story_id, storyTitle=story_title, notes=notes or None, priority=priority, passes=passes
+        )
+        if created:
+            return f"Successfully added story '{story_title}' to prd.json"
+        return f"Successfully updated story '{story['storyId']}' in prd.json"
 
-        # Ensure userStories list exists
-        if "userStories" not in prd_data:
-            prd_data["userStories"] = []
+    except Exception as e:
+        return f"Error updating PRD: {str(e)}"
 
-        # Create new story
-        new_story = {
-            "storyId": story_id or str(uuid.uuid4())[:8],
-            "storyTitle": story_title,
-            "passes": False # Default to False for new stories
-        }
-        if notes:
-            new_story["notes"] = notes
+@tool
+def update_stories(
+    story_ids: List[str],
+    config: RunnableConfig,
+    passes: Optional[bool] = None,
+    priority: Optional[int] = None,
+) -> str:
+    """
+    Mark several PRD stories as passing or failing, or change their priority, in one call.
+
+    Args:
+        story_ids (List[str]): The IDs of the stories to update.
+        config (RunnableConfig): The runtime configuration.
+        passes (Optional[bool], optional): The new status. Defaults to None (unchanged).
+        priority (Optional[int], optional): The new priority. Defaults to None (unchanged).
 
-        # Append and save
-        prd_data["userStories"].append(new_story)
+    Returns:
+        str: A success message, listing any IDs that were not found.
+    """
+    try:
+        workdir = _get_workdir(config)
+        if passes is None and priority is None:
+            return "Error: give passes and/or priority to update"
+
+        missing = prd_store(workdir).update(story_ids, passes=passes, priority=priority)
+        updated = len(story_ids) - len(missing)
+        result = f"Successfully updated {updated} stories in prd.json"
+        if missing:
+            result += f"; not found: {', '.join(missing)}"
+        return result
+    except Exception as e:
+        return f"Error updating PRD: {str(e)}"
 
-        with open(prd_path, "w", encoding="utf-8") as f:
-            json.dump(prd_data, f, indent=2)
+@tool
+def next_story(config: RunnableConfig) -> str:
+    """
+    Return the next story to work on: the failing story with the highest priority.
 
-        return f"Successfully added story '{story_title}' to prd.json"
+    Args:
+        config (RunnableConfig): The runtime configuration.
 
+    Returns:
+        str: The story as JSON, or a message saying that every story passes.
+    """
+    try:
+        workdir = _get_workdir(config)
+        story = prd_store(workdir).next_failing()
+        if story is None:
+            return "All stories in prd.json pass."
+        return json.dumps(story, indent=2)
     except Exception as e:
-        return f"Error updating PRD: {str(e)}"
+        return f"Error reading PRD: {str(e)}"
 
 @tool
 def run_command(command: str, config: RunnableConfig) -> str:
     """
     Run a shell command.
 
+    The command is stopped (with any processes it started) after the configured timeout,
+    and long output is shortened to its beginning and end.
+
     Args:
         command (str): The shell command to run.
         config (RunnableConfig): The runtime configuration.
@@ -208,16 +548,9 @@ def run_command(command: str, config: RunnableConfig) -> str:
     """
     try:
         workdir = _get_workdir(config)
+        settings = _tool_config(config, "run_command")
 
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            cwd=workdir,
-            timeout=60  # Prevent infinite loops
-        )
-        return f"stdout:\n{result.stdout}\nstderr:\n{result.stderr}"
+        return run_shell(command, workdir, settings.timeout.total_seconds(), settings.max_output_bytes // 2)
     except Exception as e:
         return f"Error running command: {str(e)}"
 
@@ -265,62 +598,80 @@ def update_instruction(new_instruction: str, config: RunnableConfig) -> str:
         # We assume instruction_path is trusted as it comes from the system loop
         with open(instruction_path, "w", encoding="utf-8") as f:
             f.write(new_instruction)
+        instruction_cache.store(instruction_path, new_instruction)
 
         return "Successfully updated instruction file."
     except Exception as e:
         return f"Error updating instruction: {str(e)}"
 
 
-def llm_model(config: LangchainConfig):
+async def _arun_command(command: str, config: RunnableConfig) -> str:
     """
-    Initialize and return the LLM model based on the configuration.
+    Run a shell command asynchronously (async variant of `run_command`).
 
     Args:
-        config (LangchainConfig): The LangChain configuration.
+        command (str): The shell command to run.
+        config (RunnableConfig): The runtime configuration.
 
     Returns:
-        BaseChatModel: The initialized chat model (Google, Azure, or Ollama).
+        str: The stdout and stderr output of the command, or an error message.
+    """
+    try:
+        workdir = _get_workdir(config)
+        settings = _tool_config(config, "run_command")
 
-    Raises:
-        ValueError: If the model provider is unsupported.
+        return await arun_shell(command, workdir, settings.timeout.total_seconds(), settings.max_output_bytes // 2)
+    except Exception as e:
+        return f"Error running command: {str(e)}"
+
+
+def _thread_coroutine(func):
     """
-    match config.model_provider:
-        case "google_genai":
-            from langchain_google_genai import ChatGoogleGenerativeAI
+    Return an async variant of a synchronous tool function that runs it in a worker thread.
 
-            model = ChatGoogleGenerativeAI(
-                model=config.model,
-                google_api_key=config.google_api_key.get_secret_value(),
-            )
-        case "azure_openai":
-            from langchain_openai import AzureChatOpenAI
-
-            model = AzureChatOpenAI(
-                model=config.model,
-                azure_endpoint=str(config.azure_endpoint),
-                api_version=config.azure_api_version,
-                api_key=config.azure_api_key.get_secret_value(),
-            )
-        case "ollama":
-            from langchain_ollama import ChatOllama
+    Args:
+        func (callable): The synchronous tool function.
+
+    Returns:
+        callable: A coroutine function with the same signature.
+    """
+    @functools.wraps(func)
+    async def coroutine(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return coroutine
 
-            model = ChatOllama(
-                model=config.model,
-                base_url=config.ollama_base_url,
-            )
-        case _:
-            raise ValueError(f"Unsupported model provider: {config.model_provider}")
 
-    return model
+# Async variants used by `ainvoke`: blocking file I/O runs in worker threads so the
+# event loop stays free, and commands run as asyncio subprocesses.
+for _tool in (list_files, read_file, read_files, search_code, write_file, write_files, edit_file, apply_patch, update_prd, update_stories, next_story, done, ask_user, update_instruction):
+    _tool.coroutine = _thread_coroutine(_tool.func)
+run_command.coroutine = _arun_command
+
+
+def _prompt_file(abs_dir: str) -> str:
+    """
+    Return the path of the agent prompt in a working directory.
+
+    Args:
+        abs_dir (str): The absolute working directory.
+
+    Returns:
+        str: The path of prompts/agent/prompt.md.
+    """
+    return os.path.join(abs_dir, "prompts", "agent", "prompt.md")
 
 
-def _initialize_agent_context(directory: str, config: RalphConfig):
+def _initialize_agent_context(directory: str, config: RalphConfig, llm: Any = None, max_retries: int | None = None):
     """
     Initialize the agent context, including LLM, tools, and system prompt.
 
     Args:
         directory (str): The working directory.
         config (RalphConfig): The Ralph configuration.
+        llm (BaseChatModel, optional): An existing chat model to share instead of
+            constructing a new one. Defaults to None.
+        max_retries (int | None, optional): Retries made by the provider SDK of a constructed
+            model. Defaults to None (the SDK's default).
 
     Returns:
         tuple: A tuple containing the LLM, a list of tools, and the system prompt.
@@ -328,17 +679,18 @@ def _initialize_agent_context(directory: str, config: RalphConfig):
     Raises:
         ValueError: If the Google API key is missing when using Google GenAI.
     """
-    if config.aiclient.model_provider == "google_genai" and not config.aiclient.google_api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable is not set.")
+    if llm is None:
+        if config.aiclient.model_provider == "google_genai" and not config.aiclient.google_api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable is not set.")
 
-    llm = llm_model(config.aiclient)
+        llm = llm_model(config.aiclient, cache=llm_cache(config.cache), max_retries=max_retries)
 
-    agent_tools = [list_files, read_file, write_file, run_command, done, update_prd, ask_user, update_instruction]
+    agent_tools = [list_files, read_file, read_files, search_code, write_file, write_files, edit_file, apply_patch, run_command, done, update_prd, update_stories, next_story, ask_user, update_instruction]
 
     abs_dir = os.path.abspath(directory)
 
     # Read prompt from file
-    prompt_file = os.path.join(abs_dir, "prompts", "agent", "prompt.md")
+    prompt_file = _prompt_file(abs_dir)
     base_prompt = ""
     if os.path.exists(prompt_file):
         try:
@@ -351,7 +703,29 @@ def _initialize_agent_context(directory: str, config: RalphConfig):
     return llm, agent_tools, base_prompt
 
 
-def create_agent(instruction: str, directory: str, config: RalphConfig):
+def _load_instruction(instruction: str, config: RunnableConfig) -> str:
+    """
+    Return the current instruction, preferring the instruction file from the runtime config.
+
+    The file is cached and only read again when it changes.
+
+    Args:
+        instruction (str): The static fallback instruction.
+        config (RunnableConfig): The runtime configuration, optionally containing 'instruction_path'.
+
+    Returns:
+        str: The instruction content.
+    """
+    instruction_path = config.get("configurable", {}).get("instruction_path")
+    if instruction_path:
+        try:
+            return instruction_cache.read(instruction_path)
+        except Exception:
+            pass
+    return instruction
+
+
+def create_agent(instruction: str, directory: str, config: RalphConfig, llm: Any = None):
     """
     Creates a LangGraph agent with access to tools.
 
@@ -359,82 +733,212 @@ def create_agent(instruction: str, directory: str, config: RalphConfig):
         instruction (str): The instruction for the agent.
         directory (str): The working directory.
         config (RalphConfig): The Ralph configuration.
+        llm (BaseChatModel, optional): An existing chat model to use. Defaults to None
+            (a new model is constructed from the config).
 
     Returns:
         CompiledGraph: The compiled LangGraph agent.
     """
-    llm, agent_tools, base_prompt = _initialize_agent_context(directory, config)
+    llm, agent_tools, base_prompt = _initialize_agent_context(directory, config, llm=llm)
 
     # Reconstruct the system prompt for static usage
     abs_dir = os.path.abspath(directory)
-    system_prompt = f"""{base_prompt}
+    system_prompt = build_system_prompt(base_prompt, abs_dir, instruction)
 
-You are working in the directory: {abs_dir}
-Your goal is to follow these instructions:
-{instruction}
-
-You have tools to list, read, and write files, and run commands.
-If you need to explore the codebase, use list_files and read_file.
-Do not hallucinate file contents. Always read them first.
-When you are satisfied that you have completed the task, call the done tool.
-If you cannot complete the task in one step, make progress and stop. You will be restarted with fresh context but the files will persist.
-"""
+    from langgraph.prebuilt import create_react_agent
 
     # create_react_agent returns a CompiledGraph
     graph = create_react_agent(llm, tools=agent_tools, prompt=system_prompt, state_schema=AgentState)
     return graph
 
 
-def create_single_step_agent(instruction: str, directory: str, config: RalphConfig):
+class AgentFactory:
+    """
+    Builds ReAct agents and reuses them while their inputs are unchanged.
+
+    Compiled agents are cached on the provider configuration, the working directory, the
+    modification time of prompts/agent/prompt.md and the instruction. Chat model clients
+    are shared through a `ModelPool`. The agents hold no checkpointer, so every invocation
+    still starts from fresh state.
+
+    Attributes:
+        models (ModelPool): The shared chat model clients.
+        builds (int): Number of agents compiled so far.
+    """
+
+    def __init__(self, models: Any = None):
+        from ralph.models import ModelPool
+
+        self.models = models or ModelPool()
+        self.builds = 0
+        self._agents: dict[tuple, Any] = {}
+
+    def get(self, instruction: str, directory: str, config: RalphConfig, llm: Any = None):
+        """
+        Return the agent for an instruction and working directory, compiling it if needed.
+
+        Args:
+            instruction (str): The instruction for the agent.
+            directory (str): The working directory.
+            config (RalphConfig): The Ralph configuration.
+            llm (BaseChatModel, optional): The chat model to build the agent with instead of the
+                pooled client for the config. Defaults to None.
+
+        Returns:
+            CompiledGraph: The compiled LangGraph agent.
+        """
+        from ralph.models import provider_key
+
+        abs_dir = os.path.abspath(directory)
+        prompt_file = _prompt_file(abs_dir)
+        prompt_mtime = os.stat(prompt_file).st_mtime_ns if os.path.exists(prompt_file) else None
+        key = (provider_key(config), abs_dir, prompt_mtime, instruction)
+
+        agent = self._agents.get(key)
+        if agent is None:
+            # Drop agents built from an older prompt for this directory
+            self._agents = {k: v for k, v in self._agents.items() if k[1] != abs_dir}
+            agent = create_agent(instruction, abs_dir, config, llm=llm if llm is not None else self.models.get(config))
+            self._agents[key] = agent
+            self.builds += 1
+        return agent
+
+
+def create_single_step_agent(
+    instruction: str,
+    directory: str,
+    config: RalphConfig,
+    checkpointer: Any = None,
+    llm: Any = None,
+    llm_limiter: asyncio.Semaphore | None = None,
+):
     """
     Creates a single-step agent that executes one loop of reasoning and action.
 
-    It uses a StateGraph to define a linear workflow: Agent -> Tools -> END.
+    It uses a StateGraph to define a linear workflow: Context -> Agent -> Tools -> END.
+    The context stage keeps the message history within the configured token budget.
+    When `aiclient.streaming` is set, the model response is streamed and read-only tool
+    calls are started as soon as they are complete, before the rest of the message arrives.
 
     Args:
         instruction (str): The instruction for the agent.
         directory (str): The working directory.
         config (RalphConfig): The Ralph configuration.
+        checkpointer (Any, optional): A LangGraph checkpointer used to persist the state
+            per thread id. Defaults to None (state is held by the caller).
+        llm (BaseChatModel, optional): A chat model shared with other agents. Defaults to None
+            (a new model is constructed from the config).
+        llm_limiter (asyncio.Semaphore | None, optional): Semaphore bounding concurrent LLM
+            requests across agents, applied to async invocations. Defaults to None.
 
     Returns:
         CompiledGraph: The compiled LangGraph agent.
     """
     from langgraph.graph import StateGraph, START, END
-    from langgraph.prebuilt import ToolNode
+    from ralph.executor import ToolExecutor
+    from ralph.models import sdk_retries
+    from ralph.router import ModelRouter, Route
     from ralph.state import AgentState
+    from ralph.streaming import ToolCallTracker
 
-    llm, agent_tools, base_prompt = _initialize_agent_context(directory, config)
+    llm, agent_tools, base_prompt = _initialize_agent_context(directory, config, llm=llm, max_retries=sdk_retries(config))
     abs_dir = os.path.abspath(directory)
+    aiclient = config.aiclient
+
+    # Streamed responses bypass the response cache, so cached runs use whole responses
+    streaming = config.aiclient.streaming and not config.cache.active
+    # Reasoning turns go to the main model and fail over to the fallbacks; cheap steps go to
+    # the cheap model. Each route retries and rate-limits through its provider's scheduler.
+    router = ModelRouter(config, llm)
+    tool_names = {t.name for t in agent_tools}
+
+    # Independent tool calls of one turn run concurrently within the toolbox limits
+    tool_node = ToolExecutor(agent_tools, config.toolbox)
+
+    context_config = config.context
+    context_manager = ContextManager(
+        budget=config.aiclient.context_length - context_config.reserve_tokens,
+        keep_recent=context_config.keep_recent_messages,
+        truncate_tokens=context_config.truncate_tool_output_tokens,
+        chars_per_token=context_config.chars_per_token,
+    )
+
+    def _record_node(config: RunnableConfig, name: str, started: float):
+        metrics = run_metrics(config)
+        if metrics is not None:
+            metrics.node(name, time.perf_counter() - started)
+
+    def context_node(state: AgentState, config: RunnableConfig):
+        started = time.perf_counter()
+        update = _compact_context(state, config)
+        _record_node(config, "context", started)
+        return update
+
+    def _compact_context(state: AgentState, config: RunnableConfig):
+        # Keep the history that agent_node will send within the token budget
+        system_prompt = build_system_prompt(base_prompt, abs_dir, _load_instruction(instruction, config))
+        fixed_tokens = context_manager.count_text(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+        if not context_config.enabled:
+            return {"context_tokens": context_manager.total(state.messages, fixed_tokens)}
+
+        updates, total = context_manager.compact(state.messages, fixed_tokens, summarize=_summarizer(config))
+        if updates:
+            click.echo(f"[CONTEXT] Compacted history to {total}/{context_manager.budget} tokens ({len(updates)} messages changed)")
+        return {"messages": updates, "context_tokens": total}
+
+    def _summarizer(config: RunnableConfig):
+        if router.cheap is None:
+            return None
+
+        def summarize(text: str, tokens: int) -> str | None:
+            limit = int(router.cheap.aiclient.context_length * context_config.chars_per_token * 0.8)
+            return router.complete(
+                f"Summarize this tool output in at most {int(tokens * 0.75)} words. Keep file paths, "
+                f"names, numbers and error messages that later steps may need.\n\n{text[:limit]}",
+                config,
+            )
+        return summarize
+
+    # Tools are bound and the static prefix (system prompt and tools) is cached per route
+    route_models: dict[Route, tuple[Any, Any]] = {}
+
+    def _route_model(route: Route) -> tuple[Any, Any]:
+        if route not in route_models:
+            prompt_cache = prompt_cache_for(route.llm, agent_tools, config.prompt_cache, route.aiclient, context_manager.count_text)
+            route_models[route] = (route.llm.bind_tools(agent_tools), prompt_cache)
+        return route_models[route]
+
+    _route_model(router.routes[0])
+
+    def _agent_request(route: Route, state: AgentState, config: RunnableConfig) -> tuple[Any, list]:
+        # Determine instruction: either from config (dynamic) or argument (static fallback).
+        # The system message is reused while the instruction is unchanged, keeping the prefix stable.
+        current_instruction = _load_instruction(instruction, config)
+        system = system_message(base_prompt, abs_dir, current_instruction)
+        llm_with_tools, prompt_cache = _route_model(route)
+        return prompt_cache.prepare(llm_with_tools, system, list(state.messages))
+
+    def _recover_tool_call(content: str, config: RunnableConfig) -> dict | None:
+        # Cheap step: ask the cheap model to turn a tool call written as text into JSON
+        if router.cheap is None or not any(name in content for name in tool_names):
+            return None
+        reply = router.complete(
+            "The assistant message below was meant to call one of these tools: "
+            f"{', '.join(sorted(tool_names))}. Reply with only a JSON object "
+            '{"name": "<tool>", "arguments": {...}}, or {} if it does not call a tool.\n\n' + content,
+            config,
+        )
+        match = re.search(r"\{.*\}", reply or "", re.DOTALL)
+        try:
+            data = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            return None
+        if data.get("name") in tool_names and isinstance(data.get("arguments"), dict):
+            return data
+        return None
 
-    # Bind tools to the LLM
-    llm_with_tools = llm.bind_tools(agent_tools)
-
-    def agent_node(state: AgentState, config: RunnableConfig):
-        # Determine instruction: either from config (dynamic) or argument (static fallback)
-        current_instruction = instruction
-        instruction_path = config.get("configurable", {}).get("instruction_path")
-        if instruction_path:
-            try:
-                with open(instruction_path, "r", encoding="utf-8") as f:
-                    current_instruction = f.read()
-            except Exception as e:
-                # Log error or fallback?
-                pass
-
-        system_prompt = f"""{base_prompt}
-
-You are working in the directory: {abs_dir}
-Your goal is to follow these instructions:
-{current_instruction}
-
-You have tools to list, read, and write files, and run commands.
-If you need to explore the codebase, use list_files and read_file.
-Do not hallucinate file contents. Always read them first.
-When you are satisfied that you have completed the task, call the done tool.
-If you cannot complete the task in one step, make progress and stop. You will be restarted with fresh context but the files will persist.
-"""
-        messages = [("system", system_prompt)] + state.messages
-        response = llm_with_tools.invoke(messages, config)
+    def _agent_result(response, config: RunnableConfig) -> dict:
 
         # Fallback for models that output JSON instead of tool_calls
         if not response.tool_calls and response.content:
@@ -482,18 +986,126 @@ If you cannot complete the task in one step, make progress and stop. You will be
                      click.echo(f"[DEBUG] JSON Parsed but missing name/arguments: {tool_data.keys()}")
             else:
                  click.echo("[DEBUG] No JSON found in content or failed to parse")
+                 tool_data = _recover_tool_call(content, config)
+                 if tool_data:
+                     click.echo(f"[DEBUG] Cheap model recovered tool call: {tool_data['name']}")
+                     response.tool_calls = [{"name": tool_data["name"], "args": tool_data["arguments"], "id": str(uuid.uuid4()), "type": "tool_call"}]
 
         click.echo(f"\n[DEBUG] Agent response content: {response.content}")
         click.echo(f"[DEBUG] Agent tool calls: {response.tool_calls}\n")
         return {"messages": [response]}
 
-    tool_node = ToolNode(agent_tools)
+    def _tracker(config: RunnableConfig) -> ToolCallTracker:
+        # Read-only tool calls start as soon as they have been streamed in full
+        return ToolCallTracker(lambda call, earlier: tool_node.dispatch_early(call, earlier, config))
+
+    def _streamed_message(response):
+        return message_chunk_to_message(response) if response is not None else AIMessage(content="")
+
+    def _llm_span():
+        return tracing.span(f"chat {aiclient.model}", {
+            "gen_ai.operation.name": "chat",
+            "gen_ai.system": aiclient.model_provider,
+            "gen_ai.request.model": aiclient.model,
+            "ralph.streaming": streaming,
+        })
+
+    def _record_llm(config: RunnableConfig, span, started: float, response, first_token: float | None = None):
+        usage = getattr(response, "usage_metadata", None)
+        tracing.set_attributes(span, {**tracing.usage_attributes(usage), "ralph.tool_calls": len(getattr(response, "tool_calls", None) or [])})
+        metrics = run_metrics(config)
+        if metrics is not None:
+            latency = time.perf_counter() - started
+            first = first_token - started if first_token is not None else None
+            metrics.llm_call(latency, usage, first)
+
+    def _invoke(model, messages: list, config: RunnableConfig) -> tuple[Any, float | None]:
+        # One attempt; a retried streaming attempt starts over with a new tracker
+        if not streaming:
+            return model.invoke(messages, config), None
+
+        tracker = _tracker(config)
+        response = None
+        first_token = None
+        for chunk in model.stream(messages, config):
+            first_token = first_token or time.perf_counter()
+            response = chunk if response is None else response + chunk
+            tracker.update(response)
+        tracker.finish(response)
+        return _streamed_message(response), first_token
+
+    def _usage(result: tuple[Any, float | None]) -> dict | None:
+        return getattr(result[0], "usage_metadata", None)
+
+    def _call_model(state: AgentState, config: RunnableConfig):
+        def attempt(route: Route):
+            model, messages = _agent_request(route, state, config)
+            return _invoke(model, messages, config)
+
+        with _llm_span() as span:
+            started = time.perf_counter()
+            (response, first_token), route = router.run(attempt, config, state.context_tokens, _usage)
+            tracing.set_attributes(span, {"ralph.route": route.name})
+            _record_llm(config, span, started, response, first_token)
+            return response
+
+    def _prefetch(state: AgentState, config: RunnableConfig):
+        # Read the files the next tool calls are likely to need while the model thinks
+        prefetcher = run_prefetcher(config)
+        if prefetcher is not None:
+            prefetcher.start(state.messages, config)
+
+    def agent_node(state: AgentState, config: RunnableConfig):
+        started = time.perf_counter()
+        _prefetch(state, config)
+        response = _call_model(state, config)
+        _record_node(config, "agent", started)
+        return _agent_result(response, config)
+
+    async def _ainvoke(model, messages: list, config: RunnableConfig) -> tuple[Any, float | None]:
+        if not streaming:
+            return await model.ainvoke(messages, config), None
+
+        tracker = _tracker(config)
+        response = None
+        first_token = None
+        async for chunk in model.astream(messages, config):
+            first_token = first_token or time.perf_counter()
+            response = chunk if response is None else response + chunk
+            tracker.update(response)
+        tracker.finish(response)
+        return _streamed_message(response), first_token
+
+    async def _astream(state: AgentState, config: RunnableConfig):
+        async def attempt(route: Route):
+            model, messages = await asyncio.to_thread(_agent_request, route, state, config)
+            return await _ainvoke(model, messages, config)
+
+        with _llm_span() as span:
+            started = time.perf_counter()
+            (response, first_token), route = await router.arun(attempt, config, state.context_tokens, _usage)
+            tracing.set_attributes(span, {"ralph.route": route.name})
+            _record_llm(config, span, started, response, first_token)
+            return response
+
+    async def aagent_node(state: AgentState, config: RunnableConfig):
+        started = time.perf_counter()
+        _prefetch(state, config)
+        if llm_limiter is None:
+            response = await _astream(state, config)
+        else:
+            async with llm_limiter:
+                response = await _astream(state, config)
+        _record_node(config, "agent", started)
+        return await asyncio.to_thread(_agent_result, response, config)
 
     workflow = StateGraph(AgentState)
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", tool_node)
+    workflow.add_node("context", context_node)
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node, name="agent"))
+    workflow.add_node("tools", tool_node.as_runnable())
 
-    workflow.add_edge(START, "agent")
+    workflow.add_edge(START, "context")
+    workflow.add_edge("context", "agent")
 
     def should_continue(state: AgentState):
         messages = state.messages
@@ -505,7 +1117,7 @@ If you cannot complete the task in one step, make progress and stop. You will be
     workflow.add_conditional_edges("agent", should_continue, ["tools", END])
     workflow.add_edge("tools", END)
 
-    compiled_graph = workflow.compile()
+    compiled_graph = workflow.compile(checkpointer=checkpointer)
     # click.echo(compiled_graph.get_graph().draw_ascii())
 
     return compiled_graph
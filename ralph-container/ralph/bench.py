@@ -0,0 +1,210 @@
+"""
+Bench module for Ralph.
+
+This module runs many loops against the stand-in LLM server (`ralph.standin`) and
+reports throughput, request and iteration latency percentiles, and error rates. The
+loops run as a fleet, so the numbers reflect Ralph's concurrency limits, retries and
+streaming under the latency, token rate and errors injected by the server.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from ralph.config import LangchainConfig, MetricsConfig, RalphConfig
+from ralph.fleet import FleetEntry, FleetManifest, run_fleet
+from ralph.scheduler import request_scheduler
+from ralph.standin import StandinServer, StandinSettings, percentile
+
+
+class BenchReport(BaseModel):
+    """
+    Result of a bench run.
+
+    Attributes:
+        provider (str): The provider client used to reach the stand-in server.
+        loops (int): Number of loops run.
+        done (int): Loops that finished by calling `done`.
+        failed (int): Loops stopped by an error.
+        iterations (int): Iterations completed across all loops.
+        elapsed (float): Wall time of the run in seconds.
+        requests (int): Chat requests received by the server.
+        request_errors (int): Requests answered with an injected error.
+        retries (int): Requests retried by the request scheduler.
+        output_tokens (int): Tokens generated by the server.
+        request_latency_ms (dict[str, float]): p50/p95/p99/mean latency of the server's responses.
+        iteration_latency_ms (dict[str, float]): p50/p95/p99/mean wall time of the loops' iterations.
+        errors (list[str]): The distinct errors that stopped loops.
+    """
+    provider: str
+    loops: int = 0
+    done: int = 0
+    failed: int = 0
+    iterations: int = 0
+    elapsed: float = 0.0
+    requests: int = 0
+    request_errors: int = 0
+    retries: int = 0
+    output_tokens: int = 0
+    request_latency_ms: dict[str, float] = Field(default_factory=dict)
+    iteration_latency_ms: dict[str, float] = Field(default_factory=dict)
+    errors: list[str] = Field(default_factory=list)
+
+    def rate(self, count: int) -> float:
+        """Return `count` per second of wall time."""
+        return count / self.elapsed if self.elapsed else 0.0
+
+
+def bench_config(provider: str, url: str, streaming: bool) -> RalphConfig:
+    """
+    Return a configuration whose model client talks to the stand-in server.
+
+    Args:
+        provider (str): "ollama" or "azure_openai".
+        url (str): The base URL of the stand-in server.
+        streaming (bool): Whether the agent streams model responses.
+
+    Returns:
+        RalphConfig: The configuration. Metrics are recorded per workdir without a summary table.
+    """
+    if provider == "azure_openai":
+        aiclient = LangchainConfig(
+            model_provider="azure_openai",
+            model="standin",
+            azure_endpoint=url,
+            azure_api_key="standin",
+            azure_api_version="2024-06-01",
+            streaming=streaming,
+            context_length=200000,
+        )
+    else:
+        aiclient = LangchainConfig(model_provider="ollama", model="standin", ollama_base_url=url, streaming=streaming, context_length=200000)
+    return RalphConfig(aiclient=aiclient, metrics=MetricsConfig(summary=False))
+
+
+def _workspaces(root: str, loops: int, limit: int) -> FleetManifest:
+    """Create one small workspace and instruction file per loop under `root`."""
+    entries = []
+    for i in range(loops):
+        workdir = os.path.join(root, f"loop_{i}")
+        os.makedirs(workdir)
+        with open(os.path.join(workdir, "README.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Workspace {i}\n\nTODO: keep notes of the progress.\n")
+        instruction_file = os.path.join(root, f"instructions_{i}.md")
+        with open(instruction_file, "w", encoding="utf-8") as f:
+            f.write("Read the README and keep notes of the progress.\n")
+        entries.append(FleetEntry(workdir=workdir, instruction_file=instruction_file, limit=limit))
+    return FleetManifest(entries=entries)
+
+
+def _iteration_times(config: RalphConfig, workdirs: list[str]) -> list[float]:
+    """Read the wall time of every iteration from the loops' metrics files."""
+    times = []
+    for workdir in workdirs:
+        path = os.path.join(workdir, config.metrics.path)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            times.extend(json.loads(line)["elapsed"] for line in f if line.strip())
+    return times
+
+
+def _latency_ms(seconds: list[float]) -> dict[str, float]:
+    """Summarise durations as p50/p95/p99/mean in milliseconds."""
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 3),
+        "p95": round(percentile(seconds, 95) * 1000, 3),
+        "p99": round(percentile(seconds, 99) * 1000, 3),
+        "mean": round(sum(seconds) / len(seconds) * 1000, 3) if seconds else 0.0,
+    }
+
+
+def run_bench(
+    settings: StandinSettings,
+    loops: int = 8,
+    limit: int = 10,
+    workers: int = 4,
+    max_llm_requests: int = 4,
+    provider: str = "ollama",
+    streaming: bool = True,
+    verbose: bool = False,
+) -> BenchReport:
+    """
+    Run loops against a stand-in server started for the run.
+
+    Args:
+        settings (StandinSettings): Latency, token rate, errors and script of the server.
+        loops (int, optional): Number of loops. Defaults to 8.
+        limit (int, optional): Max iterations per loop. Defaults to 10.
+        workers (int, optional): Max loops running concurrently. Defaults to 4.
+        max_llm_requests (int, optional): Max concurrent LLM requests. Defaults to 4.
+        provider (str, optional): Client used to reach the server, "ollama" or "azure_openai".
+            Defaults to "ollama".
+        streaming (bool, optional): Whether the agent streams model responses. Defaults to True.
+        verbose (bool, optional): Print the loops' output. Defaults to False.
+
+    Returns:
+        BenchReport: The measurements of the run.
+    """
+    with StandinServer(settings) as server, tempfile.TemporaryDirectory(prefix="ralph-bench-") as root:
+        config = bench_config(provider, server.url, streaming)
+        manifest = _workspaces(root, loops, limit)
+        output: Any = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        started = time.perf_counter()
+        with output:
+            reports = run_fleet(manifest, config, workers=workers, max_llm_requests=max_llm_requests)
+        elapsed = time.perf_counter() - started
+        iteration_times = _iteration_times(config, [entry.workdir for entry in manifest.entries])
+        stats = server.stats()
+        scheduler = request_scheduler(config)
+
+    return BenchReport(
+        provider=provider,
+        loops=len(reports),
+        done=sum(r.done for r in reports),
+        failed=sum(1 for r in reports if r.error),
+        iterations=sum(r.iterations for r in reports),
+        elapsed=elapsed,
+        requests=stats["requests"],
+        request_errors=stats["errors"],
+        retries=scheduler.retries if scheduler else 0,
+        output_tokens=stats["output_tokens"],
+        request_latency_ms=stats["latency_ms"],
+        iteration_latency_ms=_latency_ms(iteration_times),
+        errors=sorted({r.error for r in reports if r.error}),
+    )
+
+
+def format_bench(report: BenchReport) -> str:
+    """
+    Format a bench report as plain text.
+
+    Args:
+        report (BenchReport): The report to format.
+
+    Returns:
+        str: The report.
+    """
+    def share(count: int, total: int) -> str:
+        return f"{count / total:.1%}" if total else "0.0%"
+
+    def latency(values: dict[str, float]) -> str:
+        return "  ".join(f"{name} {values.get(name, 0.0):>9.1f}" for name in ("p50", "p95", "p99", "mean"))
+
+    lines = [
+        f"Bench: {report.loops} loops via {report.provider} in {report.elapsed:.2f}s",
+        f"  loops        {report.done} done, {report.failed} failed ({share(report.failed, report.loops)} error rate)",
+        f"  requests     {report.requests}, {report.request_errors} errors ({share(report.request_errors, report.requests)} error rate), {report.retries} retried",
+        f"  throughput   {report.rate(report.requests):.1f} requests/s, {report.rate(report.iterations):.1f} iterations/s, "
+        f"{report.rate(report.output_tokens):.0f} tokens/s",
+        f"  request ms   {latency(report.request_latency_ms)}",
+        f"  iteration ms {latency(report.iteration_latency_ms)}",
+    ]
+    lines.extend(f"  error: {error}" for error in report.errors)
+    return "\n".join(lines)
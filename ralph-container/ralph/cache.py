@@ -0,0 +1,215 @@
+"""
+Cache module for Ralph.
+
+This module provides an opt-in, on-disk cache of model responses. Re-running the same
+instruction against the same workspace sends byte-identical requests; with the cache
+enabled those are answered locally instead of paying the provider's latency and cost.
+
+Entries are keyed on the model's LLM string (provider, model, temperature and bound
+tool schema, as reported by LangChain) and the normalized message list. The cache is
+bounded: once it holds more than `max_entries` responses, the least recently used
+ones are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from ralph.config import CacheConfig
+
+READ_WRITE = "read-write"
+READ_ONLY = "read-only"
+OFF = "off"
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """Return the prompt (serialized messages) in canonical JSON form."""
+    try:
+        return json.dumps(json.loads(prompt), sort_keys=True, separators=(",", ":"))
+    except json.JSONDecodeError:
+        return prompt
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Return the cache key for a request.
+
+    Args:
+        prompt (str): The serialized message list.
+        llm_string (str): The model's LLM string (provider, parameters and bound tools).
+
+    Returns:
+        str: The hex digest identifying the request.
+    """
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _dump_generations(generations: Sequence[Generation]) -> str:
+    """Serialize generations to JSON."""
+    return json.dumps([
+        {"text": g.text, "message": message_to_dict(g.message)} if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+
+def _load_generations(value: str) -> list[Generation]:
+    """Deserialize generations stored by `_dump_generations`."""
+    generations: list[Generation] = []
+    for item in json.loads(value):
+        if "message" in item:
+            generations.append(ChatGeneration(message=messages_from_dict([item["message"]])[0]))
+        else:
+            generations.append(Generation(text=item["text"]))
+    return generations
+
+
+class SqliteLLMCache(BaseCache):
+    """
+    Size-bounded LRU cache of model responses stored in SQLite.
+
+    Attributes:
+        path (Path): The database file.
+        max_entries (int): Maximum number of cached responses.
+        mode (str): "read-write" or "read-only". A read-only cache replays stored responses
+            but never records new ones.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found in the cache.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 10000, mode: str = READ_WRITE):
+        self.path = Path(path)
+        self.max_entries = max(1, max_entries)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """
+        Look up a response.
+
+        Args:
+            prompt (str): The serialized message list.
+            llm_string (str): The model's LLM string.
+
+        Returns:
+            RETURN_VAL_TYPE | None: The cached generations, or None on a miss.
+        """
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == READ_WRITE:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        return _load_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """
+        Store a response, evicting the least recently used ones beyond `max_entries`.
+
+        Args:
+            prompt (str): The serialized message list.
+            llm_string (str): The model's LLM string.
+            return_val (RETURN_VAL_TYPE): The generations to store.
+        """
+        if self.mode != READ_WRITE:
+            return
+        key = cache_key(prompt, llm_string)
+        value = _dump_generations(return_val)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, last_used) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        """
+        Remove every cached response.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> str:
+        """
+        Return a one-line summary of the cache counters.
+
+        Returns:
+            str: The summary.
+        """
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"LLM cache ({self.mode}): {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+
+# Open caches, shared by every model constructed in this process
+_caches: dict[tuple, SqliteLLMCache] = {}
+
+
+def llm_cache(config: CacheConfig) -> SqliteLLMCache | None:
+    """
+    Return the response cache selected by the configuration.
+
+    Args:
+        config (CacheConfig): The cache configuration.
+
+    Returns:
+        SqliteLLMCache | None: The shared cache, or None if caching is off.
+    """
+    if config.mode == OFF:
+        return None
+    path = Path(os.path.expanduser(config.path)).resolve()
+    key = (str(path), config.max_entries, config.mode)
+    if key not in _caches:
+        _caches[key] = SqliteLLMCache(path, max_entries=config.max_entries, mode=config.mode)
+    return _caches[key]
+
+
+def open_caches() -> list[SqliteLLMCache]:
+    """
+    Return the caches opened by this process.
+
+    Returns:
+        list[SqliteLLMCache]: The open caches.
+    """
+    return list(_caches.values())
@@ -0,0 +1,251 @@
+"""
+Checkpoint module for Ralph.
+
+This module provides a file-backed LangGraph checkpointer so that `loop` runs can be
+resumed after a crash without replaying (and re-paying for) earlier iterations.
+
+The stock SQLite saver serializes the whole state on every step, which for the loop
+means rewriting the entire message history each time. `DeltaSqliteSaver` stores each
+message once, keyed by id and content digest, and the checkpoint itself only keeps the
+ordered list of references. A step therefore writes only the messages it added or changed.
+"""
+
+import asyncio
+import hashlib
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+# Location of the checkpoint database, relative to the working directory
+CHECKPOINT_DIR = ".ralph"
+CHECKPOINT_FILE = "checkpoints.sqlite"
+
+# Marker key used in place of a message list inside a stored checkpoint
+_REFS_KEY = "__ralph_message_refs__"
+
+
+class DeltaSqliteSaver(SqliteSaver):
+    """
+    SQLite checkpointer that stores message channels incrementally.
+
+    Attributes:
+        delta_channels (tuple[str, ...]): Channels holding message lists that are stored by reference.
+    """
+
+    delta_channels: tuple[str, ...] = ("messages",)
+
+    def setup(self) -> None:
+        """
+        Set up the checkpoint database, including the message table.
+        """
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                message_id TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, message_id, digest)
+            );
+            """
+        )
+
+    def _store_messages(self, thread_id: str, checkpoint_ns: str, messages: list[BaseMessage]) -> list[list[str]] | None:
+        """
+        Store any new or changed messages and return their references.
+
+        Returns:
+            list[list[str]] | None: `[message_id, digest]` pairs, or None if a message has no id
+                and the channel must be stored in full.
+        """
+        if any(not isinstance(m, BaseMessage) or not m.id for m in messages):
+            return None
+
+        refs = []
+        rows = []
+        for message in messages:
+            type_, value = self.serde.dumps_typed(message)
+            digest = hashlib.sha1(value).hexdigest()
+            refs.append([message.id, digest])
+            rows.append((thread_id, checkpoint_ns, message.id, digest, type_, value))
+
+        with self.cursor() as cur:
+            # Messages already stored by an earlier step are skipped, so only the delta is written
+            cur.executemany(
+                "INSERT OR IGNORE INTO messages (thread_id, checkpoint_ns, message_id, digest, type, value) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return refs
+
+    def _load_messages(self, thread_id: str, checkpoint_ns: str, refs: list[list[str]]) -> list[BaseMessage]:
+        """
+        Load the messages referenced by a stored checkpoint, in order.
+        """
+        if not refs:
+            return []
+
+        ids = sorted({message_id for message_id, _ in refs})
+        loaded: dict[tuple[str, str], BaseMessage] = {}
+        with self.cursor(transaction=False) as cur:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                cur.execute(
+                    f"SELECT message_id, digest, type, value FROM messages WHERE thread_id = ? AND checkpoint_ns = ? AND message_id IN ({placeholders})",
+                    (thread_id, checkpoint_ns, *chunk),
+                )
+                for message_id, digest, type_, value in cur.fetchall():
+                    loaded[(message_id, digest)] = self.serde.loads_typed((type_, value))
+
+        return [loaded[(message_id, digest)] for message_id, digest in refs]
+
+    def _rehydrate(self, checkpoint_tuple: CheckpointTuple | None) -> CheckpointTuple | None:
+        """
+        Replace message references in a loaded checkpoint with the messages themselves.
+        """
+        if checkpoint_tuple is None:
+            return None
+
+        configurable = checkpoint_tuple.config["configurable"]
+        channel_values = checkpoint_tuple.checkpoint.get("channel_values", {})
+        for channel in self.delta_channels:
+            value = channel_values.get(channel)
+            if isinstance(value, dict) and _REFS_KEY in value:
+                channel_values[channel] = self._load_messages(
+                    str(configurable["thread_id"]), configurable.get("checkpoint_ns", ""), value[_REFS_KEY]
+                )
+        return checkpoint_tuple
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """
+        Get a checkpoint tuple, loading referenced messages.
+        """
+        return self._rehydrate(super().get_tuple(config))
+
+    def list(self, config: RunnableConfig | None, **kwargs: Any) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints, loading referenced messages.
+        """
+        for checkpoint_tuple in super().list(config, **kwargs):
+            yield self._rehydrate(checkpoint_tuple)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Save a checkpoint, storing message channels by reference.
+        """
+        self.setup()
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        channel_values = dict(checkpoint.get("channel_values", {}))
+        for channel in self.delta_channels:
+            value = channel_values.get(channel)
+            if isinstance(value, list):
+                refs = self._store_messages(thread_id, checkpoint_ns, value)
+                if refs is not None:
+                    channel_values[channel] = {_REFS_KEY: refs}
+
+        return super().put(config, {**checkpoint, "channel_values": channel_values}, metadata, new_versions)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """
+        Delete all checkpoints, writes and stored messages of a thread.
+        """
+        self.setup()
+        with self.cursor() as cur:
+            for table in ("checkpoints", "writes", "messages"):
+                cur.execute(f"DELETE FROM {table} WHERE thread_id = ?", (str(thread_id),))
+
+    # The stock SqliteSaver only supports sync access. SQLite calls are short, so the
+    # async methods run them in a worker thread to keep the event loop free.
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """
+        Get a checkpoint tuple asynchronously.
+        """
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: RunnableConfig | None, **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        """
+        List checkpoints asynchronously.
+        """
+        for checkpoint_tuple in await asyncio.to_thread(lambda: list(self.list(config, **kwargs))):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Save a checkpoint asynchronously.
+        """
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Store intermediate writes asynchronously.
+        """
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        Delete a thread asynchronously.
+        """
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def checkpoint_path(directory: str) -> Path:
+    """
+    Return the checkpoint database path for a working directory.
+
+    Args:
+        directory (str): The working directory.
+
+    Returns:
+        Path: The path of the SQLite checkpoint file.
+    """
+    return Path(directory) / CHECKPOINT_DIR / CHECKPOINT_FILE
+
+
+@contextmanager
+def open_checkpointer(directory: str) -> Iterator[DeltaSqliteSaver]:
+    """
+    Open the file-backed checkpointer for a working directory.
+
+    Args:
+        directory (str): The working directory. The database is created under `.ralph/`.
+
+    Yields:
+        DeltaSqliteSaver: The checkpointer, closed on exit.
+    """
+    path = checkpoint_path(directory)
+    os.makedirs(path.parent, exist_ok=True)
+    with DeltaSqliteSaver.from_conn_string(str(path)) as saver:
+        yield saver
@@ -8,8 +8,14 @@ including commands for running agents, asking questions, and checking version.
 import click
 import sys
 from importlib.metadata import version as get_version, PackageNotFoundError
-from ralph.config import RalphConfig
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+# Commands import their dependencies (configuration, LangChain, provider SDKs) when
+# they run, so that `ralph version` and `ralph --help` start quickly.
+if TYPE_CHECKING:
+    from ralph.config import RalphConfig
+    from ralph.standin import StandinSettings
 
 
 # https://stackoverflow.com/questions/242485/starting-python-debugger-automatically-on-error
@@ -83,6 +89,56 @@ def shared_options(function):
 
 
 
+def cache_option(function):
+    """
+    Decorator to add the `--cache-mode` option to a command.
+
+    Args:
+        function (callable): The command function to decorate.
+
+    Returns:
+        callable: The decorated command function.
+    """
+    return click.option(
+        "--cache-mode",
+        default=None,
+        type=click.Choice(["read-write", "read-only", "off"]),
+        help="Model response cache: record and replay, replay only, or off. Overrides cache.mode.",
+    )(function)
+
+
+def load_config(config, secrets, cache_mode: str | None = None) -> "RalphConfig":
+    """
+    Load the configuration from the command options.
+
+    Args:
+        config (file): The configuration file object.
+        secrets (str): The path to the secrets directory.
+        cache_mode (str | None, optional): Overrides `cache.mode` when given. Defaults to None.
+
+    Returns:
+        RalphConfig: The loaded configuration.
+    """
+    from ralph.config import RalphConfig
+
+    # config is a file object (BufferedReader) due to click.File("rb")
+    # secrets is a string due to click.Path()
+    configObj = RalphConfig.from_yaml_and_secrets_dir(Path(config.name), Path(secrets))
+    if cache_mode:
+        configObj.cache.mode = cache_mode
+    return configObj
+
+
+def echo_cache_stats():
+    """
+    Print the hit/miss counters of the response caches used by the command.
+    """
+    from ralph.cache import open_caches
+
+    for cache in open_caches():
+        click.echo(cache.stats())
+
+
 @cli.command(name="version")
 def version_cmd():
     """Prints the version of the application."""
@@ -94,8 +150,9 @@ def version_cmd():
 
 @cli.command(name="ask")
 @shared_options
+@cache_option
 @click.argument("question")
-def ask_cmd(ctx, config, secrets, question):
+def ask_cmd(ctx, config, secrets, question, cache_mode):
     """
     Ask a question to the LLM.
 
@@ -104,20 +161,23 @@ def ask_cmd(ctx, config, secrets, question):
         config (file): The configuration file object.
         secrets (str): The path to the secrets directory.
         question (str): The question to ask the LLM.
+        cache_mode (str | None): Overrides the response cache mode.
     """
     try:
-        # config is a file object (BufferedReader) due to click.File("rb")
-        # secrets is a string due to click.Path()
-
-        config_path = Path(config.name)
-        secrets_path = Path(secrets)
-
-        configObj = RalphConfig.from_yaml_and_secrets_dir(config_path, secrets_path)
+        configObj = load_config(config, secrets, cache_mode)
 
         from ralph.llm import get_chain
         chain = get_chain(configObj)
-        response = chain.invoke({"question": question})
-        click.echo(response)
+        # Streamed responses bypass the response cache
+        if configObj.aiclient.streaming and not configObj.cache.active:
+            # Print tokens as they arrive
+            for chunk in chain.stream({"question": question}):
+                click.echo(chunk, nl=False)
+            click.echo()
+        else:
+            response = chain.invoke({"question": question})
+            click.echo(response)
+        echo_cache_stats()
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
 
@@ -126,7 +186,8 @@ def ask_cmd(ctx, config, secrets, question):
 @click.argument("workdir", type=click.Path(exists=True, writable=True, dir_okay=True))
 @click.argument("instruction_file", type=click.Path(exists=True))
 @click.option("--limit", "-l", default=1, type=int, help="Max iterations.")
-def react_cmd(ctx, config, secrets, instruction_file, workdir, limit):
+@cache_option
+def react_cmd(ctx, config, secrets, instruction_file, workdir, limit, cache_mode):
     """
     Run the Ralph react agent.
 
@@ -137,18 +198,14 @@ def react_cmd(ctx, config, secrets, instruction_file, workdir, limit):
         instruction_file (str): The path to the file containing instructions.
         workdir (str): The working directory path.
         limit (int): Max iterations for the agent loop. Defaults to 1.
+        cache_mode (str | None): Overrides the response cache mode.
     """
     try:
-        # config is a file object (BufferedReader) due to click.File("rb")
-        # secrets is a string due to click.Path()
-
-        config_path = Path(config.name)
-        secrets_path = Path(secrets)
-
-        configObj = RalphConfig.from_yaml_and_secrets_dir(config_path, secrets_path)
+        configObj = load_config(config, secrets, cache_mode)
 
         from ralph.react import run_react
         run_react(instruction_file, workdir, limit, configObj)
+        echo_cache_stats()
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
 
@@ -159,7 +216,9 @@ def react_cmd(ctx, config, secrets, instruction_file, workdir, limit):
 @click.argument("workdir", type=click.Path(exists=True, writable=True, dir_okay=True))
 @click.argument("instruction_file", type=click.Path(exists=True))
 @click.option("--limit", "-l", default=1, type=int, help="Max iterations.")
-def loop_cmd(ctx, config, secrets, instruction_file, workdir, limit):
+@click.option("--resume", default=None, type=str, metavar="THREAD", help="Resume a previous run from its last committed step.")
+@cache_option
+def loop_cmd(ctx, config, secrets, instruction_file, workdir, limit, resume, cache_mode):
     """
     Run the Ralph loop agent.
 
@@ -170,18 +229,162 @@ def loop_cmd(ctx, config, secrets, instruction_file, workdir, limit):
         instruction_file (str): The path to the file containing instructions.
         workdir (str): The working directory path.
         limit (int): Max iterations for the agent loop. Defaults to 1.
+        resume (str | None): Thread id of a previous run to resume.
+        cache_mode (str | None): Overrides the response cache mode.
     """
     try:
-        # config is a file object (BufferedReader) due to click.File("rb")
-        # secrets is a string due to click.Path()
+        configObj = load_config(config, secrets, cache_mode)
 
-        config_path = Path(config.name)
-        secrets_path = Path(secrets)
+        from ralph.graph import run_loop
+        run_loop(instruction_file, workdir, limit, configObj, resume=resume)
+        echo_cache_stats()
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
 
-        configObj = RalphConfig.from_yaml_and_secrets_dir(config_path, secrets_path)
 
-        from ralph.graph import run_loop
-        run_loop(instruction_file, workdir, limit, configObj)
+@cli.command(name="fleet")
+@shared_options
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", "-w", default=4, type=int, help="Max loops running concurrently.")
+@click.option("--max-llm-requests", default=4, type=int, help="Max concurrent LLM requests across all loops.")
+@click.option("--report", default=None, type=click.Path(dir_okay=False, writable=True), help="Write the aggregated report as JSON.")
+def fleet_cmd(ctx, config, secrets, manifest, workers, max_llm_requests, report):
+    """
+    Run Ralph loops over many workspaces concurrently.
+
+    Args:
+        ctx (click.Context): The Click context.
+        config (file): The configuration file object.
+        secrets (str): The path to the secrets directory.
+        manifest (str): YAML manifest of (workdir, instruction_file, limit) entries.
+        workers (int): Max loops running concurrently.
+        max_llm_requests (int): Max concurrent LLM requests across all loops.
+        report (str | None): Optional path for the JSON report.
+    """
+    try:
+        configObj = load_config(config, secrets)
+
+        from ralph.fleet import FleetManifest, run_fleet, format_report, write_report
+        fleet = FleetManifest.from_yaml(Path(manifest))
+        reports = run_fleet(fleet, configObj, workers=workers, max_llm_requests=max_llm_requests)
+        click.echo(format_report(reports))
+        if report:
+            write_report(reports, Path(report))
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+
+
+def standin_options(function):
+    """
+    Decorator to add the stand-in server behaviour options to a command.
+
+    Args:
+        function (callable): The command function to decorate.
+
+    Returns:
+        callable: The decorated command function.
+    """
+    options = [
+        click.option("--latency", default=0.0, type=float, show_default=True, help="Seconds before the first byte of every response."),
+        click.option("--jitter", default=0.0, type=float, show_default=True, help="Extra latency drawn uniformly from [0, jitter] seconds."),
+        click.option("--tokens-per-second", default=0.0, type=float, show_default=True, help="Reply token rate; 0 sends tokens instantly."),
+        click.option("--error-rate", default=0.0, type=click.FloatRange(0, 1), show_default=True, help="Fraction of requests answered with an error."),
+        click.option("--error-status", default=500, type=click.IntRange(400, 599), show_default=True, help="HTTP status of injected errors."),
+        click.option("--steps", default=4, type=int, show_default=True, help="Tool calls of the default script before it calls done."),
+        click.option("--responses", default=None, type=click.Path(exists=True, dir_okay=False), help="JSON or JSONL file of recorded replies to serve instead of the script."),
+        click.option("--seed", default=None, type=int, help="Seed of the jitter and error injection."),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+def standin_settings(**options) -> "StandinSettings":
+    """
+    Build the stand-in server settings from the command options.
+
+    Args:
+        **options: The values of the `standin_options`.
+
+    Returns:
+        StandinSettings: The settings.
+    """
+    from ralph.standin import StandinSettings
+
+    return StandinSettings(**options)
+
+
+@cli.command(name="standin")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on.")
+@click.option("--port", default=11434, type=int, show_default=True, help="Port to listen on.")
+@standin_options
+def standin_cmd(host, port, **options):
+    """
+    Serve a local stand-in LLM with scripted or recorded responses.
+
+    The server speaks the Ollama and (Azure) OpenAI chat APIs: point
+    `aiclient.ollama_base_url` or `aiclient.azure_endpoint` at it.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        **options: Latency, token rate, error and script options.
+    """
+    from ralph.standin import StandinServer
+
+    server = StandinServer(standin_settings(**options), host=host, port=port)
+    click.echo(f"Stand-in LLM serving on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        stats = server.stats()
+        click.echo(f"Served {stats['requests']} requests ({stats['errors']} errors).")
+
+
+@cli.command(name="bench")
+@click.option("--loops", "-n", default=8, type=click.IntRange(min=1), show_default=True, help="Number of loops to run.")
+@click.option("--limit", "-l", default=10, type=int, show_default=True, help="Max iterations per loop.")
+@click.option("--workers", "-w", default=4, type=int, show_default=True, help="Max loops running concurrently.")
+@click.option("--max-llm-requests", default=4, type=int, show_default=True, help="Max concurrent LLM requests across all loops.")
+@click.option("--provider", default="ollama", type=click.Choice(["ollama", "azure_openai"]), show_default=True, help="Client used to reach the stand-in server.")
+@click.option("--stream/--no-stream", default=True, show_default=True, help="Stream model responses in the agent.")
+@click.option("--report", default=None, type=click.Path(dir_okay=False, writable=True), help="Write the report as JSON.")
+@click.option("--verbose", "-v", is_flag=True, help="Print the output of the loops.")
+@standin_options
+def bench_cmd(loops, limit, workers, max_llm_requests, provider, stream, report, verbose, **options):
+    """
+    Run loops against a local stand-in LLM and report throughput, latency and errors.
+
+    Args:
+        loops (int): Number of loops to run.
+        limit (int): Max iterations per loop.
+        workers (int): Max loops running concurrently.
+        max_llm_requests (int): Max concurrent LLM requests across all loops.
+        provider (str): Client used to reach the stand-in server.
+        stream (bool): Stream model responses in the agent.
+        report (str | None): Optional path for the JSON report.
+        verbose (bool): Print the output of the loops.
+        **options: Latency, token rate, error and script options of the stand-in server.
+    """
+    try:
+        from ralph.bench import run_bench, format_bench
+
+        result = run_bench(
+            standin_settings(**options),
+            loops=loops,
+            limit=limit,
+            workers=workers,
+            max_llm_requests=max_llm_requests,
+            provider=provider,
+            streaming=stream,
+            verbose=verbose,
+        )
+        click.echo(format_bench(result))
+        if report:
+            Path(report).write_text(result.model_dump_json(indent=2), encoding="utf-8")
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
 
@@ -0,0 +1,217 @@
+"""
+Command module for Ralph.
+
+This module runs shell commands for the `run_command` tool. Output is read
+incrementally as the command runs and only a bounded head and tail of each stream
+is kept, together with the total byte count, so a noisy command cannot flood the
+message history. Commands run in their own process group; on timeout the whole
+group is killed so that no child keeps running after the tool returns. When the
+command exits normally, background children it started keep running, unless they
+still hold its output pipes open after `_DRAIN_TIMEOUT`; the group is then killed so
+the tool can return.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+
+from ralph import tracing
+
+# Bytes read from a pipe at a time
+_READ_SIZE = 65536
+
+# Seconds to wait for the output pipes to close after the command exited or was killed
+_DRAIN_TIMEOUT = 5
+
+# Seconds between checks of an async command's exit status
+_POLL_INTERVAL = 0.1
+
+
+class OutputBuffer:
+    """
+    Keeps the first and last bytes of a stream and counts the rest.
+
+    Attributes:
+        limit (int): Maximum number of bytes kept (head and tail together).
+        total (int): Number of bytes received.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(2, limit)
+        self.total = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._head_limit = self.limit // 2
+        self._tail_limit = self.limit - self._head_limit
+
+    def feed(self, data: bytes):
+        """
+        Add a chunk of output.
+
+        Args:
+            data (bytes): The chunk.
+        """
+        self.total += len(data)
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data:
+            self._tail += data
+            if len(self._tail) > self._tail_limit:
+                del self._tail[:len(self._tail) - self._tail_limit]
+
+    def text(self) -> str:
+        """
+        Return the kept output, marking where bytes were dropped.
+
+        Returns:
+            str: The decoded output.
+        """
+        head = self._head.decode("utf-8", errors="replace")
+        tail = self._tail.decode("utf-8", errors="replace")
+        omitted = self.total - len(self._head) - len(self._tail)
+        if omitted <= 0:
+            return head + tail
+        return f"{head}\n... [{omitted} of {self.total} bytes omitted] ...\n{tail}"
+
+
+def _kill_group(pid: int):
+    """Kill a process group, ignoring groups that already exited."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _await_exit(process: asyncio.subprocess.Process, timeout: float) -> bool:
+    """
+    Wait for an async command to exit and return whether it did within the timeout.
+
+    `process.wait()` only returns once the output pipes are closed as well, which
+    background children may keep open; the exit status is therefore checked too.
+    """
+    waiter = asyncio.ensure_future(process.wait())
+    deadline = asyncio.get_running_loop().time() + timeout
+    while process.returncode is None:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return False
+        await asyncio.wait([waiter], timeout=min(remaining, _POLL_INTERVAL))
+    return True
+
+
+def _format(stdout: OutputBuffer, stderr: OutputBuffer, returncode: int | None, timeout: float | None) -> str:
+    """Format the result of a command for the agent, and record it on the active tracing span."""
+    tracing.annotate_current({
+        "process.exit_code": returncode,
+        "ralph.command.timed_out": timeout is not None,
+        "ralph.command.output_bytes": stdout.total + stderr.total,
+    })
+    result = f"stdout:\n{stdout.text()}\nstderr:\n{stderr.text()}"
+    if timeout is not None:
+        return result + f"\nError: command timed out after {timeout:g}s; its process group was killed."
+    return result + f"\nexit code: {returncode}"
+
+
+def run_shell(command: str, cwd: str, timeout: float, max_bytes: int) -> str:
+    """
+    Run a shell command with bounded output capture.
+
+    Args:
+        command (str): The shell command.
+        cwd (str): The working directory.
+        timeout (float): Seconds before the command's process group is killed.
+        max_bytes (int): Bytes kept per stream (head and tail).
+
+    Returns:
+        str: The stdout and stderr output and the exit code, or a timeout error.
+    """
+    stdout, stderr = OutputBuffer(max_bytes), OutputBuffer(max_bytes)
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    def pump(pipe, buffer: OutputBuffer):
+        with pipe:
+            for chunk in iter(lambda: pipe.read1(_READ_SIZE), b""):
+                buffer.feed(chunk)
+
+    readers = [
+        threading.Thread(target=pump, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=pump, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = None
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = timeout
+        _kill_group(process.pid)
+        process.wait()
+    for reader in readers:
+        reader.join(_DRAIN_TIMEOUT)
+    if any(reader.is_alive() for reader in readers):
+        # Background children still holding the output pipes would block the readers
+        _kill_group(process.pid)
+        for reader in readers:
+            reader.join(_DRAIN_TIMEOUT)
+    return _format(stdout, stderr, process.returncode, timed_out)
+
+
+async def arun_shell(command: str, cwd: str, timeout: float, max_bytes: int) -> str:
+    """
+    Run a shell command asynchronously with bounded output capture.
+
+    Args:
+        command (str): The shell command.
+        cwd (str): The working directory.
+        timeout (float): Seconds before the command's process group is killed.
+        max_bytes (int): Bytes kept per stream (head and tail).
+
+    Returns:
+        str: The stdout and stderr output and the exit code, or a timeout error.
+    """
+    stdout, stderr = OutputBuffer(max_bytes), OutputBuffer(max_bytes)
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    async def pump(stream: asyncio.StreamReader, buffer: OutputBuffer):
+        while chunk := await stream.read(_READ_SIZE):
+            buffer.feed(chunk)
+
+    readers = asyncio.gather(pump(process.stdout, stdout), pump(process.stderr, stderr))
+    timed_out = None
+    if not await _await_exit(process, timeout):
+        timed_out = timeout
+        _kill_group(process.pid)
+        await _await_exit(process, _DRAIN_TIMEOUT)
+    done, _ = await asyncio.wait([readers], timeout=_DRAIN_TIMEOUT)
+    if not done:
+        # Background children still holding the output pipes would block the readers
+        _kill_group(process.pid)
+        try:
+            await asyncio.wait_for(readers, timeout=_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    try:
+        await asyncio.wait_for(process.wait(), timeout=_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    return _format(stdout, stderr, process.returncode, timed_out)
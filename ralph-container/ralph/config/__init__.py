@@ -22,15 +22,139 @@ from pydantic_settings import (
     NestedSecretsSettingsSource,
     SettingsConfigDict,
 )
+from ralph.config.tool import ToolBoxConfig
 
-class ToolBoxConfig(BaseModel):
+class ContextConfig(BaseModel):
     """
-    Configuration for the toolbox.
+    Configuration for the context window manager.
 
     Attributes:
-        allowed_tools (list[str]): List of allowed tools.
+        enabled (bool): Whether to keep the message history within the token budget. Defaults to True.
+        reserve_tokens (int): Tokens of `context_length` reserved for the model response. Defaults to 1024.
+        keep_recent_messages (int): Number of most recent messages that are never compacted. Defaults to 6.
+        truncate_tool_output_tokens (int): Size older tool outputs are truncated to. Defaults to 256.
+        chars_per_token (float): Characters per token used to estimate token counts. Defaults to 4.0.
     """
-    allowed_tools: list[str] = Field(default_factory=list, description="List of allowed tools")
+    enabled: bool = Field(default=True, description="Whether to keep the message history within the token budget")
+    reserve_tokens: int = Field(default=1024, description="Tokens of the context length reserved for the model response")
+    keep_recent_messages: int = Field(default=6, description="Number of most recent messages that are never compacted")
+    truncate_tool_output_tokens: int = Field(default=256, description="Size in tokens that older tool outputs are truncated to")
+    chars_per_token: float = Field(default=4.0, description="Characters per token used to estimate token counts")
+
+
+class CacheConfig(BaseModel):
+    """
+    Configuration for the on-disk model response cache.
+
+    Attributes:
+        mode (Literal["read-write", "read-only", "off"]): "read-write" records and replays responses,
+            "read-only" only replays them. Defaults to "off".
+        path (str): The cache database file. Defaults to "~/.cache/ralph/llm-cache.sqlite".
+        max_entries (int): Maximum number of cached responses; least recently used ones are evicted. Defaults to 10000.
+    """
+    mode: Literal["read-write", "read-only", "off"] = Field(default="off", description="Whether to record and/or replay model responses")
+    path: str = Field(default="~/.cache/ralph/llm-cache.sqlite", description="The cache database file")
+    max_entries: int = Field(default=10000, description="Maximum number of cached responses")
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether responses are looked up in the cache.
+        """
+        return self.mode != "off"
+
+
+class PromptCacheConfig(BaseModel):
+    """
+    Configuration for provider-side prompt caching of the static prompt prefix.
+
+    Attributes:
+        enabled (bool): Whether to use the provider's prompt cache. Gemini stores the system prompt and
+            tool declarations as cached content (billed for storage); OpenAI-compatible providers
+            get a stable `prompt_cache_key`. Defaults to False.
+        ttl_seconds (int): Lifetime of Gemini cached content; it is recreated a minute before it expires,
+            so it must be longer than 60. Defaults to 3600.
+        min_tokens (int): Estimated prefix size below which no cached content is created. Defaults to 4096.
+    """
+    enabled: bool = Field(default=False, description="Whether to use provider-side prompt caching")
+    ttl_seconds: int = Field(default=3600, gt=60, description="Lifetime of Gemini cached content in seconds (over 60)")
+    min_tokens: int = Field(default=4096, description="Estimated prefix size below which no cached content is created")
+
+
+class MetricsConfig(BaseModel):
+    """
+    Configuration for loop metrics (LLM latency and tokens, node and tool wall time, tool output size).
+
+    Attributes:
+        enabled (bool): Whether to record metrics. Defaults to True.
+        path (str | None): JSONL file receiving one record per iteration, relative to the working
+            directory. Defaults to ".ralph/metrics.jsonl"; None disables the file.
+        summary (bool): Whether to print a summary table at the end of a run. Defaults to True.
+    """
+    enabled: bool = Field(default=True, description="Whether to record loop metrics")
+    path: str | None = Field(default=".ralph/metrics.jsonl", description="JSONL file for per-iteration records, relative to the workdir")
+    summary: bool = Field(default=True, description="Whether to print a summary table at the end of a run")
+
+
+class TracingConfig(BaseModel):
+    """
+    Configuration for OpenTelemetry tracing (requires the optional `opentelemetry-sdk` package).
+
+    Attributes:
+        enabled (bool): Whether to record spans. Defaults to False.
+        exporter (Literal["otlp", "file"]): Export spans over OTLP/HTTP or append them to a JSONL file. Defaults to "file".
+        endpoint (str | None): OTLP traces endpoint; if None the standard `OTEL_EXPORTER_OTLP_*`
+            environment variables apply. Defaults to None.
+        path (str): File for the file exporter, relative to the directory Ralph is started from.
+            Defaults to "ralph-traces.jsonl".
+        service_name (str): The `service.name` resource attribute. Defaults to "ralph".
+    """
+    enabled: bool = Field(default=False, description="Whether to record OpenTelemetry spans")
+    exporter: Literal["otlp", "file"] = Field(default="file", description="Span exporter: OTLP/HTTP or a local JSONL file")
+    endpoint: str | None = Field(default=None, description="OTLP traces endpoint, e.g. http://localhost:4318/v1/traces")
+    path: str = Field(default="ralph-traces.jsonl", description="File for the file exporter")
+    service_name: str = Field(default="ralph", description="The service.name resource attribute")
+
+
+class SchedulerConfig(BaseModel):
+    """
+    Configuration for the LLM request scheduler of the loop agent (retries, backoff and rate limits).
+
+    Attributes:
+        enabled (bool): Whether LLM calls go through the scheduler. The provider SDKs' own retries
+            are disabled while it is enabled. Defaults to True.
+        max_retries (int): Retries of a call failing with 429, 5xx, a timeout or a connection error. Defaults to 4.
+        initial_backoff (float): Upper bound of the jittered backoff before the first retry, in seconds;
+            it doubles with every retry. Defaults to 1.0.
+        max_backoff (float): Upper bound of any wait before a retry, including `Retry-After`. Defaults to 60.0.
+        requests_per_minute (int | None): Requests per minute per provider, shared by every loop in
+            the process. Defaults to None (unlimited).
+        tokens_per_minute (int | None): Tokens (prompt and output) per minute per provider, shared by
+            every loop in the process. Defaults to None (unlimited).
+    """
+    enabled: bool = Field(default=True, description="Whether LLM calls go through the scheduler")
+    max_retries: int = Field(default=4, ge=0, description="Retries of a call failing with 429, 5xx, a timeout or a connection error")
+    initial_backoff: float = Field(default=1.0, ge=0, description="Upper bound of the backoff before the first retry, in seconds")
+    max_backoff: float = Field(default=60.0, ge=0, description="Upper bound of any wait before a retry, including Retry-After")
+    requests_per_minute: int | None = Field(default=None, gt=0, description="Requests per minute per provider")
+    tokens_per_minute: int | None = Field(default=None, gt=0, description="Tokens per minute per provider")
+
+
+class PrefetchConfig(BaseModel):
+    """
+    Configuration for prefetching likely-needed files while the loop agent waits for the model.
+
+    Attributes:
+        enabled (bool): Whether to prefetch. Defaults to False.
+        max_bytes (int): Memory cap of the prefetched file contents. Defaults to 32 MiB.
+        max_file_bytes (int): Files larger than this are only advised to the OS page cache, not
+            kept in memory. Defaults to 1 MiB.
+        max_files (int): Files considered per model call. Defaults to 32.
+    """
+    enabled: bool = Field(default=False, description="Whether to prefetch likely-needed files during model calls")
+    max_bytes: int = Field(default=32 * 1024 * 1024, ge=0, description="Memory cap of the prefetched file contents")
+    max_file_bytes: int = Field(default=1024 * 1024, ge=0, description="Largest file kept in memory")
+    max_files: int = Field(default=32, ge=1, description="Files considered per model call")
 
 
 class LangchainConfig(BaseModel):
@@ -61,6 +185,8 @@ class LangchainConfig(BaseModel):
         stop_sequences (list[str]): List of sequences that will stop generation.
         timeout (int): Timeout in seconds for model API calls. Defaults to 60.
         streaming (bool): Whether to stream responses from the model. Defaults to True.
+        input_cost_per_million (float): Price of one million input tokens, for cost tracking. Defaults to 0.
+        output_cost_per_million (float): Price of one million output tokens, for cost tracking. Defaults to 0.
     """
 
     model_provider: Literal["azure_openai", "github", "google_genai", "ollama"] = Field(default="google_genai", description="Provider for the model: 'azure' or 'github'")
@@ -111,6 +237,8 @@ class LangchainConfig(BaseModel):
     stop_sequences: list[str] = Field(default_factory=list, description="List of sequences that will stop generation")
     timeout: int = Field(default=60, description="Timeout in seconds for model API calls")
     streaming: bool = Field(default=True, description="Whether to stream responses from the model")
+    input_cost_per_million: float = Field(default=0.0, ge=0, description="Price of one million input tokens")
+    output_cost_per_million: float = Field(default=0.0, ge=0, description="Price of one million output tokens")
 
     model_config = ConfigDict(extra="forbid")
 
@@ -137,6 +265,23 @@ class LangchainConfig(BaseModel):
         return v
 
 
+class RouterConfig(BaseModel):
+    """
+    Configuration for the model router of the loop agent.
+
+    Attributes:
+        fallbacks (list[LangchainConfig]): Providers tried in order when `aiclient` fails or times
+            out (after the scheduler's retries). Defaults to none.
+        cheap (LangchainConfig | None): Smaller or local model for cheap steps: summarizing older
+            tool outputs during context compaction and recovering tool calls written as text.
+            Defaults to None (outputs are truncated and no recovery is attempted).
+        cooldown_seconds (float): How long a failed provider is skipped before it is tried again. Defaults to 60.
+    """
+    fallbacks: list[LangchainConfig] = Field(default_factory=list, description="Providers tried in order when aiclient fails")
+    cheap: LangchainConfig | None = Field(default=None, description="Model for cheap steps (summaries, tool call recovery)")
+    cooldown_seconds: float = Field(default=60.0, ge=0, description="How long a failed provider is skipped")
+
+
 class RalphConfig(BaseSettings):
     """
     Main configuration for the Ralph service.
@@ -145,11 +290,27 @@ class RalphConfig(BaseSettings):
         logging (dict[str, Any]): Logging configuration.
         aiclient (LangchainConfig): AI Client configuration.
         toolbox (ToolBoxConfig): Toolbox configuration.
+        context (ContextConfig): Context window manager configuration.
+        cache (CacheConfig): Model response cache configuration.
+        prompt_cache (PromptCacheConfig): Provider prompt cache configuration.
+        metrics (MetricsConfig): Loop metrics configuration.
+        tracing (TracingConfig): OpenTelemetry tracing configuration.
+        scheduler (SchedulerConfig): LLM request scheduler configuration.
+        router (RouterConfig): Model router configuration (fallback providers and the cheap model).
+        prefetch (PrefetchConfig): File prefetch configuration.
     """
 
     logging: dict[str, Any] = Field(default_factory=dict, description="Logging configuration")
     aiclient: LangchainConfig = Field(description="AI Client configuration")
     toolbox: ToolBoxConfig = Field(default_factory=ToolBoxConfig, description="Toolbox configuration")
+    context: ContextConfig = Field(default_factory=ContextConfig, description="Context window manager configuration")
+    cache: CacheConfig = Field(default_factory=CacheConfig, description="Model response cache configuration")
+    prompt_cache: PromptCacheConfig = Field(default_factory=PromptCacheConfig, description="Provider prompt cache configuration")
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig, description="Loop metrics configuration")
+    tracing: TracingConfig = Field(default_factory=TracingConfig, description="OpenTelemetry tracing configuration")
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig, description="LLM request scheduler configuration")
+    router: RouterConfig = Field(default_factory=RouterConfig, description="Model router configuration")
+    prefetch: PrefetchConfig = Field(default_factory=PrefetchConfig, description="File prefetch configuration")
 
     model_config = SettingsConfigDict(
         env_prefix="RALPH_", # Changed from APP_ to RALPH_
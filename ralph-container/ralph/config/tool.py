@@ -37,6 +37,13 @@ class ToolModeEnum(str, Enum):
     dynamic = "dynamic"
 
 
+# Defaults of particular tools that differ from the ToolConfig defaults
+TOOL_DEFAULTS: dict[str, dict] = {
+    # Test suites and builds often take longer than 30 seconds
+    "run_command": {"timeout": timedelta(seconds=60)},
+}
+
+
 class ToolConfig(BaseModel):
     """
     Configuration for tool execution.
@@ -44,7 +51,8 @@ class ToolConfig(BaseModel):
     Attributes:
         name (str | None): Name of the tool.
         max_instances (int): Maximum number of concurrent instances for this tool. Defaults to 5.
-        timeout (timedelta): Timeout for tool execution. Defaults to 30 seconds.
+        timeout (timedelta): Timeout for tool execution. Defaults to 30 seconds (60 for run_command).
+        max_output_bytes (int): Maximum size of the output a tool returns to the agent. Defaults to 16384.
     """
 
     name: str | None = Field(default=None, description="Name of the tool, used to identify it in the system")
@@ -56,6 +64,31 @@ class ToolConfig(BaseModel):
 
     timeout: timedelta = Field(default=timedelta(seconds=30), description="Timeout for tool execution")
 
+    max_output_bytes: int = Field(default=16384, description="Maximum size of the output a tool returns to the agent")
+
+    @classmethod
+    def for_tool(cls, name: str) -> Self:
+        """
+        Return the default configuration of a tool.
+
+        Args:
+            name (str): The name of the tool.
+
+        Returns:
+            ToolConfig: The defaults, including any tool-specific ones from TOOL_DEFAULTS.
+        """
+        return cls(name=name, **TOOL_DEFAULTS.get(name, {}))
+
+    def with_tool_defaults(self) -> Self:
+        """
+        Return this configuration with tool-specific defaults filled in for unset fields.
+
+        Returns:
+            ToolConfig: This configuration, or a copy with the defaults from TOOL_DEFAULTS.
+        """
+        defaults = {key: value for key, value in TOOL_DEFAULTS.get(self.name, {}).items() if key not in self.model_fields_set}
+        return self.model_copy(update=defaults) if defaults else self
+
 
 class McpConfig(BaseModel):
     """
@@ -111,12 +144,30 @@ class ToolBoxConfig(BaseModel):
     Configuration for toolbox execution.
 
     Attributes:
+        allowed_tools (list[str]): List of allowed tools.
         tools (list[ToolConfig]): Per-tool configuration with default settings.
-        max_concurrent (int): Default maximum number of concurrent instances for tools.
+        max_concurrent (int): Maximum number of tool calls executed concurrently. Defaults to 4.
         mcps (list[McpConfig]): MCP configuration list.
     """
 
-    tools: list[ToolConfig] = Field(description="Per-tool configuration with default settings")
-    max_concurrent: int = Field(description="Default maximum number of concurrent instances for tools")
+    allowed_tools: list[str] = Field(default_factory=list, description="List of allowed tools")
+
+    tools: list[ToolConfig] = Field(default_factory=list, description="Per-tool configuration with default settings")
+    max_concurrent: int = Field(default=4, description="Maximum number of tool calls executed concurrently")
+
+    mcps: list[McpConfig] = Field(default_factory=list, description="MCP configuration")
 
-    mcps: list[McpConfig] = Field(description="MCP configuration")
+    def tool_config(self, name: str) -> ToolConfig:
+        """
+        Return the configuration for a tool, falling back to the defaults.
+
+        Args:
+            name (str): The name of the tool.
+
+        Returns:
+            ToolConfig: The configured settings for the tool, or a default ToolConfig.
+        """
+        for tool_config in self.tools:
+            if tool_config.name == name:
+                return tool_config.with_tool_defaults()
+        return ToolConfig.for_tool(name)
@@ -0,0 +1,202 @@
+"""
+Context module for Ralph.
+
+This module keeps the message history sent to the model within a token budget.
+Token counts are estimated per message and cached, so each step only counts the
+messages added since the previous one. When the budget is exceeded, older tool
+outputs are truncated (or summarized by a cheap model) first and, if that is not enough,
+the oldest turns are evicted.
+"""
+
+import json
+import math
+from typing import Callable, Sequence
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+
+# Fixed per-message overhead (role, separators) added to every estimate.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Summarizes a text within a number of tokens, or returns None
+Summarizer = Callable[[str, int], "str | None"]
+
+
+def message_text(message: BaseMessage) -> str:
+    """
+    Flatten the content of a message (and any tool calls) into plain text.
+
+    Args:
+        message (BaseMessage): The message to flatten.
+
+    Returns:
+        str: The textual content of the message.
+    """
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        parts = []
+        for part in content:
+            if isinstance(part, dict):
+                parts.append(str(part.get("text", "")))
+            else:
+                parts.append(str(part))
+        text = "".join(parts)
+
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += json.dumps([{"name": c["name"], "args": c["args"]} for c in tool_calls], default=str)
+    return text
+
+
+class ContextManager:
+    """
+    Token-budgeted manager for the conversation history.
+
+    Attributes:
+        budget (int): Maximum number of tokens that may be sent to the model per call.
+        keep_recent (int): Number of most recent messages that are never compacted.
+        truncate_tokens (int): Size, in tokens, that older tool outputs are truncated to.
+        chars_per_token (float): Characters per token used by the estimator.
+    """
+
+    def __init__(self, budget: int, keep_recent: int = 6, truncate_tokens: int = 256, chars_per_token: float = 4.0):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.truncate_tokens = truncate_tokens
+        self.chars_per_token = chars_per_token
+        # message id -> (content length, token count)
+        self._counts: dict[str, tuple[int, int]] = {}
+
+    def count_text(self, text: str) -> int:
+        """
+        Estimate the number of tokens in a piece of text.
+
+        Args:
+            text (str): The text to measure.
+
+        Returns:
+            int: The estimated token count.
+        """
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count(self, message: BaseMessage) -> int:
+        """
+        Return the token count of a message, using the cached value when unchanged.
+
+        Args:
+            message (BaseMessage): The message to measure.
+
+        Returns:
+            int: The estimated token count including per-message overhead.
+        """
+        text = message_text(message)
+        if message.id:
+            cached = self._counts.get(message.id)
+            if cached and cached[0] == len(text):
+                return cached[1]
+
+        tokens = self.count_text(text) + MESSAGE_OVERHEAD_TOKENS
+        if message.id:
+            self._counts[message.id] = (len(text), tokens)
+        return tokens
+
+    def total(self, messages: Sequence[BaseMessage], fixed_tokens: int = 0) -> int:
+        """
+        Return the total token count of a message list plus a fixed prefix.
+
+        Args:
+            messages (Sequence[BaseMessage]): The conversation history.
+            fixed_tokens (int, optional): Tokens already committed (e.g. the system prompt). Defaults to 0.
+
+        Returns:
+            int: The estimated total token count.
+        """
+        return fixed_tokens + sum(self.count(m) for m in messages)
+
+    def _protected_tail(self, messages: Sequence[BaseMessage]) -> int:
+        """
+        Return the index of the first message in the protected recent tail.
+
+        The boundary is moved back so that the tail never starts with a tool output
+        whose originating AI message would be compacted away.
+        """
+        start = max(len(messages) - self.keep_recent, 0)
+        while start > 0 and messages[start].type == "tool":
+            start -= 1
+        return start
+
+    def _truncate(self, message: BaseMessage, summarize: Summarizer | None = None) -> BaseMessage:
+        """Return a copy of a tool message cut down to `truncate_tokens`, summarized if possible."""
+        text = message_text(message)
+        keep_chars = int(self.truncate_tokens * self.chars_per_token)
+        summary = summarize(text, self.truncate_tokens) if summarize else None
+        if summary:
+            content = f"[Summary of {self.count_text(text)} tokens of older tool output]\n{summary[:keep_chars]}"
+        else:
+            dropped = self.count_text(text[keep_chars:])
+            content = f"{text[:keep_chars]}\n[... {dropped} tokens of older tool output truncated ...]"
+        return message.model_copy(update={"content": content})
+
+    def compact(self, messages: Sequence[BaseMessage], fixed_tokens: int = 0, summarize: Summarizer | None = None) -> tuple[list[BaseMessage], int]:
+        """
+        Bring the history within budget.
+
+        Older tool outputs are truncated (or summarized, given a summarizer) first, oldest
+        first. If the history is still
+        over budget, whole turns (an AI message together with its tool outputs) are
+        evicted, oldest first. The first human message and the recent tail are kept.
+
+        Args:
+            messages (Sequence[BaseMessage]): The conversation history. Messages must have ids.
+            fixed_tokens (int, optional): Tokens already committed (e.g. the system prompt). Defaults to 0.
+            summarize (Summarizer | None, optional): Summarizes a tool output within a token
+                size, returning None to fall back to truncation. Defaults to None.
+
+        Returns:
+            tuple[list[BaseMessage], int]: The state updates (replacement messages and
+                RemoveMessage markers) and the resulting total token count.
+        """
+        total = self.total(messages, fixed_tokens)
+        if total <= self.budget:
+            return [], total
+
+        updates: list[BaseMessage] = []
+        tail = self._protected_tail(messages)
+
+        # 1. Truncate older tool outputs.
+        truncated: dict[str, BaseMessage] = {}
+        for msg in messages[:tail]:
+            if total <= self.budget:
+                break
+            if msg.type != "tool" or not msg.id:
+                continue
+            before = self.count(msg)
+            if before <= self.truncate_tokens + MESSAGE_OVERHEAD_TOKENS:
+                continue
+            replacement = self._truncate(msg, summarize)
+            after = self.count(replacement)
+            if after >= before:
+                continue
+            truncated[msg.id] = replacement
+            updates.append(replacement)
+            total -= before - after
+
+        # 2. Evict the oldest turns.
+        start = 1 if messages and messages[0].type == "human" else 0
+        i = start
+        while total > self.budget and i < tail:
+            end = i + 1
+            while end < tail and messages[end].type == "tool":
+                end += 1
+            for msg in messages[i:end]:
+                if not msg.id:
+                    continue
+                current = truncated.pop(msg.id, msg)
+                if current is not msg:
+                    updates.remove(current)
+                total -= self.count(current)
+                updates.append(RemoveMessage(id=msg.id))
+            i = end
+
+        return updates, total
@@ -0,0 +1,390 @@
+"""
+Executor module for Ralph.
+
+This module runs the tool calls of a single AI message concurrently on a bounded
+thread pool. It enforces the global `ToolBoxConfig.max_concurrent` limit and the
+per-tool `ToolConfig.max_instances` limit. Calls that touch the same path are
+ordered: a call that writes a path waits for every earlier call on that path, and
+later calls on the path wait for it. Results are always returned in call order.
+
+While a response is still streaming, read-only calls that do not depend on an earlier
+write can be started early with `dispatch_early`; the tools node then collects them.
+When the run has a metrics recorder, the wall time, output size and outcome of every call
+and the wall time of the tools node are recorded; when tracing is enabled each call gets a span.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import BaseTool
+
+from ralph.config.tool import ToolBoxConfig
+from ralph.metrics import output_bytes, run_metrics
+from ralph import tracing
+from ralph.patch import diff_paths
+from ralph.state import AgentState
+
+# Resource that conflicts with every other call (e.g. shell commands, user prompts)
+EXCLUSIVE = "*"
+
+PathsFn = Callable[[dict, RunnableConfig], list[str]]
+
+
+def _arg_path(key: str, default: str | None = None) -> PathsFn:
+    """Return a function extracting a single path argument from tool call args."""
+    def paths(args: dict, config: RunnableConfig) -> list[str]:
+        value = args.get(key, default)
+        return [value] if value else []
+    return paths
+
+
+def _arg_paths(key: str, field: str | None = None) -> PathsFn:
+    """Return a function extracting a list of paths (or of `field` of each item) from tool call args."""
+    def paths(args: dict, config: RunnableConfig) -> list[str]:
+        items = args.get(key) or []
+        values = [item.get(field) if field and isinstance(item, dict) else item for item in items]
+        return [value for value in values if isinstance(value, str) and value]
+    return paths
+
+
+def _patch_paths(args: dict, config: RunnableConfig) -> list[str]:
+    """Return the files named in the headers of an `apply_patch` diff."""
+    paths = diff_paths(args.get("patch") or "")
+    return paths or ([args["path"]] if args.get("path") else [])
+
+
+def _instruction_path(args: dict, config: RunnableConfig) -> list[str]:
+    """Return the instruction file path from the runtime config."""
+    path = config.get("configurable", {}).get("instruction_path")
+    return [path] if path else []
+
+
+# Tools that modify files, mapped to the paths they write
+MUTATING_TOOLS: dict[str, PathsFn] = {
+    "write_file": _arg_path("path"),
+    "write_files": _arg_paths("files", "path"),
+    "edit_file": _arg_path("path"),
+    "apply_patch": _patch_paths,
+    "update_prd": lambda args, config: ["prd.json"],
+    "update_stories": lambda args, config: ["prd.json"],
+    "update_instruction": _instruction_path,
+}
+
+# Tools that only read files, mapped to the paths they read
+READING_TOOLS: dict[str, PathsFn] = {
+    "read_file": _arg_path("path"),
+    "read_files": _arg_paths("paths"),
+    "list_files": _arg_path("path", "."),
+    "search_code": _arg_path("path", "."),
+    "next_story": lambda args, config: ["prd.json"],
+}
+
+# Tools that must not run alongside any other call
+EXCLUSIVE_TOOLS: set[str] = {"run_command", "ask_user"}
+
+
+def _normalize(path: str, config: RunnableConfig) -> str:
+    """Return an absolute, normalized key for a path relative to the workdir."""
+    workdir = config.get("configurable", {}).get("workdir") or os.getcwd()
+    return os.path.normpath(os.path.join(os.path.abspath(workdir), path))
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """Return True if two resources conflict (same path, or one contains the other)."""
+    if a == EXCLUSIVE or b == EXCLUSIVE:
+        return True
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+class ToolExecutor:
+    """
+    Concurrent executor for the tool calls of one agent turn.
+
+    Attributes:
+        tools_by_name (dict[str, BaseTool]): The available tools.
+        toolbox (ToolBoxConfig): The toolbox configuration providing concurrency limits.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], toolbox: ToolBoxConfig):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.toolbox = toolbox
+        self.max_concurrent = max(1, toolbox.max_concurrent)
+        self._instances = {
+            name: threading.BoundedSemaphore(max(1, toolbox.tool_config(name).max_instances))
+            for name in self.tools_by_name
+        }
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="ralph-tool")
+        # Calls started while the AI message was streaming, keyed by tool call id
+        self._early: dict[str, Future] = {}
+
+    def resources(self, call: dict, config: RunnableConfig) -> tuple[set[str], set[str]]:
+        """
+        Return the resources a tool call reads and writes.
+
+        Args:
+            call (dict): The tool call.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            tuple[set[str], set[str]]: The read and write resources.
+        """
+        name = call["name"]
+        args = call.get("args") or {}
+        if name in EXCLUSIVE_TOOLS:
+            return set(), {EXCLUSIVE}
+        writes = {_normalize(p, config) for p in MUTATING_TOOLS.get(name, lambda a, c: [])(args, config)}
+        reads = {_normalize(p, config) for p in READING_TOOLS.get(name, lambda a, c: [])(args, config)}
+        return reads, writes
+
+    def dependencies(self, calls: Sequence[dict], config: RunnableConfig) -> list[list[int]]:
+        """
+        Return, for each call, the indices of earlier calls it must wait for.
+
+        Two calls depend on each other when one writes a resource the other reads or writes.
+
+        Args:
+            calls (Sequence[dict]): The tool calls, in the order the model emitted them.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            list[list[int]]: The dependency indices per call.
+        """
+        resources = [self.resources(call, config) for call in calls]
+        deps: list[list[int]] = []
+        for j, (reads_j, writes_j) in enumerate(resources):
+            deps_j = []
+            for i in range(j):
+                reads_i, writes_i = resources[i]
+                if any(_overlaps(w, r) for w in writes_j for r in reads_i | writes_i) or any(
+                    _overlaps(r, w) for r in reads_j for w in writes_i
+                ):
+                    deps_j.append(i)
+            deps.append(deps_j)
+        return deps
+
+    def dispatch_early(self, call: dict, earlier: Sequence[dict], config: RunnableConfig) -> bool:
+        """
+        Start a tool call before the rest of the AI message has been received.
+
+        Only read-only calls that do not conflict with an earlier call of the same message
+        are started; everything else waits for the tools node.
+
+        Args:
+            call (dict): The completed tool call.
+            earlier (Sequence[dict]): The calls that precede it in the message.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            bool: True if the call was started.
+        """
+        if call["name"] not in READING_TOOLS or call["name"] not in self.tools_by_name or call["id"] in self._early:
+            return False
+        if self.dependencies([*earlier, call], config)[-1]:
+            return False
+        ctx = contextvars.copy_context()
+        self._early[call["id"]] = self._pool.submit(ctx.run, self.run_one, call, config)
+        return True
+
+    def _take_early(self, calls: Sequence[dict]) -> dict[int, Future]:
+        """Return the early-started futures for these calls and forget any stale ones."""
+        early = {index: self._early.pop(call["id"]) for index, call in enumerate(calls) if call["id"] in self._early}
+        self._early.clear()
+        return early
+
+    def _tool_runtime_config(self, config: RunnableConfig) -> RunnableConfig:
+        """Return the config passed to tools, carrying the toolbox so tools can read their settings."""
+        return {**config, "configurable": {**config.get("configurable", {}), "toolbox": self.toolbox}}
+
+    def _error(self, call: dict, content: str) -> ToolMessage:
+        """Build an error ToolMessage for a call."""
+        return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _span(self, call: dict):
+        """Return the tracing span of a tool call."""
+        return tracing.span(
+            f"execute_tool {call['name']}",
+            {"gen_ai.operation.name": "execute_tool", "gen_ai.tool.name": call["name"], "gen_ai.tool.call.id": call["id"]},
+        )
+
+    def _finish(self, call: dict, result: Any, config: RunnableConfig, started: float, span: Any) -> ToolMessage:
+        """Wrap a tool result in a ToolMessage and record the call's metrics and span attributes."""
+        if not isinstance(result, ToolMessage):
+            result = ToolMessage(content=str(result), name=call["name"], tool_call_id=call["id"])
+        metrics = run_metrics(config)
+        if metrics is None and span is None:
+            return result
+        size = output_bytes(result.content)
+        if metrics is not None:
+            metrics.tool_call(call["name"], time.perf_counter() - started, size, result.status == "error")
+        tracing.set_attributes(span, {"ralph.tool.output_bytes": size})
+        if result.status == "error":
+            tracing.set_error(span, "tool_error", str(result.content)[:200])
+        return result
+
+    def run_one(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        """
+        Run a single tool call, honoring the per-tool instance limit.
+
+        Args:
+            call (dict): The tool call.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            ToolMessage: The tool output, or an error message.
+        """
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error(call, f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}].")
+
+        with self._span(call) as span:
+            started = time.perf_counter()
+            with self._instances[tool.name]:
+                try:
+                    result = tool.invoke({**call, "type": "tool_call"}, self._tool_runtime_config(config))
+                except Exception as e:
+                    result = self._error(call, f"Error: {e}")
+            return self._finish(call, result, config, started, span)
+
+    def run(self, calls: Sequence[dict], config: RunnableConfig) -> list[ToolMessage]:
+        """
+        Run the tool calls of one turn concurrently.
+
+        Args:
+            calls (Sequence[dict]): The tool calls, in the order the model emitted them.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            list[ToolMessage]: The tool outputs, in call order.
+        """
+        early = self._take_early(calls)
+        if len(calls) == 1 and not early:
+            return [self.run_one(calls[0], config)]
+
+        deps = self.dependencies(calls, config)
+        futures: list[Future] = []
+
+        def task(index: int) -> ToolMessage:
+            # Dependencies were submitted earlier, so they are already running or done
+            for dep in deps[index]:
+                futures[dep].result()
+            return self.run_one(calls[index], config)
+
+        for index in range(len(calls)):
+            if index in early:
+                futures.append(early[index])
+                continue
+            ctx = contextvars.copy_context()
+            futures.append(self._pool.submit(ctx.run, task, index))
+        return [future.result() for future in futures]
+
+    async def arun_one(self, call: dict, config: RunnableConfig, instances: dict[str, asyncio.Semaphore]) -> ToolMessage:
+        """
+        Run a single tool call asynchronously, honoring the per-tool instance limit.
+
+        Args:
+            call (dict): The tool call.
+            config (RunnableConfig): The runtime configuration.
+            instances (dict[str, asyncio.Semaphore]): Per-tool semaphores for this turn.
+
+        Returns:
+            ToolMessage: The tool output, or an error message.
+        """
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error(call, f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}].")
+
+        with self._span(call) as span:
+            started = time.perf_counter()
+            async with instances[tool.name]:
+                try:
+                    result = await tool.ainvoke({**call, "type": "tool_call"}, self._tool_runtime_config(config))
+                except Exception as e:
+                    result = self._error(call, f"Error: {e}")
+            return self._finish(call, result, config, started, span)
+
+    async def arun(self, calls: Sequence[dict], config: RunnableConfig) -> list[ToolMessage]:
+        """
+        Run the tool calls of one turn concurrently on the event loop.
+
+        Args:
+            calls (Sequence[dict]): The tool calls, in the order the model emitted them.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            list[ToolMessage]: The tool outputs, in call order.
+        """
+        # Semaphores are created per turn so that they belong to the running event loop
+        slots = asyncio.Semaphore(self.max_concurrent)
+        instances = {
+            name: asyncio.Semaphore(max(1, self.toolbox.tool_config(name).max_instances))
+            for name in self.tools_by_name
+        }
+        early = self._take_early(calls)
+        deps = self.dependencies(calls, config)
+        tasks: list[asyncio.Task] = []
+
+        async def task(index: int) -> ToolMessage:
+            if index in early:
+                return await asyncio.wrap_future(early[index])
+            if deps[index]:
+                await asyncio.gather(*(tasks[dep] for dep in deps[index]))
+            async with slots:
+                return await self.arun_one(calls[index], config, instances)
+
+        for index in range(len(calls)):
+            tasks.append(asyncio.ensure_future(task(index)))
+        return list(await asyncio.gather(*tasks))
+
+    def __call__(self, state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+        """
+        Graph node: execute the tool calls of the last AI message.
+
+        Args:
+            state (AgentState): The agent state.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            dict[str, Any]: The state update with the tool messages.
+        """
+        started = time.perf_counter()
+        last_message = state.messages[-1]
+        messages = self.run(last_message.tool_calls, config)
+        metrics = run_metrics(config)
+        if metrics is not None:
+            metrics.node("tools", time.perf_counter() - started)
+        return {"messages": messages}
+
+    async def acall(self, state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+        """
+        Async graph node: execute the tool calls of the last AI message.
+
+        Args:
+            state (AgentState): The agent state.
+            config (RunnableConfig): The runtime configuration.
+
+        Returns:
+            dict[str, Any]: The state update with the tool messages.
+        """
+        started = time.perf_counter()
+        last_message = state.messages[-1]
+        messages = await self.arun(last_message.tool_calls, config)
+        metrics = run_metrics(config)
+        if metrics is not None:
+            metrics.node("tools", time.perf_counter() - started)
+        return {"messages": messages}
+
+    def as_runnable(self) -> RunnableLambda:
+        """
+        Return the executor as a graph node supporting both `invoke` and `ainvoke`.
+
+        Returns:
+            RunnableLambda: The node runnable.
+        """
+        return RunnableLambda(self.__call__, afunc=self.acall, name="tools")
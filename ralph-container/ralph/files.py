@@ -0,0 +1,226 @@
+"""
+Files module for Ralph.
+
+This module reads windows of files for the `read_file` tool without loading the whole
+file: small files are read directly, larger ones through `mmap`, and only the requested
+line or byte range (capped at a maximum size) is decoded. When the result is not the
+whole file, it starts with a header giving the file's total size and line count so the
+agent can page through it.
+
+It also writes files atomically for the writing tools: content goes to a temporary file
+in the target's directory, which is then renamed over the target, so readers never see
+a partially written file.
+"""
+
+import mmap
+import os
+import tempfile
+
+# Files at least this large are memory-mapped rather than read
+MMAP_THRESHOLD = 1024 * 1024
+
+# Chunk size used when scanning for line breaks
+_CHUNK = 1024 * 1024
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    """Count line breaks in buf[start:end], one chunk at a time."""
+    count = 0
+    for pos in range(start, end, _CHUNK):
+        count += buf[pos:min(pos + _CHUNK, end)].count(b"\n")
+    return count
+
+
+def _line_start(buf, line: int, size: int) -> int:
+    """Return the byte offset at which the 1-based `line` starts (`size` if past the end)."""
+    remaining = line - 1
+    pos = 0
+    while remaining > 0 and pos < size:
+        chunk = buf[pos:pos + _CHUNK]
+        newlines = chunk.count(b"\n")
+        if newlines < remaining:
+            remaining -= newlines
+            pos += len(chunk)
+            continue
+        idx = -1
+        for _ in range(remaining):
+            idx = chunk.find(b"\n", idx + 1)
+        return pos + idx + 1
+    return min(pos, size)
+
+
+def _line_count(buf, size: int) -> int:
+    """Return the number of lines, counting a final line without a line break."""
+    if size == 0:
+        return 0
+    return _count_newlines(buf, 0, size) + (0 if buf[size - 1:size] == b"\n" else 1)
+
+
+def _read_window(buf, size: int, start_line, end_line, offset, length, max_bytes: int) -> str:
+    """Select, cap and decode a window of `buf`; see `read_window`."""
+    if start_line is not None or end_line is not None:
+        start = _line_start(buf, max(1, start_line or 1), size)
+        end = size if end_line is None else _line_start(buf, max(1, end_line) + 1, size)
+    else:
+        start = min(max(0, offset or 0), size)
+        end = size if length is None else min(size, start + max(0, length))
+    end = max(start, end)
+
+    truncated = end - start > max_bytes
+    if truncated:
+        # Cut at the last line break inside the cap, unless that would return nothing
+        cut = buf.rfind(b"\n", start, start + max_bytes)
+        end = cut + 1 if cut >= start else start + max_bytes
+
+    text = bytes(buf[start:end]).decode("utf-8", errors="replace")
+    if start == 0 and end == size:
+        return text
+
+    first_line = _count_newlines(buf, 0, start) + 1
+    last_line = first_line + max(0, _count_newlines(buf, start, end) - (1 if text.endswith("\n") else 0))
+    header = (
+        f"[showing lines {first_line}-{last_line} (bytes {start}-{end}) of {_line_count(buf, size)} lines, "
+        f"{size} bytes total"
+    )
+    if truncated:
+        header += f"; output capped at {max_bytes} bytes"
+    header += ". Use start_line/end_line or offset/length to read other parts.]\n"
+    return header + text
+
+
+def read_window(
+    path: str,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    offset: int | None = None,
+    length: int | None = None,
+    max_bytes: int = 16384,
+    data: bytes | None = None,
+) -> str:
+    """
+    Read part of a text file.
+
+    Lines are 1-based and inclusive. A line range takes precedence over a byte range.
+    Without a range the whole file is read, subject to `max_bytes`.
+
+    Args:
+        path (str): The file to read.
+        start_line (int | None, optional): First line to return. Defaults to None.
+        end_line (int | None, optional): Last line to return. Defaults to None (end of file).
+        offset (int | None, optional): First byte to return. Defaults to None.
+        length (int | None, optional): Number of bytes to return. Defaults to None (to the end).
+        max_bytes (int, optional): Maximum number of bytes returned. Defaults to 16384.
+        data (bytes | None, optional): The file's content, if already in memory (e.g. prefetched);
+            the file is then not opened. Defaults to None.
+
+    Returns:
+        str: The selected text, preceded by a header unless it is the whole file.
+    """
+    max_bytes = max(1, max_bytes)
+    if data is not None:
+        return _read_window(data, len(data), start_line, end_line, offset, length, max_bytes)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            return _read_window(f.read(), size, start_line, end_line, offset, length, max_bytes)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _read_window(mm, size, start_line, end_line, offset, length, max_bytes)
+
+
+def _write_temp(path: str, content: str) -> str:
+    """Write content to a new temporary file next to `path` and return its name."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def atomic_write(path: str, content: str):
+    """
+    Replace a file's content atomically.
+
+    Args:
+        path (str): The file to write; missing parent directories are created.
+        content (str): The new content.
+    """
+    os.replace(_write_temp(path, content), path)
+
+
+def _check_target(path: str):
+    """Raise if `path` cannot be replaced by a rename: it is a directory or not writable."""
+    if os.path.isdir(path):
+        raise IsADirectoryError(f"{path} is a directory")
+    if os.path.exists(path) and not os.access(path, os.W_OK):
+        raise PermissionError(f"{path} is not writable")
+
+
+def _backup(path: str) -> str | None:
+    """Hard-link an existing file to a temporary name next to it and return that name."""
+    if not os.path.exists(path):
+        return None
+    fd, backup_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".bak", dir=os.path.dirname(path))
+    os.close(fd)
+    os.unlink(backup_path)
+    os.link(path, backup_path)
+    return backup_path
+
+
+def atomic_write_many(files: list[tuple[str, str]]):
+    """
+    Write several files, each atomically, as a whole or not at all.
+
+    Every target is checked and every file is first written to a temporary file; only
+    when all of them were written are they renamed into place. If a write fails, no
+    target is modified. If a rename fails, the targets already replaced are restored
+    from hard-link backups (and new files removed) before the error is raised.
+
+    Args:
+        files (list[tuple[str, str]]): The (path, content) pairs to write.
+    """
+    for path, _ in files:
+        _check_target(path)
+    temps: list[tuple[str, str]] = []
+    try:
+        for path, content in files:
+            temps.append((_write_temp(path, content), path))
+    except BaseException:
+        for temp_path, _ in temps:
+            os.unlink(temp_path)
+        raise
+
+    replaced: list[tuple[str, str | None]] = []
+    try:
+        for i, (temp_path, path) in enumerate(temps):
+            backup_path = _backup(path)
+            try:
+                os.replace(temp_path, path)
+            except BaseException:
+                if backup_path is not None:
+                    os.unlink(backup_path)
+                raise
+            replaced.append((path, backup_path))
+    except BaseException:
+        for temp_path, _ in temps[len(replaced):]:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        for path, backup_path in reversed(replaced):
+            if backup_path is None:
+                os.unlink(path)
+            else:
+                os.replace(backup_path, path)
+        raise
+    for _, backup_path in replaced:
+        if backup_path is not None:
+            os.unlink(backup_path)
@@ -0,0 +1,184 @@
+"""
+Fleet module for Ralph.
+
+This module runs many loops (one per working directory) concurrently in a single
+process. Workspaces are scheduled on a shared pool of workers, concurrent LLM requests
+are capped globally, and one chat model client is shared per provider configuration,
+so the import, config parsing and client construction costs are paid once.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import click
+import yaml
+from pydantic import BaseModel, Field
+
+from ralph.config import RalphConfig
+from ralph.graph import LoopReport
+from ralph.models import ModelPool
+
+
+class FleetEntry(BaseModel):
+    """
+    A single workspace in a fleet manifest.
+
+    Attributes:
+        workdir (str): The working directory of the loop.
+        instruction_file (str): Path to the instruction file.
+        limit (int): Max iterations for the loop. Defaults to 1.
+        resume (str | None): Thread id of a previous run to resume. Defaults to None.
+        aiclient (dict[str, Any]): Overrides applied to the `aiclient` configuration for this entry.
+    """
+    workdir: str = Field(description="The working directory of the loop")
+    instruction_file: str = Field(description="Path to the instruction file")
+    limit: int = Field(default=1, description="Max iterations for the loop")
+    resume: str | None = Field(default=None, description="Thread id of a previous run to resume")
+    aiclient: dict[str, Any] = Field(default_factory=dict, description="Overrides for the aiclient configuration")
+
+
+class FleetManifest(BaseModel):
+    """
+    A fleet manifest: the list of workspaces to run.
+
+    Attributes:
+        entries (list[FleetEntry]): The workspaces to run.
+    """
+    entries: list[FleetEntry] = Field(default_factory=list, description="The workspaces to run")
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> "FleetManifest":
+        """
+        Load a manifest from a YAML file.
+
+        Relative `workdir` and `instruction_file` paths are resolved against the
+        directory containing the manifest. The file may contain either a list of
+        entries or a mapping with an `entries` key.
+
+        Args:
+            path (Path): Path to the manifest file.
+
+        Returns:
+            FleetManifest: The loaded manifest.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, list):
+            data = {"entries": data}
+        manifest = cls.model_validate(data)
+
+        base = Path(path).parent
+        for entry in manifest.entries:
+            entry.workdir = str(base / entry.workdir)
+            entry.instruction_file = str(base / entry.instruction_file)
+        return manifest
+
+
+def _entry_config(config: RalphConfig, entry: FleetEntry) -> RalphConfig:
+    """
+    Return the configuration for an entry, applying its aiclient overrides.
+    """
+    if not entry.aiclient:
+        return config
+    aiclient = config.aiclient.model_validate({**config.aiclient.model_dump(), **entry.aiclient})
+    return config.model_copy(update={"aiclient": aiclient})
+
+
+async def arun_fleet(manifest: FleetManifest, config: RalphConfig, workers: int = 4, max_llm_requests: int = 4) -> list[LoopReport]:
+    """
+    Run every loop of a manifest concurrently on one event loop.
+
+    Args:
+        manifest (FleetManifest): The workspaces to run.
+        config (RalphConfig): The base Ralph configuration.
+        workers (int, optional): Maximum number of loops running at once. Defaults to 4.
+        max_llm_requests (int, optional): Maximum number of concurrent LLM requests across
+            all loops. Defaults to 4.
+
+    Returns:
+        list[LoopReport]: One report per entry, in manifest order.
+    """
+    from ralph.graph import arun_loop
+
+    slots = asyncio.Semaphore(max(1, workers))
+    llm_limiter = asyncio.Semaphore(max(1, max_llm_requests))
+    models = ModelPool(scheduled=True)
+
+    async def run_entry(entry: FleetEntry) -> LoopReport:
+        async with slots:
+            entry_config = _entry_config(config, entry)
+            try:
+                llm = models.get(entry_config)
+            except Exception as e:
+                return LoopReport(workdir=entry.workdir, error=str(e))
+            return await arun_loop(
+                entry.instruction_file,
+                entry.workdir,
+                entry.limit,
+                entry_config,
+                resume=entry.resume,
+                llm=llm,
+                llm_limiter=llm_limiter,
+                # Token streams of concurrent loops would interleave, so only whole messages are printed
+                stream=False,
+            )
+
+    reports = await asyncio.gather(*(run_entry(entry) for entry in manifest.entries))
+    click.echo(f"Fleet finished: {len(reports)} workspaces, {len(models)} model clients.")
+    return list(reports)
+
+
+def run_fleet(manifest: FleetManifest, config: RalphConfig, workers: int = 4, max_llm_requests: int = 4) -> list[LoopReport]:
+    """
+    Run every loop of a manifest concurrently.
+
+    Args:
+        manifest (FleetManifest): The workspaces to run.
+        config (RalphConfig): The base Ralph configuration.
+        workers (int, optional): Maximum number of loops running at once. Defaults to 4.
+        max_llm_requests (int, optional): Maximum number of concurrent LLM requests. Defaults to 4.
+
+    Returns:
+        list[LoopReport]: One report per entry, in manifest order.
+    """
+    return asyncio.run(arun_fleet(manifest, config, workers, max_llm_requests))
+
+
+def format_report(reports: list[LoopReport]) -> str:
+    """
+    Format fleet reports as a plain-text table with a totals row.
+
+    Args:
+        reports (list[LoopReport]): The reports to format.
+
+    Returns:
+        str: The table.
+    """
+    header = f"{'workdir':<40} {'iters':>5} {'done':>5} {'ctx tokens':>10} {'in':>8} {'cached':>8} {'out':>8} {'secs':>7}  error"
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r.workdir[-40:]:<40} {r.iterations:>5} {str(r.done):>5} {r.context_tokens:>10} "
+            f"{r.input_tokens:>8} {r.cached_input_tokens:>8} {r.output_tokens:>8} {r.elapsed:>7.1f}  {r.error or ''}"
+        )
+    lines.append("-" * len(header))
+    lines.append(
+        f"{'total':<40} {sum(r.iterations for r in reports):>5} {sum(r.done for r in reports):>5} "
+        f"{sum(r.context_tokens for r in reports):>10} {sum(r.input_tokens for r in reports):>8} "
+        f"{sum(r.cached_input_tokens for r in reports):>8} {sum(r.output_tokens for r in reports):>8} {max((r.elapsed for r in reports), default=0.0):>7.1f}"
+    )
+    return "\n".join(lines)
+
+
+def write_report(reports: list[LoopReport], path: Path):
+    """
+    Write fleet reports as JSON.
+
+    Args:
+        reports (list[LoopReport]): The reports to write.
+        path (Path): The output file.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([r.model_dump() for r in reports], f, indent=2)
@@ -6,13 +6,66 @@ initializing prompts and running the agent loop with state management.
 """
 
 import click
+import asyncio
 import shutil
 import os
+import time
+import uuid
+from typing import TYPE_CHECKING, Any
 from pathlib import Path
 # We will import create_agent later when it is implemented
 # from ralph.agent import create_agent
 
+from pydantic import BaseModel, Field
+
 from ralph.config import RalphConfig
+from ralph import tracing
+
+if TYPE_CHECKING:
+    from ralph.metrics import MetricsRecorder
+    from ralph.prefetch import Prefetcher
+
+
+class LoopReport(BaseModel):
+    """
+    Summary of a loop run.
+
+    Attributes:
+        workdir (str): The working directory of the run.
+        thread_id (str | None): The checkpoint thread id of the run.
+        iterations (int): Number of iterations completed.
+        done (bool): Whether the agent signalled that the objective was met.
+        error (str | None): The error that stopped the run, if any.
+        context_tokens (int): Total estimated tokens sent to the model.
+        input_tokens (int): Input tokens reported by the provider.
+        cached_input_tokens (int): Input tokens the provider served from its prompt cache.
+        output_tokens (int): Output tokens reported by the provider.
+        elapsed (float): Wall time of the run in seconds.
+    """
+    workdir: str
+    thread_id: str | None = None
+    iterations: int = 0
+    done: bool = False
+    error: str | None = None
+    context_tokens: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    elapsed: float = Field(default=0.0)
+
+    def usage_summary(self) -> str:
+        """
+        Return a one-line summary of the provider-reported token usage.
+
+        Returns:
+            str: The summary.
+        """
+        rate = self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0
+        uncached = self.input_tokens - self.cached_input_tokens
+        return (
+            f"Tokens: {self.input_tokens} input ({self.cached_input_tokens} cached, {uncached} uncached, "
+            f"{rate:.0%} cache hit), {self.output_tokens} output"
+        )
 
 def ensure_prompts_files(directory: str):
     """
@@ -70,35 +123,56 @@ def ensure_prompts_files(directory: str):
             click.echo(f"Error creating instructions directory: {e}", err=True)
 
 
-def run_loop(instruction_file: str, directory: str, limit: int, config: RalphConfig):
+def _new_messages(messages: list, previous: list) -> list:
     """
-    Run the Ralph loop.
+    Return the messages appended by the latest step.
 
-    This function initializes the agent, sets up the environment, and runs the
-    agent in a loop until the objective is met or the limit is reached.
+    The context manager may truncate or evict older messages, so the new messages are
+    located after the last message of the previous history rather than by count.
+
+    Args:
+        messages (list): The history returned by the agent.
+        previous (list): The history passed to the agent.
+
+    Returns:
+        list: The messages added by the step.
+    """
+    last_id = getattr(previous[-1], "id", None) if previous else None
+    if last_id:
+        for idx in range(len(messages) - 1, -1, -1):
+            if messages[idx].id == last_id:
+                return messages[idx + 1:]
+    return messages[len(previous):]
+
+
+def _prepare_workspace(instruction_file: str, directory: str, resume: str | None) -> tuple[str, str, str] | None:
+    """
+    Read the instruction and set up the working directory for a loop run.
+
+    Ensures the prompts exist and copies the instruction file to
+    `prompts/instructions/` as a working copy that the agent can update.
+    When resuming, an existing working copy (possibly updated by the agent) is kept.
 
     Args:
         instruction_file (str): Path to the instruction file.
         directory (str): The working directory.
-        limit (int): Max iterations for the loop.
-        config (RalphConfig): The Ralph configuration object.
-    """
+        resume (str | None): Thread id of a run being resumed, if any.
 
+    Returns:
+        tuple[str, str, str] | None: The instruction, the absolute working directory and the
+            working copy of the instruction file, or None if setup failed.
+    """
     # Verify instruction file exists
     if not os.path.exists(instruction_file):
         click.echo(f"Error: Instruction file '{instruction_file}' not found.", err=True)
-        return
+        return None
 
     try:
         with open(instruction_file, "r") as f:
             instruction = f.read()
     except Exception as e:
         click.echo(f"Error reading instruction file: {e}", err=True)
-        return
-
-    # Import locally to avoid circular dependencies
-    from ralph.agent import create_single_step_agent
-    from ralph.state import AgentState
+        return None
 
     # Ensure environment is set up
     ensure_prompts_files(directory)
@@ -106,16 +180,231 @@ def run_loop(instruction_file: str, directory: str, limit: int, config: RalphCon
     abs_dir = os.path.abspath(directory)
 
     # Copy instruction file to workdir prompts/instructions
-    # This creates a working copy that the agent can update
+    # This creates a working copy that the agent can update.
     instr_filename = os.path.basename(instruction_file)
     target_instr_path = os.path.join(abs_dir, "prompts", "instructions", instr_filename)
 
+    if not (resume and os.path.exists(target_instr_path)):
+        try:
+            shutil.copy2(instruction_file, target_instr_path)
+            click.echo(f"Instruction copied to {target_instr_path}")
+        except Exception as e:
+            click.echo(f"Error copying instruction file: {e}", err=True)
+            return None
+
+    return instruction, abs_dir, target_instr_path
+
+
+def _initial_inputs(snapshot, thread_id: str, resume: str | None) -> tuple[dict | None, list] | None:
+    """
+    Return the first input for the agent and the history it starts from.
+
+    Args:
+        snapshot (StateSnapshot | None): The stored state of the thread, when resuming.
+        thread_id (str): The thread id of the run.
+        resume (str | None): Thread id of a run being resumed, if any.
+
+    Returns:
+        tuple[dict | None, list] | None: The input and starting history, or None if the
+            thread to resume has no checkpoint.
+    """
+    if resume:
+        if not snapshot or not snapshot.values:
+            click.echo(f"Error: No checkpoint found for thread '{resume}'.", err=True)
+            return None
+        messages = list(snapshot.values.get("messages", []))
+        # If the process stopped mid-step, finish the pending nodes first (input None),
+        # otherwise start a new step on top of the stored history.
+        inputs = None if snapshot.next else {"messages": []}
+        click.echo(f"Resuming thread {thread_id} with {len(messages)} messages.")
+        return inputs, messages
+
+    # Initialize messages with the user's request
+    messages = [("user", "Please execute the instruction.")]
+    click.echo(f"Thread {thread_id} (resume with --resume {thread_id})")
+    return {"messages": messages}, messages
+
+
+def _metrics_recorder(config: RalphConfig, abs_dir: str, thread_id: str) -> "MetricsRecorder | None":
+    """
+    Create the metrics recorder of a loop run, if metrics are enabled.
+
+    Args:
+        config (RalphConfig): The Ralph configuration.
+        abs_dir (str): The absolute working directory.
+        thread_id (str): The thread id of the run.
+
+    Returns:
+        MetricsRecorder | None: The recorder, or None if metrics are disabled.
+    """
+    if not config.metrics.enabled:
+        return None
+    from ralph.metrics import MetricsRecorder
+
+    path = os.path.join(abs_dir, config.metrics.path) if config.metrics.path else None
+    return MetricsRecorder(path, workdir=abs_dir, thread_id=thread_id)
+
+
+def _prefetcher(config: RalphConfig, abs_dir: str) -> "Prefetcher | None":
+    """
+    Create the file prefetcher of a loop run, if prefetching is enabled.
+
+    Args:
+        config (RalphConfig): The Ralph configuration.
+        abs_dir (str): The absolute working directory.
+
+    Returns:
+        Prefetcher | None: The prefetcher, or None if prefetching is disabled.
+    """
+    if not config.prefetch.enabled:
+        return None
+    from ralph.prefetch import Prefetcher
+
+    return Prefetcher(abs_dir, config.prefetch)
+
+
+def _end_iteration(metrics: "MetricsRecorder | None", iteration: int, report: LoopReport, context_tokens: int, label: str = ""):
+    """Write the metrics record of an iteration, reporting rather than raising if the file cannot be written."""
+    if metrics is None:
+        return
     try:
-        shutil.copy2(instruction_file, target_instr_path)
-        click.echo(f"Instruction copied to {target_instr_path}")
-    except Exception as e:
-        click.echo(f"Error copying instruction file: {e}", err=True)
+        metrics.end_iteration(iteration, context_tokens=context_tokens, done=report.done, error=report.error)
+    except OSError as e:
+        click.echo(f"{label}Warning: could not write metrics to {metrics.path}: {e}", err=True)
+
+
+def _print_metrics(metrics: "MetricsRecorder | None", config: RalphConfig, label: str = ""):
+    """Print the end-of-run metrics summary table."""
+    if metrics is not None and config.metrics.summary and metrics.iterations:
+        click.echo("\n".join(f"{label}{line}" for line in metrics.summary().splitlines()))
+
+
+def _finish_loop_span(span: Any, report: LoopReport):
+    """Record the outcome of a loop run on its tracing span."""
+    tracing.set_attributes(span, {
+        "ralph.thread_id": report.thread_id,
+        "ralph.iterations": report.iterations,
+        "ralph.done": report.done,
+        "gen_ai.usage.input_tokens": report.input_tokens,
+        "gen_ai.usage.output_tokens": report.output_tokens,
+        "gen_ai.usage.cache_read.input_tokens": report.cached_input_tokens,
+    })
+    if report.error:
+        tracing.set_error(span, "loop_error", report.error)
+
+
+def _report_step(iteration: int, result: dict, prev_messages: list, report: LoopReport, label: str = "") -> tuple[list, bool]:
+    """
+    Print the outcome of one loop iteration, record it and check for the done signal.
+
+    Args:
+        iteration (int): The 1-based iteration number.
+        result (dict): The state returned by the agent.
+        prev_messages (list): The history before the iteration.
+        report (LoopReport): The run report to update.
+        label (str, optional): Prefix for printed lines (e.g. the workdir). Defaults to "".
+
+    Returns:
+        tuple[list, bool]: The new history and whether the agent signalled done.
+    """
+    from ralph.state import AgentState
+
+    # Convert result to AgentState for validation and easier access
+    state = AgentState(**result)
+    messages = state.messages
+
+    # Print new messages
+    new_msgs = _new_messages(messages, prev_messages)
+    for msg in new_msgs:
+        click.echo(f"\n{label}[{msg.type.upper()}]: {msg.content}\n")
+        usage = getattr(msg, "usage_metadata", None)
+        if usage:
+            report.input_tokens += usage.get("input_tokens", 0)
+            report.cached_input_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+            report.output_tokens += usage.get("output_tokens", 0)
+
+    click.echo(f"{label}Context sent in iteration {iteration}: {state.context_tokens} tokens")
+    report.iterations = iteration
+    report.context_tokens += state.context_tokens
+
+    # Check if the agent signalled 'done'.
+    # We look for a ToolMessage with the content "RALPH_DONE"
+    # The agent loop in create_single_step_agent is: Agent -> Tools -> End
+    # So we might get multiple messages back (AI message + Tool output).
+    for msg in messages[-2:]: # Check last 2 messages just in case
+        if hasattr(msg, "content") and msg.content == "RALPH_DONE":
+             # Double check it is a ToolMessage
+             if msg.type == "tool":
+                 report.done = True
+                 return messages, True
+    return messages, False
+
+
+def run_loop(
+    instruction_file: str,
+    directory: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None = None,
+    llm: Any = None,
+):
+    """
+    Run the Ralph loop.
+
+    This function initializes the agent, sets up the environment, and runs the
+    agent in a loop until the objective is met or the limit is reached.
+
+    The agent state is persisted after every step in a SQLite checkpoint file in the
+    working directory, keyed by a thread id. Passing that thread id as `resume`
+    continues the run from its last committed step. When `aiclient.streaming` is set,
+    the agent's output is printed token by token as it is generated.
+
+    Args:
+        instruction_file (str): Path to the instruction file.
+        directory (str): The working directory.
+        limit (int): Max iterations for the loop.
+        config (RalphConfig): The Ralph configuration object.
+        resume (str | None, optional): Thread id of a previous run to resume. Defaults to None.
+        llm (BaseChatModel, optional): The chat model to use instead of constructing one from the
+            config (e.g. a scripted model in benchmarks). Defaults to None.
+
+    Returns:
+        LoopReport: Summary of the run.
+    """
+    started = time.perf_counter()
+    report = LoopReport(workdir=os.path.abspath(directory))
+    tracing.configure_tracing(config.tracing)
+    try:
+        with tracing.span("ralph.loop", {"ralph.workdir": report.workdir, "ralph.limit": limit}) as span:
+            try:
+                _run_loop(instruction_file, directory, limit, config, resume, llm, report)
+            finally:
+                _finish_loop_span(span, report)
+    finally:
+        report.elapsed = time.perf_counter() - started
+        tracing.flush_tracing()
+    if report.input_tokens:
+        click.echo(report.usage_summary())
+    return report
+
+
+def _run_loop(
+    instruction_file: str,
+    directory: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None,
+    llm: Any,
+    report: LoopReport,
+):
+    """
+    Body of `run_loop`, recording progress in `report`.
+    """
+    prepared = _prepare_workspace(instruction_file, directory, resume)
+    if prepared is None:
+        report.error = "Workspace setup failed"
         return
+    instruction, abs_dir, target_instr_path = prepared
 
     # Change working directory to the target workspace
     # This ensures that all agent file operations (which default to relative paths)
@@ -127,66 +416,232 @@ def run_loop(instruction_file: str, directory: str, limit: int, config: RalphCon
          click.echo(f"Error changing directory to {abs_dir}: {e}", err=True)
          return
 
-    # Create the agent once
-    # We pass abs_dir, but since we are IN abs_dir, tools working on "." will work fine.
-    # We pass the instruction string as a fallback, but the loop will prioritize the file.
-    agent = create_single_step_agent(instruction, abs_dir, config)
-
-    # Initialize messages with the user's request
-    messages = [("user", "Please execute the instruction.")]
+    thread_id = resume or uuid.uuid4().hex
+    report.thread_id = thread_id
+    run_config = {"configurable": {"workdir": abs_dir, "instruction_path": target_instr_path, "thread_id": thread_id}}
+    metrics = _metrics_recorder(config, abs_dir, thread_id)
+    if metrics is not None:
+        run_config["configurable"]["metrics"] = metrics
+    prefetcher = _prefetcher(config, abs_dir)
+    if prefetcher is not None:
+        run_config["configurable"]["prefetch"] = prefetcher
 
-    from langchain_core.messages import ToolMessage
+    try:
+        _run_iterations(instruction, abs_dir, limit, config, resume, llm, report, run_config, metrics)
+    finally:
+        _print_metrics(metrics, config)
+
+
+def _run_iterations(
+    instruction: str,
+    abs_dir: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None,
+    llm: Any,
+    report: LoopReport,
+    run_config: dict,
+    metrics: "MetricsRecorder | None",
+):
+    """
+    Iterations of `run_loop`, recording progress in `report` and `metrics`.
+    """
+    # Import locally to avoid circular dependencies
+    from ralph.agent import create_single_step_agent
+    from ralph.checkpoint import open_checkpointer
+    from ralph.streaming import stream_step
+
+    thread_id = report.thread_id
+    with open_checkpointer(abs_dir) as checkpointer:
+        # Create the agent once
+        # We pass abs_dir, but since we are IN abs_dir, tools working on "." will work fine.
+        # We pass the instruction string as a fallback, but the loop will prioritize the file.
+        agent = create_single_step_agent(instruction, abs_dir, config, checkpointer=checkpointer, llm=llm)
+
+        initial = _initial_inputs(agent.get_state(run_config) if resume else None, thread_id, resume)
+        if initial is None:
+            report.error = f"No checkpoint found for thread '{resume}'"
+            return
+        inputs, messages = initial
+
+        for i in range(limit):
+            click.echo(f"Starting iteration {i+1}/{limit}...")
+
+            with tracing.span("ralph.iteration", {"ralph.iteration": i + 1}) as span:
+                try:
+                    # The checkpointer holds the history, so only new input is sent; each step
+                    # is committed before the next one starts.
+                    # Pass the instruction_path in the config so the agent reads the latest version each time
+                    if config.aiclient.streaming:
+                        result = stream_step(agent, inputs, run_config)
+                    else:
+                        result = agent.invoke(inputs, run_config)
+                    inputs = {"messages": []}
+
+                    messages, is_done = _report_step(i + 1, result, messages, report)
+                    _end_iteration(metrics, i + 1, report, result.get("context_tokens", 0))
+                    tracing.set_attributes(span, {"ralph.context_tokens": result.get("context_tokens"), "ralph.done": is_done})
+                    if is_done:
+                        click.echo("Objective met (agent signaled done).")
+                        break
+
+                except Exception as e:
+                    report.error = str(e)
+                    _end_iteration(metrics, i + 1, report, 0)
+                    tracing.set_error(span, type(e).__name__, str(e))
+                    click.echo(f"Error in iteration {i+1}: {e}", err=True)
+                    click.echo(f"Resume from the last committed step with --resume {thread_id}", err=True)
+                    # Depending on the error, we might want to stop or continue.
+                    # If the agent crashes, maybe we should stop?
+                    # For now, let's break to avoid infinite error loops if state is corrupted.
+                    break
+
+
+async def arun_loop(
+    instruction_file: str,
+    directory: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None = None,
+    llm: Any = None,
+    llm_limiter: asyncio.Semaphore | None = None,
+    stream: bool | None = None,
+) -> LoopReport:
+    """
+    Run the Ralph loop asynchronously.
 
-    for i in range(limit):
-        click.echo(f"Starting iteration {i+1}/{limit}...")
+    Behaves like `run_loop`, but drives the agent with `ainvoke` so that LLM round-trips,
+    tool calls and commands do not block the event loop. Several loops (for different
+    working directories) can run concurrently on one event loop. Unlike `run_loop`, it does
+    not change the process working directory; tools resolve paths against the workdir.
 
-        try:
-            # Run the agent with the current state (messages)
-            # The agent returns a dict with "messages". usage: result["messages"] contains the NEW messages added.
-            # However, standard LangGraph invocation usually returns the full state or updates.
-            # create_single_step_agent uses a StateGraph with "messages" key.
-            # invoking it with input state returns the final state.
-
-            # Keep track of message count before invoke
-            prev_msg_count = len(messages)
-
-            # Pass the instruction_path in the config so the agent reads the latest version each time
-            result = agent.invoke(
-                {"messages": messages},
-                {"configurable": {"workdir": abs_dir, "instruction_path": target_instr_path}}
-            )
-
-            # Convert result to AgentState for validation and easier access
-            state = AgentState(**result)
-            messages = state.messages
-
-            # Print new messages
-            new_msgs = messages[prev_msg_count:]
-            for msg in new_msgs:
-                click.echo(f"\n[{msg.type.upper()}]: {msg.content}\n")
-
-            # Check if the agent signalled 'done'.
-            # We look for a ToolMessage with the content "RALPH_DONE"
-            is_done = False
-
-            # Scan recent messages for done signal
-            # The agent loop in create_single_step_agent is: Agent -> Tools -> End
-            # So we might get multiple messages back (AI message + Tool output).
-
-            for msg in messages[-2:]: # Check last 2 messages just in case
-                if hasattr(msg, "content") and msg.content == "RALPH_DONE":
-                     # Double check it is a ToolMessage
-                     if msg.type == "tool":
-                         is_done = True
-                         break
-
-            if is_done:
-                click.echo("Objective met (agent signaled done).")
-                break
+    Args:
+        instruction_file (str): Path to the instruction file.
+        directory (str): The working directory.
+        limit (int): Max iterations for the loop.
+        config (RalphConfig): The Ralph configuration object.
+        resume (str | None, optional): Thread id of a previous run to resume. Defaults to None.
+        llm (BaseChatModel, optional): A chat model shared between loops. Defaults to None.
+        llm_limiter (asyncio.Semaphore | None, optional): Semaphore bounding concurrent LLM
+            requests across loops. Defaults to None.
+        stream (bool | None, optional): Print the agent's tokens as they are generated, using
+            `astream_events`. Defaults to None (follow `aiclient.streaming`).
+
+    Returns:
+        LoopReport: Summary of the run.
+    """
+    started = time.perf_counter()
+    report = LoopReport(workdir=os.path.abspath(directory))
+    if stream is None:
+        stream = config.aiclient.streaming
+    tracing.configure_tracing(config.tracing)
+    try:
+        with tracing.span("ralph.loop", {"ralph.workdir": report.workdir, "ralph.limit": limit}) as span:
+            try:
+                await _arun_loop(instruction_file, directory, limit, config, resume, llm, llm_limiter, stream, report)
+            finally:
+                _finish_loop_span(span, report)
+    finally:
+        report.elapsed = time.perf_counter() - started
+        tracing.flush_tracing()
+    if report.input_tokens:
+        click.echo(f"[{report.workdir}] {report.usage_summary()}")
+    return report
+
+
+async def _arun_loop(
+    instruction_file: str,
+    directory: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None,
+    llm: Any,
+    llm_limiter: asyncio.Semaphore | None,
+    stream: bool,
+    report: LoopReport,
+):
+    """
+    Body of `arun_loop`, recording progress in `report`.
+    """
+    prepared = _prepare_workspace(instruction_file, directory, resume)
+    if prepared is None:
+        report.error = "Workspace setup failed"
+        return
+    instruction, abs_dir, target_instr_path = prepared
+
+    label = f"[{abs_dir}] "
+    thread_id = resume or uuid.uuid4().hex
+    report.thread_id = thread_id
+    run_config = {"configurable": {"workdir": abs_dir, "instruction_path": target_instr_path, "thread_id": thread_id}}
+    metrics = _metrics_recorder(config, abs_dir, thread_id)
+    if metrics is not None:
+        run_config["configurable"]["metrics"] = metrics
+    prefetcher = _prefetcher(config, abs_dir)
+    if prefetcher is not None:
+        run_config["configurable"]["prefetch"] = prefetcher
 
-        except Exception as e:
-            click.echo(f"Error in iteration {i+1}: {e}", err=True)
-            # Depending on the error, we might want to stop or continue.
-            # If the agent crashes, maybe we should stop?
-            # For now, let's break to avoid infinite error loops if state is corrupted.
-            break
+    try:
+        await _arun_iterations(instruction, abs_dir, limit, config, resume, llm, llm_limiter, stream, report, run_config, metrics)
+    finally:
+        _print_metrics(metrics, config, label)
+
+
+async def _arun_iterations(
+    instruction: str,
+    abs_dir: str,
+    limit: int,
+    config: RalphConfig,
+    resume: str | None,
+    llm: Any,
+    llm_limiter: asyncio.Semaphore | None,
+    stream: bool,
+    report: LoopReport,
+    run_config: dict,
+    metrics: "MetricsRecorder | None",
+):
+    """
+    Iterations of `arun_loop`, recording progress in `report` and `metrics`.
+    """
+    # Import locally to avoid circular dependencies
+    from ralph.agent import create_single_step_agent
+    from ralph.checkpoint import open_checkpointer
+    from ralph.streaming import astream_step
+
+    label = f"[{abs_dir}] "
+    thread_id = report.thread_id
+    with open_checkpointer(abs_dir) as checkpointer:
+        agent = create_single_step_agent(
+            instruction, abs_dir, config, checkpointer=checkpointer, llm=llm, llm_limiter=llm_limiter
+        )
+
+        initial = _initial_inputs(await agent.aget_state(run_config) if resume else None, thread_id, resume)
+        if initial is None:
+            report.error = f"No checkpoint found for thread '{resume}'"
+            return
+        inputs, messages = initial
+
+        for i in range(limit):
+            click.echo(f"{label}Starting iteration {i+1}/{limit}...")
+
+            with tracing.span("ralph.iteration", {"ralph.iteration": i + 1}) as span:
+                try:
+                    if stream:
+                        result = await astream_step(agent, inputs, run_config, label)
+                    else:
+                        result = await agent.ainvoke(inputs, run_config)
+                    inputs = {"messages": []}
+
+                    messages, is_done = _report_step(i + 1, result, messages, report, label)
+                    _end_iteration(metrics, i + 1, report, result.get("context_tokens", 0), label)
+                    tracing.set_attributes(span, {"ralph.context_tokens": result.get("context_tokens"), "ralph.done": is_done})
+                    if is_done:
+                        click.echo(f"{label}Objective met (agent signaled done).")
+                        break
+
+                except Exception as e:
+                    report.error = str(e)
+                    _end_iteration(metrics, i + 1, report, 0, label)
+                    tracing.set_error(span, type(e).__name__, str(e))
+                    click.echo(f"{label}Error in iteration {i+1}: {e}", err=True)
+                    click.echo(f"Resume from the last committed step with --resume {thread_id}", err=True)
+                    break
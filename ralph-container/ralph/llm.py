@@ -5,16 +5,17 @@ This module provides functions to create and configure LangChain chains
 for interacting with Large Language Models.
 """
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from ralph.config import RalphConfig
+from ralph.cache import llm_cache
+from ralph.models import llm_model
 
 def get_chain(config: RalphConfig):
     """
     Create and return a simple LangChain chain for answering questions.
 
-    This chain uses the configured Google GenAI model.
+    This chain uses the configured model provider; only that provider's SDK is imported.
 
     Args:
         config (RalphConfig): The Ralph configuration object.
@@ -24,17 +25,12 @@ def get_chain(config: RalphConfig):
                   and returns a string response.
 
     Raises:
-        ValueError: If the Google API key is not set in the configuration.
+        ValueError: If the Google API key is not set when using Google GenAI, or the provider is unsupported.
     """
-    if not config.aiclient.google_api_key:
+    if config.aiclient.model_provider == "google_genai" and not config.aiclient.google_api_key:
         raise ValueError("GOOGLE_API_KEY environment variable is not set.")
 
-    # Initialize the Google Gemini model
-    # Using gemini-pro as a safe default, or user could specify via env vars if we expanded settings
-    llm = ChatGoogleGenerativeAI(
-        model=config.aiclient.model or "gemini-pro",
-        google_api_key=config.aiclient.google_api_key.get_secret_value()
-    )
+    llm = llm_model(config.aiclient, cache=llm_cache(config.cache))
 
     # Create a simple prompt template
     prompt = ChatPromptTemplate.from_messages([
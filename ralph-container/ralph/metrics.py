@@ -0,0 +1,320 @@
+"""
+Metrics module for Ralph.
+
+This module records where the time and tokens of a loop go: the latency and token
+usage of each LLM call made by the agent node, the wall time of each graph node, and the
+wall time, output size and errors of each tool call, the latency, tokens and cost of
+each model route, and the files prefetched and the prefetch cache's hits and misses. A
+`MetricsRecorder` is passed to the graph in the runtime config (`configurable["metrics"]`);
+nodes and the tool executor look it up with `run_metrics` and record nothing when it is
+absent.
+
+At the end of every iteration the recorder appends one JSON record to a JSONL file
+(by default `<workdir>/.ralph/metrics.jsonl`), and at the end of the run it renders a
+summary table of the totals.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+
+def _llm_totals() -> dict[str, Any]:
+    """Return empty LLM call totals."""
+    return {
+        "calls": 0,
+        "latency": 0.0,
+        "first_token": 0.0,
+        "input_tokens": 0,
+        "cached_input_tokens": 0,
+        "output_tokens": 0,
+    }
+
+
+def _tool_totals() -> dict[str, Any]:
+    """Return empty totals for one tool."""
+    return {"calls": 0, "seconds": 0.0, "bytes": 0, "errors": 0}
+
+
+def _route_totals() -> dict[str, Any]:
+    """Return empty totals for one model route."""
+    return {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0, "errors": 0}
+
+
+def _prefetch_totals() -> dict[str, Any]:
+    """Return empty prefetch totals."""
+    return {"files": 0, "bytes": 0, "hits": 0, "misses": 0}
+
+
+class _Totals:
+    """Accumulated metrics of one iteration or of a whole run."""
+
+    def __init__(self):
+        self.llm = _llm_totals()
+        self.nodes: dict[str, float] = {}
+        self.tools: dict[str, dict[str, Any]] = {}
+        self.routes: dict[str, dict[str, Any]] = {}
+        self.prefetch = _prefetch_totals()
+
+    def merge(self, other: "_Totals"):
+        for key, value in other.llm.items():
+            self.llm[key] += value
+        for name, seconds in other.nodes.items():
+            self.nodes[name] = self.nodes.get(name, 0.0) + seconds
+        for name, stats in other.tools.items():
+            totals = self.tools.setdefault(name, _tool_totals())
+            for key, value in stats.items():
+                totals[key] += value
+        for name, stats in other.routes.items():
+            totals = self.routes.setdefault(name, _route_totals())
+            for key, value in stats.items():
+                totals[key] += value
+        for key, value in other.prefetch.items():
+            self.prefetch[key] += value
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "llm": {k: round(v, 6) if isinstance(v, float) else v for k, v in self.llm.items()},
+            "nodes": {name: round(seconds, 6) for name, seconds in self.nodes.items()},
+            "tools": {
+                name: {k: round(v, 6) if isinstance(v, float) else v for k, v in stats.items()}
+                for name, stats in sorted(self.tools.items())
+            },
+            "routes": {
+                name: {k: round(v, 6) if isinstance(v, float) else v for k, v in stats.items()}
+                for name, stats in sorted(self.routes.items())
+            },
+            "prefetch": dict(self.prefetch),
+        }
+
+
+class MetricsRecorder:
+    """
+    Collects per-iteration and per-run metrics of a loop.
+
+    Recording methods are thread-safe, since the tool calls of one turn run concurrently.
+
+    Attributes:
+        path (str | None): The JSONL file iteration records are appended to, if any.
+        labels (dict[str, Any]): Fields added to every record (e.g. workdir and thread id).
+        iterations (int): Number of iterations recorded.
+    """
+
+    def __init__(self, path: str | None = None, **labels: Any):
+        self.path = path
+        self.labels = labels
+        self.iterations = 0
+        self._current = _Totals()
+        self._run = _Totals()
+        self._started = time.perf_counter()
+        self._iteration_started = self._started
+        self._lock = threading.Lock()
+
+    def llm_call(self, latency: float, usage: dict | None = None, first_token: float | None = None):
+        """
+        Record an LLM call.
+
+        Args:
+            latency (float): Wall time of the call in seconds.
+            usage (dict | None, optional): The response's `usage_metadata`. Defaults to None.
+            first_token (float | None, optional): Seconds until the first streamed chunk. Defaults to None.
+        """
+        usage = usage or {}
+        with self._lock:
+            llm = self._current.llm
+            llm["calls"] += 1
+            llm["latency"] += latency
+            llm["first_token"] += first_token or 0.0
+            llm["input_tokens"] += usage.get("input_tokens", 0) or 0
+            llm["cached_input_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+            llm["output_tokens"] += usage.get("output_tokens", 0) or 0
+
+    def node(self, name: str, seconds: float):
+        """
+        Record the wall time of a graph node.
+
+        Args:
+            name (str): The node name.
+            seconds (float): Wall time in seconds.
+        """
+        with self._lock:
+            self._current.nodes[name] = self._current.nodes.get(name, 0.0) + seconds
+
+    def tool_call(self, name: str, seconds: float, output_bytes: int, error: bool = False):
+        """
+        Record a tool call.
+
+        Args:
+            name (str): The tool name.
+            seconds (float): Wall time of the call in seconds.
+            output_bytes (int): Size of the output returned to the model, in UTF-8 bytes.
+            error (bool, optional): Whether the call failed. Defaults to False.
+        """
+        with self._lock:
+            stats = self._current.tools.setdefault(name, _tool_totals())
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["bytes"] += output_bytes
+            stats["errors"] += int(error)
+
+    def route_call(self, name: str, seconds: float, usage: dict | None = None, cost: float = 0.0, error: bool = False):
+        """
+        Record a request sent through a model route.
+
+        Args:
+            name (str): The route name (provider/model).
+            seconds (float): Wall time of the request in seconds, including retries.
+            usage (dict | None, optional): The response's `usage_metadata`. Defaults to None.
+            cost (float, optional): Price of the request. Defaults to 0.
+            error (bool, optional): Whether the request failed. Defaults to False.
+        """
+        usage = usage or {}
+        with self._lock:
+            stats = self._current.routes.setdefault(name, _route_totals())
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["input_tokens"] += usage.get("input_tokens", 0) or 0
+            stats["output_tokens"] += usage.get("output_tokens", 0) or 0
+            stats["cost"] += cost
+            stats["errors"] += int(error)
+
+    def prefetch(self, files: int = 0, bytes: int = 0, hits: int = 0, misses: int = 0):
+        """
+        Record prefetched files and lookups in the prefetch cache.
+
+        Args:
+            files (int, optional): Files read into the cache. Defaults to 0.
+            bytes (int, optional): Bytes read into the cache. Defaults to 0.
+            hits (int, optional): Reads served from the cache. Defaults to 0.
+            misses (int, optional): Reads that were not. Defaults to 0.
+        """
+        with self._lock:
+            stats = self._current.prefetch
+            stats["files"] += files
+            stats["bytes"] += bytes
+            stats["hits"] += hits
+            stats["misses"] += misses
+
+    def end_iteration(self, iteration: int, **fields: Any) -> dict[str, Any]:
+        """
+        Close the current iteration, append its record to the JSONL file and add it to the run totals.
+
+        Args:
+            iteration (int): The 1-based iteration number.
+            **fields: Extra fields for the record (e.g. `context_tokens`, `error`).
+
+        Returns:
+            dict[str, Any]: The record.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            current, self._current = self._current, _Totals()
+            self._run.merge(current)
+            self.iterations += 1
+            elapsed, self._iteration_started = now - self._iteration_started, now
+
+        record = {
+            "ts": time.time(),
+            **self.labels,
+            "iteration": iteration,
+            "elapsed": round(elapsed, 6),
+            **fields,
+            **current.as_dict(),
+        }
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    def totals(self) -> dict[str, Any]:
+        """
+        Return the totals of the iterations recorded so far.
+
+        Returns:
+            dict[str, Any]: The `llm`, `nodes`, `tools`, `routes` and `prefetch` totals.
+        """
+        with self._lock:
+            return self._run.as_dict()
+
+    def summary(self) -> str:
+        """
+        Render the run totals as a table: one row for the LLM, one per graph node, one per tool
+        and one per model route, followed by the prefetch hit rate if files were prefetched.
+
+        Returns:
+            str: The table.
+        """
+        totals = self.totals()
+        elapsed = time.perf_counter() - self._started
+        header = ("", "calls", "total s", "mean s", "in tok", "cached", "out tok", "bytes", "errors", "cost")
+        rows = []
+
+        llm = totals["llm"]
+        if llm["calls"]:
+            rows.append((
+                "llm", llm["calls"], f"{llm['latency']:.2f}", f"{llm['latency'] / llm['calls']:.2f}",
+                llm["input_tokens"], llm["cached_input_tokens"], llm["output_tokens"], "", "", "",
+            ))
+        for name, seconds in totals["nodes"].items():
+            rows.append((f"node:{name}", "", f"{seconds:.2f}", "", "", "", "", "", "", ""))
+        for name, stats in totals["tools"].items():
+            rows.append((
+                f"tool:{name}", stats["calls"], f"{stats['seconds']:.2f}", f"{stats['seconds'] / stats['calls']:.2f}",
+                "", "", "", stats["bytes"], stats["errors"], "",
+            ))
+        for name, stats in totals["routes"].items():
+            rows.append((
+                f"route:{name}", stats["calls"], f"{stats['seconds']:.2f}", f"{stats['seconds'] / stats['calls']:.2f}",
+                stats["input_tokens"], "", stats["output_tokens"], "", stats["errors"], f"{stats['cost']:.4f}",
+            ))
+
+        table = [tuple(str(cell) for cell in row) for row in (header, *rows)]
+        widths = [max(len(row[col]) for row in table) for col in range(len(header))]
+        lines = [f"Metrics: {self.iterations} iterations in {elapsed:.1f}s"]
+        for row in table:
+            lines.append("  ".join(
+                cell.ljust(widths[col]) if col == 0 else cell.rjust(widths[col]) for col, cell in enumerate(row)
+            ).rstrip())
+        prefetch = totals["prefetch"]
+        lookups = prefetch["hits"] + prefetch["misses"]
+        if prefetch["files"] or lookups:
+            rate = f"{100 * prefetch['hits'] / lookups:.0f}%" if lookups else "n/a"
+            lines.append(
+                f"Prefetch: {prefetch['files']} files ({prefetch['bytes']} bytes) prefetched; "
+                f"{prefetch['hits']} hits, {prefetch['misses']} misses ({rate} hit rate)"
+            )
+        return "\n".join(lines)
+
+
+def run_metrics(config: RunnableConfig | None) -> MetricsRecorder | None:
+    """
+    Return the metrics recorder of a run, if metrics are enabled.
+
+    Args:
+        config (RunnableConfig | None): The runtime configuration.
+
+    Returns:
+        MetricsRecorder | None: The recorder passed as `configurable["metrics"]`, or None.
+    """
+    if not config:
+        return None
+    return config.get("configurable", {}).get("metrics")
+
+
+def output_bytes(content: Any) -> int:
+    """
+    Return the size of a tool output in UTF-8 bytes.
+
+    Args:
+        content (Any): The ToolMessage content (text or content blocks).
+
+    Returns:
+        int: The size.
+    """
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    return len(text.encode("utf-8"))
@@ -0,0 +1,167 @@
+"""
+Models module for Ralph.
+
+This module constructs chat model clients and shares them: constructing a client is
+comparatively slow, so callers that run many agents (fleets, repeated ReAct iterations)
+reuse one client per provider configuration. Provider SDKs are imported only when a
+model of that provider is constructed.
+"""
+
+import json
+import os
+from typing import Any
+
+from pydantic import SecretStr
+
+from ralph.config import RalphConfig, LangchainConfig
+
+GITHUB_MODELS_URL = "https://models.github.ai/inference"
+
+
+def _langchain_openai() -> Any:
+    """Import langchain-openai, which the optional `openai` extra installs."""
+    try:
+        import langchain_openai
+    except ImportError as e:
+        raise ImportError(
+            f"The azure_openai and github providers need langchain-openai ({e}); "
+            "install it with `pip install 'ralph[openai]'` or `poetry install --extras openai`."
+        ) from e
+    return langchain_openai
+
+
+def llm_model(config: LangchainConfig, cache: Any = None, max_retries: int | None = None):
+    """
+    Initialize and return the LLM model based on the configuration.
+
+    Requests time out after `config.timeout` seconds.
+
+    Args:
+        config (LangchainConfig): The LangChain configuration.
+        cache (BaseCache, optional): Response cache for the model. Defaults to None (no cache).
+        max_retries (int | None, optional): Retries made by the provider SDK itself; 0 when
+            the request scheduler retries instead. Defaults to None (the SDK's default).
+
+    Returns:
+        BaseChatModel: The initialized chat model (Google, Azure, GitHub Models or Ollama).
+
+    Raises:
+        ValueError: If the model provider is unsupported.
+        ImportError: If the provider's SDK is not installed.
+    """
+    retries = {} if max_retries is None else {"max_retries": max_retries}
+    match config.model_provider:
+        case "google_genai":
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            model = ChatGoogleGenerativeAI(
+                model=config.model,
+                google_api_key=config.google_api_key.get_secret_value(),
+                timeout=config.timeout,
+                cache=cache,
+                **retries,
+            )
+        case "azure_openai":
+            model = _langchain_openai().AzureChatOpenAI(
+                model=config.model,
+                azure_endpoint=str(config.azure_endpoint),
+                api_version=config.azure_api_version,
+                api_key=config.azure_api_key.get_secret_value(),
+                timeout=config.timeout,
+                cache=cache,
+                **retries,
+            )
+        case "github":
+            # GitHub Models serves an OpenAI-compatible API; model ids are "<publisher>/<model>"
+            api_key = config.github_api_key.get_secret_value() if config.github_api_key else os.environ.get("GITHUB_TOKEN")
+            if not api_key:
+                raise ValueError("github_api_key is not set and GITHUB_TOKEN environment variable is not set.")
+            model = _langchain_openai().ChatOpenAI(
+                model=config.model,
+                base_url=str(config.github_api_base_url or GITHUB_MODELS_URL),
+                api_key=api_key,
+                timeout=config.timeout,
+                cache=cache,
+                **retries,
+            )
+        case "ollama":
+            from langchain_ollama import ChatOllama
+
+            model = ChatOllama(
+                model=config.model,
+                base_url=config.ollama_base_url,
+                # The Ollama client does not retry
+                client_kwargs={"timeout": config.timeout},
+                cache=cache,
+            )
+        case _:
+            raise ValueError(f"Unsupported model provider: {config.model_provider}")
+
+    return model
+
+
+
+def sdk_retries(config: RalphConfig) -> int | None:
+    """
+    Return the retries left to the provider SDK of a client used through the request scheduler.
+
+    Args:
+        config (RalphConfig): The configuration.
+
+    Returns:
+        int | None: 0 while the scheduler is enabled (it retries instead), None otherwise.
+    """
+    return 0 if config.scheduler.enabled else None
+
+
+def provider_key(config: RalphConfig) -> str:
+    """
+    Return a key identifying the provider configuration, including secret values.
+
+    Args:
+        config (RalphConfig): The configuration whose `aiclient` section is keyed.
+
+    Returns:
+        str: The key.
+    """
+    values = {
+        name: value.get_secret_value() if isinstance(value, SecretStr) else str(value)
+        for name, value in config.aiclient
+    }
+    return json.dumps(values, sort_keys=True)
+
+
+class ModelPool:
+    """
+    Shares one chat model client per provider configuration.
+
+    Attributes:
+        scheduled (bool): Whether the clients are used through the request scheduler, in which
+            case the SDKs' own retries are disabled when it is enabled.
+    """
+
+    def __init__(self, scheduled: bool = False):
+        self.scheduled = scheduled
+        self._models: dict[str, Any] = {}
+
+    def get(self, config: RalphConfig) -> Any:
+        """
+        Return the shared chat model for a configuration, constructing it on first use.
+
+        Args:
+            config (RalphConfig): The configuration whose `aiclient` selects the model.
+
+        Returns:
+            BaseChatModel: The shared chat model.
+        """
+        from ralph.cache import llm_cache
+
+        key = provider_key(config)
+        if key not in self._models:
+            if config.aiclient.model_provider == "google_genai" and not config.aiclient.google_api_key:
+                raise ValueError("GOOGLE_API_KEY environment variable is not set.")
+            self._models[key] = llm_model(config.aiclient, cache=llm_cache(config.cache), max_retries=sdk_retries(config) if self.scheduled else None)
+        return self._models[key]
+
+    def __len__(self) -> int:
+        return len(self._models)
@@ -0,0 +1,280 @@
+"""
+Patch module for Ralph.
+
+This module applies the two kinds of edits accepted by the `edit_file` and `apply_patch`
+tools: search/replace blocks and unified diffs. Both are validated against the current
+file before anything is written; when a block or hunk does not match, a `PatchError`
+says which one and what the file actually contains, so the agent can re-read and retry.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+DEV_NULL = "/dev/null"
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when an edit or a diff does not apply to the current file."""
+
+
+def replace_blocks(text: str, edits: list[tuple[str, str]]) -> str:
+    """
+    Apply search/replace edits in order.
+
+    Each search text must occur exactly once in the text as modified by the previous edits.
+
+    Args:
+        text (str): The current file content.
+        edits (list[tuple[str, str]]): The (search, replace) pairs.
+
+    Returns:
+        str: The new content.
+
+    Raises:
+        PatchError: If a search text is empty, missing or not unique.
+    """
+    for number, (search, replace) in enumerate(edits, start=1):
+        if not search:
+            raise PatchError(f"edit {number}: the search text is empty")
+        count = text.count(search)
+        if count == 0:
+            raise PatchError(
+                f"edit {number}: search text not found; it must match the file exactly, "
+                f"including whitespace and indentation: {search[:200]!r}"
+            )
+        if count > 1:
+            raise PatchError(
+                f"edit {number}: search text occurs {count} times; include surrounding lines to make it unique"
+            )
+        text = text.replace(search, replace, 1)
+    return text
+
+
+@dataclass
+class Hunk:
+    """
+    One hunk of a unified diff.
+
+    Attributes:
+        old_start (int): First line of the hunk in the old file (1-based, 0 for an empty file).
+        old_lines (list[str]): Context and removed lines, without line endings.
+        new_lines (list[str]): Context and added lines, without line endings.
+        no_newline_at_end (bool | None): True if the new file ends without a line break,
+            False if only the old file did, None if the hunk does not say.
+    """
+    old_start: int
+    old_lines: list[str] = field(default_factory=list)
+    new_lines: list[str] = field(default_factory=list)
+    no_newline_at_end: bool | None = None
+
+
+@dataclass
+class FilePatch:
+    """
+    The hunks of a unified diff that apply to one file.
+
+    Attributes:
+        old_path (str | None): The path on the "---" line, without "a/" (None if absent).
+        new_path (str | None): The path on the "+++" line, without "b/" (None if absent).
+        hunks (list[Hunk]): The hunks, in file order.
+    """
+    old_path: str | None = None
+    new_path: str | None = None
+    hunks: list[Hunk] = field(default_factory=list)
+
+    @property
+    def path(self) -> str | None:
+        """The file the patch applies to."""
+        return self.old_path if self.new_path in (None, DEV_NULL) else self.new_path
+
+    @property
+    def creates(self) -> bool:
+        """Whether the patch creates the file."""
+        return self.old_path == DEV_NULL
+
+    @property
+    def deletes(self) -> bool:
+        """Whether the patch deletes the file."""
+        return self.new_path == DEV_NULL
+
+
+def _header_path(line: str) -> str:
+    """Return the path of a "---"/"+++" header, dropping timestamps and a/ b/ prefixes."""
+    path = line[4:].split("\t")[0].strip()
+    if path != DEV_NULL and path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return path
+
+
+def parse_unified_diff(diff: str) -> list[FilePatch]:
+    """
+    Parse a unified diff.
+
+    Lines outside of hunks other than the "---"/"+++" headers (e.g. "diff --git" or
+    "index" lines) are ignored. Hunks before any header form a patch without paths.
+
+    Args:
+        diff (str): The diff text.
+
+    Returns:
+        list[FilePatch]: The patches, one per file.
+
+    Raises:
+        PatchError: If the diff contains no hunks or a hunk is malformed.
+    """
+    patches: list[FilePatch] = []
+    current: FilePatch | None = None
+    hunk: Hunk | None = None
+    remaining = (0, 0)
+    last_kind = None
+
+    for line in diff.splitlines():
+        line = line.rstrip("\r")
+        if line.startswith("\\") and hunk is not None:
+            # "\ No newline at end of file" refers to the preceding line
+            if last_kind == "-":
+                hunk.no_newline_at_end = hunk.no_newline_at_end or False
+            else:
+                hunk.no_newline_at_end = True
+            continue
+        if hunk is not None and remaining != (0, 0):
+            kind, body = (line[:1], line[1:]) if line else (" ", "")
+            if kind == " " and remaining[0] and remaining[1]:
+                hunk.old_lines.append(body)
+                hunk.new_lines.append(body)
+                remaining = (remaining[0] - 1, remaining[1] - 1)
+            elif kind == "-" and remaining[0]:
+                hunk.old_lines.append(body)
+                remaining = (remaining[0] - 1, remaining[1])
+            elif kind == "+" and remaining[1]:
+                hunk.new_lines.append(body)
+                remaining = (remaining[0], remaining[1] - 1)
+            else:
+                raise PatchError(f"hunk {len(current.hunks)} of {current.path or 'the diff'}: unexpected line {line!r}; "
+                                 "the line counts in the @@ header do not match the hunk body")
+            last_kind = kind
+            continue
+        if line.startswith("--- "):
+            current = FilePatch(old_path=_header_path(line))
+            patches.append(current)
+            hunk = None
+        elif line.startswith("+++ "):
+            if current is None or current.new_path is not None:
+                current = FilePatch()
+                patches.append(current)
+            current.new_path = _header_path(line)
+            hunk = None
+        elif line.startswith("@@"):
+            match = _HUNK_HEADER.match(line)
+            if not match:
+                raise PatchError(f"malformed hunk header {line!r}; expected '@@ -start,count +start,count @@'")
+            if current is None:
+                current = FilePatch()
+                patches.append(current)
+            old_start, old_count, _, new_count = match.groups()
+            hunk = Hunk(old_start=int(old_start))
+            current.hunks.append(hunk)
+            remaining = (1 if old_count is None else int(old_count), 1 if new_count is None else int(new_count))
+            last_kind = None
+        elif hunk is not None and line[:1] in (" ", "+", "-"):
+            raise PatchError(f"hunk {len(current.hunks)} of {current.path or 'the diff'}: unexpected line {line!r}; "
+                             "the line counts in the @@ header do not match the hunk body")
+    if hunk is not None and remaining != (0, 0):
+        raise PatchError(f"hunk {len(current.hunks)} of {current.path or 'the diff'} is truncated: "
+                         f"{remaining[0]} old and {remaining[1]} new lines missing")
+
+    patches = [p for p in patches if p.hunks]
+    if not patches:
+        raise PatchError("no hunks found; expected a unified diff with '--- a/path', '+++ b/path' and '@@' lines")
+    return patches
+
+
+def diff_paths(diff: str) -> list[str]:
+    """
+    Return the paths a unified diff modifies, without validating it.
+
+    Args:
+        diff (str): The diff text.
+
+    Returns:
+        list[str]: The paths named on "---"/"+++" lines, excluding /dev/null.
+    """
+    paths = []
+    for line in diff.splitlines():
+        if line.startswith(("--- ", "+++ ")):
+            path = _header_path(line)
+            if path != DEV_NULL and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def _find_hunk(lines: list[str], old: list[str], expected: int, floor: int) -> int | None:
+    """Return where `old` occurs in `lines` at or after `floor`, closest to `expected`."""
+    if not old:
+        return min(max(expected, floor), len(lines))
+    last = len(lines) - len(old)
+    for distance in range(0, max(expected - floor, last - expected) + 1):
+        for pos in (expected - distance, expected + distance) if distance else (expected,):
+            if floor <= pos <= last and lines[pos:pos + len(old)] == old:
+                return pos
+    return None
+
+
+def _mismatch(lines: list[str], old: list[str], pos: int) -> str:
+    """Describe the first difference between the hunk and the file at `pos`."""
+    for i, expected in enumerate(old):
+        actual = lines[pos + i] if 0 <= pos + i < len(lines) else None
+        if actual != expected:
+            found = "end of file" if actual is None else repr(actual)
+            return f"line {pos + i + 1} should be {expected!r} but is {found}"
+    return "the file is shorter than the hunk"
+
+
+def apply_hunks(text: str, hunks: list[Hunk], path: str = "file") -> str:
+    """
+    Apply the hunks of a unified diff to a text.
+
+    A hunk whose context is not at the stated line (allowing for the offset of earlier
+    hunks) is applied at the nearest position where it matches exactly, as `patch` does.
+
+    Args:
+        text (str): The current file content.
+        hunks (list[Hunk]): The hunks, in file order.
+        path (str, optional): File name used in error messages. Defaults to "file".
+
+    Returns:
+        str: The new content.
+
+    Raises:
+        PatchError: If a hunk's context or removed lines do not match the file.
+    """
+    newline = "\r\n" if "\r\n" in text else "\n"
+    ends_with_newline = text.endswith("\n") or not text
+    lines = text.split(newline)
+    if lines and lines[-1] == "":
+        lines.pop()
+
+    offset = 0
+    floor = 0
+    for number, hunk in enumerate(hunks, start=1):
+        # Unified diffs give the line before an insertion for hunks without old lines
+        base = max(0, hunk.old_start - 1 if hunk.old_lines else hunk.old_start)
+        expected = base + offset
+        pos = _find_hunk(lines, hunk.old_lines, expected, floor)
+        if pos is None:
+            raise PatchError(
+                f"hunk {number} (@@ -{hunk.old_start},{len(hunk.old_lines)} @@) does not apply to {path}: "
+                f"{_mismatch(lines, hunk.old_lines, min(expected, max(0, len(lines) - 1)))}. "
+                "Re-read the file and regenerate the diff."
+            )
+        lines[pos:pos + len(hunk.old_lines)] = hunk.new_lines
+        floor = pos + len(hunk.new_lines)
+        offset = pos - base + len(hunk.new_lines) - len(hunk.old_lines)
+        if hunk.no_newline_at_end is not None and pos + len(hunk.new_lines) == len(lines):
+            ends_with_newline = not hunk.no_newline_at_end
+
+    if not lines:
+        return ""
+    return newline.join(lines) + (newline if ends_with_newline else "")
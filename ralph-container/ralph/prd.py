@@ -0,0 +1,243 @@
+"""
+PRD module for Ralph.
+
+This module provides the store behind the PRD tools. Stories in `prd.json` are indexed
+by `storyId`, and the parsed document is kept in memory and only re-read when the file
+changes on disk. Every change runs in a transaction: the store takes an exclusive file
+lock (so concurrent tool calls and other Ralph processes cannot lose each other's
+updates), applies any number of changes, and writes the file once, atomically.
+"""
+
+import contextlib
+import fcntl
+import json
+import math
+import os
+import threading
+import uuid
+from typing import Any, Iterator
+
+from ralph.files import atomic_write
+
+PRD_FILE = "prd.json"
+
+# Directory holding the lock file, excluded from listings
+STATE_DIR = ".ralph"
+LOCK_FILE = "prd.lock"
+
+
+def _empty() -> dict:
+    """Return the structure of a new PRD."""
+    return {"branchName": "main", "userStories": []}
+
+
+def _priority(story: dict) -> float:
+    """Return a story's priority for sorting (lower first, missing last)."""
+    value = story.get("priority")
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else math.inf
+
+
+class PrdStore:
+    """
+    Indexed, transactional access to a `prd.json` file.
+
+    Attributes:
+        path (str): The PRD file.
+        lock_path (str): The file locked during transactions.
+        loads (int): Number of times the file was parsed, for diagnostics.
+    """
+
+    def __init__(self, path: str, lock_path: str | None = None):
+        self.path = os.path.abspath(path)
+        self.lock_path = lock_path or self.path + ".lock"
+        self.loads = 0
+        self._data: dict | None = None
+        self._index: dict[str, int] = {}
+        self._stamp: tuple[int, int, int, int] | None = None
+        self._in_transaction = False
+        self._modified = False
+        self._lock = threading.RLock()
+
+    def _file_stamp(self) -> tuple[int, int, int, int] | None:
+        """
+        Return the (inode, size, mtime, ctime) of the PRD file, or None if it does not exist.
+
+        Writes replace the file atomically, so the inode changes even when a same-size rewrite
+        keeps the modification time within the filesystem's timestamp granularity.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+    def _load(self):
+        """Parse the file unless the cached document is current."""
+        stamp = self._file_stamp()
+        if self._data is not None and stamp == self._stamp:
+            return
+        data = _empty()
+        if stamp is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    data = _empty()
+            self.loads += 1
+        if not isinstance(data.get("userStories"), list):
+            data["userStories"] = []
+        self._data = data
+        self._stamp = stamp
+        self._reindex()
+
+    def _reindex(self):
+        """Rebuild the storyId index."""
+        self._index = {
+            str(story.get("storyId")): i
+            for i, story in enumerate(self._data["userStories"])
+            if isinstance(story, dict) and "storyId" in story
+        }
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator["PrdStore"]:
+        """
+        Lock the PRD, yield the store and write the file once if anything changed.
+
+        Calls made on the store inside the transaction are batched into that single write.
+        If the block raises, the changes are discarded.
+
+        Yields:
+            PrdStore: The store.
+        """
+        with self._lock:
+            if self._in_transaction:
+                # Nested transaction: the outer one writes
+                yield self
+                return
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._in_transaction = True
+                self._modified = False
+                try:
+                    self._load()
+                    yield self
+                    if self._modified:
+                        atomic_write(self.path, json.dumps(self._data, indent=2))
+                        self._stamp = self._file_stamp()
+                except BaseException:
+                    # Discard the in-memory changes
+                    self._data = None
+                    raise
+                finally:
+                    self._in_transaction = False
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stories(self) -> list[dict]:
+        """
+        Return the stories in file order.
+
+        Returns:
+            list[dict]: The stories.
+        """
+        with self._lock:
+            self._load()
+            return list(self._data["userStories"])
+
+    def get(self, story_id: str) -> dict | None:
+        """
+        Return a story by id.
+
+        Args:
+            story_id (str): The story id.
+
+        Returns:
+            dict | None: The story, or None if there is no such story.
+        """
+        with self._lock:
+            self._load()
+            i = self._index.get(str(story_id))
+            return None if i is None else self._data["userStories"][i]
+
+    def upsert(self, story_id: str | None, **fields: Any) -> tuple[dict, bool]:
+        """
+        Add a story, or update the fields of an existing one.
+
+        Fields given as None are left unchanged. New stories default to `passes: false`.
+
+        Args:
+            story_id (str | None): The story id; a new id is generated if None.
+            **fields: Story fields such as `storyTitle`, `notes`, `priority` or `passes`.
+
+        Returns:
+            tuple[dict, bool]: The story and whether it was created.
+        """
+        fields = {k: v for k, v in fields.items() if v is not None}
+        with self.transaction():
+            story = self.get(story_id) if story_id is not None else None
+            self._modified = True
+            if story is not None:
+                story.update(fields)
+                return story, False
+            story = {"storyId": story_id or str(uuid.uuid4())[:8], **fields}
+            story.setdefault("passes", False)
+            self._data["userStories"].append(story)
+            self._index[str(story["storyId"])] = len(self._data["userStories"]) - 1
+            return story, True
+
+    def update(self, story_ids: list[str], **fields: Any) -> list[str]:
+        """
+        Set fields (e.g. `passes` or `priority`) on several stories in one write.
+
+        Args:
+            story_ids (list[str]): The story ids.
+            **fields: The fields to set; None values are ignored.
+
+        Returns:
+            list[str]: The ids that were not found.
+        """
+        fields = {k: v for k, v in fields.items() if v is not None}
+        missing = []
+        with self.transaction():
+            for story_id in story_ids:
+                story = self.get(story_id)
+                if story is None:
+                    missing.append(story_id)
+                else:
+                    story.update(fields)
+                    self._modified = True
+        return missing
+
+    def next_failing(self) -> dict | None:
+        """
+        Return the failing story with the highest priority (lowest number).
+
+        Stories without a priority come last; ties keep file order.
+
+        Returns:
+            dict | None: The story, or None if every story passes.
+        """
+        failing = [s for s in self.stories() if isinstance(s, dict) and not s.get("passes")]
+        return min(failing, key=_priority, default=None)
+
+
+# One store per PRD file, shared by every tool call in the process
+_stores: dict[str, PrdStore] = {}
+_stores_lock = threading.Lock()
+
+
+def prd_store(workdir: str) -> PrdStore:
+    """
+    Return the shared store for the PRD of a working directory.
+
+    Args:
+        workdir (str): The working directory.
+
+    Returns:
+        PrdStore: The store.
+    """
+    root = os.path.abspath(workdir)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = PrdStore(os.path.join(root, PRD_FILE), os.path.join(root, STATE_DIR, LOCK_FILE))
+        return _stores[root]
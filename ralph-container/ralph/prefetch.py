@@ -0,0 +1,363 @@
+"""
+Prefetch module for Ralph.
+
+While the agent node waits for the model, the machine is otherwise idle. A `Prefetcher`
+uses that time to read the files the agent is likely to ask for next into a bounded
+in-process cache (which also warms the OS page cache): files recently written by the
+agent, files named in the instruction or in `prd.json`, and the files of the last
+`list_files` result. It also refreshes the workspace's `search_code` index if one has
+been built, so the next search does not have to reread changed files.
+
+`read_file` and `read_files` serve cached content when the file has not changed since it
+was read (same inode, size, modification and change time). Hits, misses and the files and
+bytes prefetched are recorded in the run's metrics.
+
+The prefetcher is passed to the graph in the runtime config (`configurable["prefetch"]`);
+nodes and tools look it up with `run_prefetcher` and do nothing when it is absent.
+"""
+
+import ast
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from ralph.config import PrefetchConfig
+from ralph.metrics import run_metrics
+from ralph.prd import PRD_FILE
+
+# Tools whose `path` arguments name files the agent has just written
+WRITE_TOOLS = {"write_file", "edit_file", "apply_patch", "write_files"}
+
+# Written files taken from this many recent messages
+_RECENT_MESSAGES = 8
+
+# Path-like words in the instruction and PRD: a file name with an extension, or a path with a slash
+_PATH_WORD = re.compile(r"[\w.\-]+(?:/[\w.\-]+)*\.\w+|[\w.\-]+(?:/[\w.\-]+)+")
+
+_PATCH_TARGET = re.compile(r"^\+\+\+ (?:b/)?(\S+)", re.MULTILINE)
+
+
+def _version(st: os.stat_result) -> tuple[int, int, int, int]:
+    """
+    Return what identifies a version of a file: inode, size, modification and change time.
+
+    The inode catches atomic replacements and the change time catches in-place rewrites
+    that restore the modification time; together they keep a same-size rewrite within the
+    filesystem's timestamp granularity from being served stale.
+    """
+    return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+@dataclass
+class _CachedFile:
+    """Content of one cached file and the version (see `_version`) it was read at."""
+    version: tuple[int, int, int, int]
+    data: bytes
+
+
+class FileCache:
+    """
+    Least recently used cache of file contents, bounded in bytes.
+
+    An entry is only served while the file is unchanged: same inode, size, modification
+    and change time.
+
+    Attributes:
+        max_bytes (int): The memory cap.
+        bytes (int): Bytes currently cached.
+        hits (int): Lookups served from the cache.
+        misses (int): Lookups that were not.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._files: OrderedDict[str, _CachedFile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, path: str):
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            self.bytes -= len(entry.data)
+
+    def cached(self, path: str, st: os.stat_result) -> bool:
+        """
+        Return whether a file is cached and unchanged, without counting a lookup.
+
+        Args:
+            path (str): The absolute path.
+            st (os.stat_result): The file's current stat.
+
+        Returns:
+            bool: True if the cached content is current.
+        """
+        with self._lock:
+            entry = self._files.get(path)
+            return entry is not None and entry.version == _version(st)
+
+    def get(self, path: str) -> bytes | None:
+        """
+        Return the content of a file if it is cached and unchanged.
+
+        Args:
+            path (str): The absolute path.
+
+        Returns:
+            bytes | None: The content, or None on a miss.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and st is not None and entry.version == _version(st):
+                self._files.move_to_end(path)
+                self.hits += 1
+                return entry.data
+            self._drop(path)
+            self.misses += 1
+            return None
+
+    def put(self, path: str, data: bytes, st: os.stat_result) -> bool:
+        """
+        Cache the content of a file, evicting least recently used files beyond the cap.
+
+        Args:
+            path (str): The absolute path.
+            data (bytes): The content.
+            st (os.stat_result): The stat taken before reading the content.
+
+        Returns:
+            bool: False if the content is larger than the cap and was not cached.
+        """
+        if len(data) != st.st_size or len(data) > self.max_bytes:
+            return False
+        with self._lock:
+            self._drop(path)
+            self._files[path] = _CachedFile(_version(st), data)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._files)))
+        return True
+
+
+def _listed_paths(content: Any) -> list[str]:
+    """Return the file paths of a `list_files` result (a list, or its JSON or repr text)."""
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            try:
+                content = ast.literal_eval(content)
+            except (ValueError, SyntaxError):
+                return []
+    if not isinstance(content, list):
+        return []
+    return [item for item in content if isinstance(item, str) and not item.startswith(("... ", "Note: ", "Error: "))]
+
+
+class Prefetcher:
+    """
+    Reads likely-needed files of a workspace in the background while the model is called.
+
+    Attributes:
+        root (str): The absolute workspace directory.
+        config (PrefetchConfig): The prefetch configuration.
+        cache (FileCache): The content cache served to `read_file` and `read_files`.
+    """
+
+    def __init__(self, workdir: str, config: PrefetchConfig):
+        self.root = os.path.abspath(workdir)
+        self.config = config
+        self.cache = FileCache(config.max_bytes)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _resolve(self, path: str, base: str | None = None) -> str | None:
+        """Return the absolute path of a workspace file, or None if it is outside the workspace or not a file."""
+        target = os.path.abspath(os.path.join(base or self.root, path))
+        if os.path.commonpath([self.root, target]) != self.root or not os.path.isfile(target):
+            return None
+        return target
+
+    def _written(self, messages: list[BaseMessage]) -> list[str]:
+        """Return the files written by the most recent tool calls, newest first."""
+        paths = []
+        for message in reversed(messages[-_RECENT_MESSAGES:]):
+            if not isinstance(message, AIMessage):
+                continue
+            for call in message.tool_calls:
+                if call["name"] not in WRITE_TOOLS:
+                    continue
+                args = call.get("args") or {}
+                if isinstance(args.get("path"), str):
+                    paths.append(args["path"])
+                for item in args.get("files") or []:
+                    if isinstance(item, dict) and isinstance(item.get("path"), str):
+                        paths.append(item["path"])
+                if isinstance(args.get("patch"), str):
+                    paths.extend(_PATCH_TARGET.findall(args["patch"]))
+        return paths
+
+    def _listed(self, messages: list[BaseMessage]) -> list[tuple[str, str | None]]:
+        """Return the files of the last `list_files` result, with the directory they are relative to."""
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+            if not isinstance(message, ToolMessage) or message.name != "list_files" or message.status == "error":
+                continue
+            base = None
+            for earlier in reversed(messages[:i]):
+                call = next((c for c in getattr(earlier, "tool_calls", None) or [] if c["id"] == message.tool_call_id), None)
+                if call is not None:
+                    base = os.path.join(self.root, str((call.get("args") or {}).get("path") or "."))
+                    break
+            return [(path, base) for path in _listed_paths(message.content)]
+        return []
+
+    def _mentioned(self, instruction_path: str | None) -> list[str]:
+        """Return the path-like words of the instruction and the PRD."""
+        words = []
+        for path in (instruction_path, os.path.join(self.root, PRD_FILE)):
+            if not path:
+                continue
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    words.extend(_PATH_WORD.findall(f.read()))
+            except OSError:
+                continue
+        return words
+
+    def candidates(self, messages: list[BaseMessage], instruction_path: str | None = None) -> list[str]:
+        """
+        Return the files worth prefetching, most likely first and at most `max_files`.
+
+        Recently written files come first, then files named in the instruction or PRD, then
+        the files of the last `list_files` result.
+
+        Args:
+            messages (list[BaseMessage]): The message history.
+            instruction_path (str | None, optional): The instruction file. Defaults to None.
+
+        Returns:
+            list[str]: Absolute paths of existing workspace files.
+        """
+        found: dict[str, None] = {}
+        named = [(path, None) for path in self._written(messages) + self._mentioned(instruction_path)]
+        for path, base in named + self._listed(messages):
+            target = self._resolve(path, base)
+            if target is not None:
+                found.setdefault(target)
+                if len(found) >= self.config.max_files:
+                    break
+        return list(found)
+
+    def warm(self, paths: list[str], config: RunnableConfig | None = None) -> tuple[int, int]:
+        """
+        Read files into the cache and the OS page cache.
+
+        Files larger than `max_file_bytes` are only advised to the OS page cache.
+
+        Args:
+            paths (list[str]): Absolute paths.
+            config (RunnableConfig | None, optional): The runtime config, for metrics. Defaults to None.
+
+        Returns:
+            tuple[int, int]: The number of files and bytes read.
+        """
+        files = read = 0
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    st = os.fstat(f.fileno())
+                    if self.cache.cached(path, st):
+                        continue
+                    if st.st_size > self.config.max_file_bytes:
+                        if hasattr(os, "posix_fadvise"):
+                            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                        continue
+                    data = f.read()
+            except OSError:
+                continue
+            if self.cache.put(path, data, st):
+                files += 1
+                read += len(data)
+        metrics = run_metrics(config)
+        if metrics is not None and files:
+            metrics.prefetch(files=files, bytes=read)
+        return files, read
+
+    def _run(self, messages: list[BaseMessage], config: RunnableConfig):
+        from ralph.search import built_index
+
+        instruction_path = config.get("configurable", {}).get("instruction_path")
+        self.warm(self.candidates(messages, instruction_path), config)
+        index = built_index(self.root)
+        if index is not None:
+            index.refresh()
+
+    def start(self, messages: list[BaseMessage], config: RunnableConfig):
+        """
+        Start prefetching in a background thread, unless the previous round is still running.
+
+        Args:
+            messages (list[BaseMessage]): The message history sent to the model.
+            config (RunnableConfig): The runtime config.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(list(messages), config), name="ralph-prefetch", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: float | None = None):
+        """
+        Wait for the current prefetch round to finish.
+
+        Args:
+            timeout (float | None, optional): Seconds to wait at most. Defaults to None.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def lookup(self, path: str, config: RunnableConfig | None = None) -> bytes | None:
+        """
+        Return the prefetched content of a file if it is current, recording a hit or a miss.
+
+        Args:
+            path (str): The absolute path.
+            config (RunnableConfig | None, optional): The runtime config, for metrics. Defaults to None.
+
+        Returns:
+            bytes | None: The content, or None on a miss.
+        """
+        data = self.cache.get(path)
+        metrics = run_metrics(config)
+        if metrics is not None:
+            metrics.prefetch(hits=int(data is not None), misses=int(data is None))
+        return data
+
+
+def run_prefetcher(config: RunnableConfig | None) -> Prefetcher | None:
+    """
+    Return the prefetcher of a run, if prefetching is enabled.
+
+    Args:
+        config (RunnableConfig | None): The runtime configuration.
+
+    Returns:
+        Prefetcher | None: The prefetcher passed as `configurable["prefetch"]`, or None.
+    """
+    if not config:
+        return None
+    return config.get("configurable", {}).get("prefetch")
@@ -0,0 +1,125 @@
+"""
+Prompt module for Ralph.
+
+This module builds the agent's system prompt. The prompt is assembled from segments
+ordered from most to least stable (fixed tool guidance, the workspace prompt, the
+working directory, then the instruction), and identical inputs always produce the same
+text, so that consecutive requests share a long common prefix that provider-side prompt
+caches and local KV caches (e.g. Ollama's) can reuse. The instruction file is cached
+and only re-read when its modification time or size changes, or when
+`update_instruction` writes it.
+"""
+
+import functools
+import os
+import threading
+
+from langchain_core.messages import SystemMessage
+
+# Tool guidance shared by every agent; kept first so it is the longest stable prefix
+AGENT_GUIDANCE = """You have tools to list, search, read, write and edit files, track the PRD, and run commands.
+If you need to explore the codebase, use list_files, search_code and read_file (or read_files for several files).
+Prefer edit_file or apply_patch over rewriting whole files with write_file.
+Do not hallucinate file contents. Always read them first.
+When you are satisfied that you have completed the task, call the done tool.
+If you cannot complete the task in one step, make progress and stop. You will be restarted with fresh context but the files will persist."""
+
+
+class InstructionCache:
+    """
+    Caches instruction files, keyed on their modification time and size.
+
+    Attributes:
+        reads (int): Number of times a file was read from disk, for diagnostics.
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self._entries: dict[str, tuple[tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str) -> tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def read(self, path: str) -> str:
+        """
+        Return the content of an instruction file, reading it only if it changed.
+
+        Args:
+            path (str): The instruction file.
+
+        Returns:
+            str: The content.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        path = os.path.abspath(path)
+        stamp = self._stamp(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        with self._lock:
+            self.reads += 1
+            self._entries[path] = (stamp, content)
+        return content
+
+    def store(self, path: str, content: str):
+        """
+        Record content just written to an instruction file, so it is not read back.
+
+        Args:
+            path (str): The instruction file.
+            content (str): The content written.
+        """
+        path = os.path.abspath(path)
+        stamp = self._stamp(path)
+        with self._lock:
+            self._entries[path] = (stamp, content)
+
+
+# Shared by every agent in the process
+instruction_cache = InstructionCache()
+
+
+@functools.lru_cache(maxsize=64)
+def build_system_prompt(base_prompt: str, abs_dir: str, instruction: str) -> str:
+    """
+    Build the system prompt from stable segments in a fixed order.
+
+    Args:
+        base_prompt (str): The workspace prompt read from prompts/agent/prompt.md.
+        abs_dir (str): The absolute working directory.
+        instruction (str): The current instruction.
+
+    Returns:
+        str: The system prompt.
+    """
+    segments = [
+        AGENT_GUIDANCE,
+        base_prompt.strip(),
+        f"You are working in the directory: {abs_dir}",
+        f"Your goal is to follow these instructions:\n{instruction.strip()}",
+    ]
+    return "\n\n".join(segment for segment in segments if segment) + "\n"
+
+
+@functools.lru_cache(maxsize=64)
+def system_message(base_prompt: str, abs_dir: str, instruction: str) -> SystemMessage:
+    """
+    Return the system message for a prompt, reusing the same message while inputs are unchanged.
+
+    Args:
+        base_prompt (str): The workspace prompt.
+        abs_dir (str): The absolute working directory.
+        instruction (str): The current instruction.
+
+    Returns:
+        SystemMessage: The system message.
+    """
+    return SystemMessage(content=build_system_prompt(base_prompt, abs_dir, instruction))
@@ -0,0 +1,250 @@
+"""
+Prompt cache module for Ralph.
+
+This module lets the agent use provider-side prompt caching for the static part of its
+requests: the system prompt and the tool declarations, which are identical on every step
+of a run. Each provider gets a strategy that turns (model, system message, history) into
+the model and messages actually sent:
+
+- Gemini: the prefix is stored once as cached content and the request refers to it by
+  name instead of resending it. Handles are shared across iterations and agents and
+  recreated when they expire.
+- OpenAI-compatible providers (Azure): caching is automatic for long prefixes; requests
+  carry a `prompt_cache_key` derived from the prefix so they are routed to the same cache.
+- Others (Ollama): the stable prefix already lets local KV caches be reused.
+
+How many input tokens were served from a cache is reported by the provider in each
+response's usage metadata (`input_token_details.cache_read`).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Sequence
+
+import click
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from ralph.config import LangchainConfig, PromptCacheConfig
+from ralph.scheduler import is_retryable
+
+# Cached content is recreated this many seconds before it expires (`ttl_seconds` must be longer)
+_EXPIRY_MARGIN = 60
+
+# After a transient failure to create cached content, the full prompt is sent for this long
+_RETRY_AFTER_FAILURE = 300
+
+
+def prefix_key(system: SystemMessage, tools: Sequence[Any]) -> str:
+    """
+    Return a digest identifying a static prefix (system prompt and tool declarations).
+
+    Args:
+        system (SystemMessage): The system message.
+        tools (Sequence[Any]): The tools bound to the model.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256(str(system.content).encode("utf-8"))
+    digest.update(json.dumps([convert_to_openai_tool(t) for t in tools], sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PromptCache:
+    """
+    Strategy without provider-side caching: the full prompt is sent every time.
+    """
+
+    def prepare(self, model: Any, system: SystemMessage, history: list[BaseMessage]) -> tuple[Any, list[BaseMessage]]:
+        """
+        Return the model to invoke and the messages to send for one step.
+
+        Args:
+            model (Runnable): The chat model with the tools bound.
+            system (SystemMessage): The system message.
+            history (list[BaseMessage]): The conversation history.
+
+        Returns:
+            tuple[Runnable, list[BaseMessage]]: The model and messages.
+        """
+        return model, [system] + history
+
+
+class OpenAIPromptCache(PromptCache):
+    """
+    Adds a `prompt_cache_key` derived from the static prefix to each request.
+    """
+
+    def __init__(self, tools: Sequence[Any]):
+        self.tools = list(tools)
+
+    def prepare(self, model: Any, system: SystemMessage, history: list[BaseMessage]) -> tuple[Any, list[BaseMessage]]:
+        key = prefix_key(system, self.tools)[:32]
+        return model.bind(prompt_cache_key=f"ralph-{key}"), [system] + history
+
+
+# Gemini cached content shared by every agent in the process: key -> (name, expires_at)
+_gemini_handles: dict[str, tuple[str, float]] = {}
+# Prefixes whose cached content could not be created: key -> time until which it is not retried
+_gemini_failed: dict[str, float] = {}
+# Held while a prefix's cached content is created, so each is created once without blocking other prefixes
+_gemini_creating: dict[str, threading.Lock] = {}
+_gemini_lock = threading.Lock()
+
+
+def _function_declarations(tools: Sequence[Any]) -> list[Any]:
+    """Convert tools to Gemini tool declarations, via their OpenAI JSON schemas."""
+    from google.genai import types
+
+    functions = [convert_to_openai_tool(t)["function"] for t in tools]
+    return [types.Tool(function_declarations=[
+        types.FunctionDeclaration(
+            name=f["name"], description=f.get("description", ""), parameters_json_schema=f.get("parameters")
+        )
+        for f in functions
+    ])]
+
+
+class GeminiPromptCache(PromptCache):
+    """
+    Stores the system prompt and tool declarations as Gemini cached content.
+
+    Attributes:
+        created (int): Number of cached contents this strategy created, for diagnostics.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        tools: Sequence[Any],
+        settings: PromptCacheConfig,
+        api_key: str,
+        count_text: Callable[[str], int],
+        client: Any = None,
+    ):
+        self.llm = llm
+        self.tools = list(tools)
+        self.settings = settings
+        self.api_key = api_key
+        self.count_text = count_text
+        self.created = 0
+        self._client = client
+
+    def _genai_client(self) -> Any:
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def _create(self, system: SystemMessage) -> str:
+        """Create cached content for the prefix and return its name."""
+        from google.genai import types
+
+        cached = self._genai_client().caches.create(
+            model=self.llm.model,
+            config=types.CreateCachedContentConfig(
+                display_name="ralph-prompt",
+                system_instruction=str(system.content),
+                tools=_function_declarations(self.tools),
+                ttl=f"{self.settings.ttl_seconds}s",
+            ),
+        )
+        self.created += 1
+        return cached.name
+
+    def handle(self, system: SystemMessage) -> str | None:
+        """
+        Return the cached content name for a prefix, creating it if needed.
+
+        Args:
+            system (SystemMessage): The system message.
+
+        Returns:
+            str | None: The name, or None if the prefix is too short or caching failed.
+        """
+        prefix_tokens = self.count_text(str(system.content)) + self.count_text(
+            json.dumps([convert_to_openai_tool(t) for t in self.tools])
+        )
+        if prefix_tokens < self.settings.min_tokens:
+            return None
+
+        key = f"{self.llm.model}:{prefix_key(system, self.tools)}"
+        name = self._current(key)
+        if name is not None or key in _gemini_failed:
+            return name
+        with _gemini_lock:
+            creating = _gemini_creating.setdefault(key, threading.Lock())
+        # Creating cached content is a network call: only requests for the same prefix wait for it
+        with creating:
+            name = self._current(key)
+            if name is not None or key in _gemini_failed:
+                return name
+            try:
+                name = self._create(system)
+            except Exception as e:
+                if is_retryable(e):
+                    until = time.time() + _RETRY_AFTER_FAILURE
+                    click.echo(f"Warning: Gemini context caching failed, sending the full prompt for now: {e}", err=True)
+                else:
+                    # E.g. a model without context caching; do not retry for this prefix
+                    until = float("inf")
+                    click.echo(f"Warning: Gemini context caching unavailable, sending the full prompt: {e}", err=True)
+                with _gemini_lock:
+                    _gemini_failed[key] = until
+                return None
+            with _gemini_lock:
+                _gemini_handles[key] = (name, time.time() + self.settings.ttl_seconds)
+            return name
+
+    def _current(self, key: str) -> str | None:
+        """Return the cached content name of a prefix if it is not about to expire, clearing expired failures."""
+        now = time.time()
+        with _gemini_lock:
+            if _gemini_failed.get(key, now) < now:
+                del _gemini_failed[key]
+            entry = _gemini_handles.get(key)
+            if entry is not None and entry[1] - _EXPIRY_MARGIN > now:
+                return entry[0]
+            return None
+
+    def prepare(self, model: Any, system: SystemMessage, history: list[BaseMessage]) -> tuple[Any, list[BaseMessage]]:
+        name = self.handle(system)
+        if name is None:
+            return super().prepare(model, system, history)
+        # The cached content holds the system instruction and tools, which the request must not repeat
+        return self.llm.bind(cached_content=name), history
+
+
+def prompt_cache_for(
+    llm: Any,
+    tools: Sequence[Any],
+    settings: PromptCacheConfig,
+    aiclient: LangchainConfig,
+    count_text: Callable[[str], int],
+) -> PromptCache:
+    """
+    Return the prompt caching strategy for the configured provider.
+
+    Args:
+        llm (BaseChatModel): The chat model, without tools bound.
+        tools (Sequence[Any]): The agent's tools.
+        settings (PromptCacheConfig): The prompt cache configuration.
+        aiclient (LangchainConfig): The model configuration selecting the provider.
+        count_text (Callable[[str], int]): Estimates the tokens of a text.
+
+    Returns:
+        PromptCache: The strategy; a no-op one if caching is disabled or unsupported.
+    """
+    if not settings.enabled:
+        return PromptCache()
+    match aiclient.model_provider:
+        case "google_genai" if aiclient.google_api_key:
+            return GeminiPromptCache(llm, tools, settings, aiclient.google_api_key.get_secret_value(), count_text)
+        case "azure_openai":
+            return OpenAIPromptCache(tools)
+        case _:
+            return PromptCache()
@@ -7,13 +7,16 @@ ReAct (Reasoning and Acting) pattern.
 
 import click
 import os
+import time
+import uuid
+from typing import Any
 # We will import create_agent later when it is implemented
 # from ralph.agent import create_agent
 
 from ralph.config import RalphConfig
 from ralph.state import AgentState
 
-def run_react(instruction_file: str, directory: str, limit: int, config: RalphConfig):
+def run_react(instruction_file: str, directory: str, limit: int, config: RalphConfig, llm: Any = None):
     """
     Run the Ralph ReAct agent loop.
 
@@ -22,6 +25,8 @@ def run_react(instruction_file: str, directory: str, limit: int, config: RalphCo
         directory (str): The working directory.
         limit (int): The maximum number of iterations to run the agent.
         config (RalphConfig): The Ralph configuration object.
+        llm (BaseChatModel, optional): The chat model to use instead of constructing one from the
+            config (e.g. a scripted model in benchmarks). Defaults to None.
     """
 
     # Verify instruction file exists
@@ -38,23 +43,33 @@ def run_react(instruction_file: str, directory: str, limit: int, config: RalphCo
 
     # Import locally to avoid circular dependencies
     try:
-        from ralph.agent import create_agent
+        from ralph.agent import AgentFactory
     except ImportError:
         click.echo("Error: ralph.agent module not found.", err=True)
         return
 
+    # The compiled agent and model client are reused across iterations; the agent is
+    # rebuilt only if the prompt file changes.
+    factory = AgentFactory()
+
     for i in range(limit):
         click.echo(f"Starting iteration {i+1}/{limit}...")
 
         try:
-            # Create a fresh agent for each iteration
-            agent = create_agent(instruction, directory, config)
-
-            # Run the agent
-            result = agent.invoke(
-                {"messages": [("user", "Please execute the instruction.")]},
-                config={"configurable": {"workdir": os.path.abspath(directory)}}
-            )
+            started = time.perf_counter()
+            builds = factory.builds
+            agent = factory.get(instruction, directory, config, llm=llm)
+            setup = "built" if factory.builds > builds else "reused"
+            click.echo(f"Agent setup: {time.perf_counter() - started:.3f}s ({setup})")
+
+            # Each iteration is a new thread starting from fresh state
+            inputs = {"messages": [("user", "Please execute the instruction.")]}
+            run_config = {"configurable": {"workdir": os.path.abspath(directory), "thread_id": uuid.uuid4().hex}}
+            if config.aiclient.streaming:
+                from ralph.streaming import stream_step
+                result = stream_step(agent, inputs, run_config)
+            else:
+                result = agent.invoke(inputs, config=run_config)
 
             # Convert result to AgentState for validation and easier access
             state = AgentState(**result)
@@ -0,0 +1,229 @@
+"""
+Router module for Ralph.
+
+This module routes the loop agent's LLM requests across providers. Reasoning turns go to
+the main model (`aiclient`) and fail over, in order, to `router.fallbacks` when it fails
+or times out; a failed route is skipped for `router.cooldown_seconds`. Cheap steps
+(summarizing older tool outputs, recovering a tool call the model wrote as text) go to
+`router.cheap`, typically a smaller or local Ollama model. The latency, tokens and cost
+of every route are recorded in the run's metrics.
+"""
+
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+import click
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from ralph.config import LangchainConfig, RalphConfig
+from ralph.context import message_text
+from ralph.metrics import run_metrics
+from ralph.scheduler import RequestScheduler, request_scheduler
+
+T = TypeVar("T")
+
+
+class Route:
+    """
+    A provider configuration the router sends requests to.
+
+    The chat model is constructed on first use, so a fallback that is never needed costs
+    nothing (and a misconfigured one only fails when it is reached).
+
+    Attributes:
+        name (str): "<provider>/<model>", used in messages and metrics.
+        aiclient (LangchainConfig): The provider configuration.
+        scheduler (RequestScheduler | None): The provider's shared request scheduler.
+        failed_until (float): Monotonic time until which the route is skipped.
+    """
+
+    def __init__(self, aiclient: LangchainConfig, config: RalphConfig, llm: Any = None):
+        self.name = f"{aiclient.model_provider}/{aiclient.model}"
+        self.aiclient = aiclient
+        self._config = config.model_copy(update={"aiclient": aiclient})
+        self.scheduler: RequestScheduler | None = request_scheduler(self._config)
+        self.failed_until = 0.0
+        self._llm = llm
+
+    @property
+    def llm(self) -> Any:
+        """The route's chat model, constructed on first use."""
+        if self._llm is None:
+            from ralph.cache import llm_cache
+            from ralph.models import llm_model, sdk_retries
+
+            if self.aiclient.model_provider == "google_genai" and not self.aiclient.google_api_key:
+                raise ValueError("GOOGLE_API_KEY environment variable is not set.")
+            self._llm = llm_model(self.aiclient, cache=llm_cache(self._config.cache), max_retries=sdk_retries(self._config))
+        return self._llm
+
+    def cost(self, usage: dict | None) -> float:
+        """
+        Return the price of a request from its usage and the route's token prices.
+
+        Args:
+            usage (dict | None): The response's `usage_metadata`.
+
+        Returns:
+            float: The cost.
+        """
+        usage = usage or {}
+        return (
+            (usage.get("input_tokens", 0) or 0) * self.aiclient.input_cost_per_million
+            + (usage.get("output_tokens", 0) or 0) * self.aiclient.output_cost_per_million
+        ) / 1_000_000
+
+
+class ModelRouter:
+    """
+    Routes LLM requests to the main model, its fallbacks and the cheap model.
+
+    Attributes:
+        routes (list[Route]): The main model followed by the fallbacks, in order.
+        cheap (Route | None): The route for cheap steps, if configured.
+        cooldown (float): Seconds a failed route is skipped.
+    """
+
+    def __init__(self, config: RalphConfig, llm: Any = None):
+        self.routes = [Route(config.aiclient, config, llm)] + [Route(fallback, config) for fallback in config.router.fallbacks]
+        self.cheap = Route(config.router.cheap, config) if config.router.cheap else None
+        self.cooldown = config.router.cooldown_seconds
+
+    def candidates(self) -> list[Route]:
+        """
+        Return the routes to try for a reasoning turn, in order.
+
+        Routes cooling down after a failure are skipped, unless all of them are.
+
+        Returns:
+            list[Route]: The routes.
+        """
+        now = time.monotonic()
+        available = [route for route in self.routes if route.failed_until <= now]
+        return available or list(self.routes)
+
+    def _failed(self, route: Route, error: Exception, remaining: list[Route], config: RunnableConfig | None, started: float) -> bool:
+        """Record a failed request and put the route in cooldown. Return whether another route is left to try."""
+        route.failed_until = time.monotonic() + self.cooldown
+        self.record(route, config, started, None, error=True)
+        if not remaining:
+            return False
+        click.echo(f"[ROUTER] {route.name} failed ({type(error).__name__}: {error}); falling back to {remaining[0].name}", err=True)
+        return True
+
+    def run(
+        self,
+        attempt: Callable[[Route], T],
+        config: RunnableConfig | None = None,
+        estimated_tokens: int = 0,
+        usage: Callable[[T], dict | None] = lambda result: None,
+    ) -> tuple[T, Route]:
+        """
+        Send a reasoning request, failing over to the next route when one fails.
+
+        Each route's request goes through its scheduler, so a route is only abandoned once
+        its retries are exhausted or the error is not transient.
+
+        Args:
+            attempt (Callable[[Route], T]): Sends the request through a route.
+            config (RunnableConfig | None, optional): The runtime config, for metrics. Defaults to None.
+            estimated_tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+            usage (Callable[[T], dict | None], optional): Returns the usage metadata of a result.
+
+        Returns:
+            tuple[T, Route]: The result and the route that produced it.
+        """
+        candidates = self.candidates()
+        for i, route in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                if route.scheduler is None:
+                    result = attempt(route)
+                else:
+                    result = route.scheduler.call(lambda: attempt(route), estimated_tokens)
+            except Exception as e:
+                if not self._failed(route, e, candidates[i + 1:], config, started):
+                    raise
+                continue
+            self.record(route, config, started, usage(result), estimated_tokens=estimated_tokens)
+            return result, route
+
+    async def arun(
+        self,
+        attempt: Callable[[Route], Awaitable[T]],
+        config: RunnableConfig | None = None,
+        estimated_tokens: int = 0,
+        usage: Callable[[T], dict | None] = lambda result: None,
+    ) -> tuple[T, Route]:
+        """
+        Send a reasoning request asynchronously, failing over to the next route when one fails.
+
+        Args:
+            attempt (Callable[[Route], Awaitable[T]]): Sends the request through a route.
+            config (RunnableConfig | None, optional): The runtime config, for metrics. Defaults to None.
+            estimated_tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+            usage (Callable[[T], dict | None], optional): Returns the usage metadata of a result.
+
+        Returns:
+            tuple[T, Route]: The result and the route that produced it.
+        """
+        candidates = self.candidates()
+        for i, route in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                if route.scheduler is None:
+                    result = await attempt(route)
+                else:
+                    result = await route.scheduler.acall(lambda: attempt(route), estimated_tokens)
+            except Exception as e:
+                if not self._failed(route, e, candidates[i + 1:], config, started):
+                    raise
+                continue
+            self.record(route, config, started, usage(result), estimated_tokens=estimated_tokens)
+            return result, route
+
+    def record(self, route: Route, config: RunnableConfig | None, started: float, usage: dict | None, error: bool = False, estimated_tokens: int = 0):
+        """
+        Record a finished request: correct the scheduler's token estimate and add the route's metrics.
+
+        Args:
+            route (Route): The route the request went through.
+            config (RunnableConfig | None): The runtime config holding the metrics recorder.
+            started (float): `time.perf_counter()` when the request started.
+            usage (dict | None): The response's `usage_metadata`.
+            error (bool, optional): Whether the request failed. Defaults to False.
+            estimated_tokens (int, optional): The estimate the request was admitted with. Defaults to 0.
+        """
+        if route.scheduler is not None and not error:
+            route.scheduler.settle(estimated_tokens, usage)
+        metrics = run_metrics(config)
+        if metrics is not None:
+            metrics.route_call(route.name, time.perf_counter() - started, usage, route.cost(usage), error)
+
+    def complete(self, prompt: str, config: RunnableConfig | None = None) -> str | None:
+        """
+        Run a cheap step: send a single prompt to the cheap model.
+
+        Args:
+            prompt (str): The prompt.
+            config (RunnableConfig | None, optional): The runtime config, for metrics. Defaults to None.
+
+        Returns:
+            str | None: The reply text, or None if no cheap model is configured or it failed
+                (callers then fall back to their non-LLM behaviour).
+        """
+        route = self.cheap
+        if route is None or route.failed_until > time.monotonic():
+            return None
+        started = time.perf_counter()
+        try:
+            request = lambda: route.llm.invoke([HumanMessage(content=prompt)])
+            response = route.scheduler.call(request) if route.scheduler is not None else request()
+        except Exception as e:
+            route.failed_until = time.monotonic() + self.cooldown
+            self.record(route, config, started, None, error=True)
+            click.echo(f"[ROUTER] cheap model {route.name} failed ({type(e).__name__}: {e})", err=True)
+            return None
+        self.record(route, config, started, getattr(response, "usage_metadata", None))
+        return message_text(response)
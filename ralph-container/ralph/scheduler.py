@@ -0,0 +1,298 @@
+"""
+Scheduler module for Ralph.
+
+This module schedules the loop agent's LLM requests. A `RequestScheduler` admits each
+request through token buckets for requests and tokens per minute, and retries requests
+failing with a rate limit (429), a transient server error (5xx), a timeout or a
+connection error, waiting for the provider's `Retry-After` if it sent one or a jittered
+exponential backoff otherwise. A `Retry-After` also pauses every other request to that
+provider.
+
+One scheduler is shared per provider (provider, endpoint and model) by every loop in the
+process, so concurrent loops and fleets stay within the same limits.
+"""
+
+import asyncio
+import email.utils
+import random
+import re
+import threading
+import time
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+import click
+
+from ralph import tracing
+from ralph.config import RalphConfig, SchedulerConfig
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504, 529}
+
+# Exception classes (matched by name, so that no provider SDK is imported) for network
+# failures: httpx transport errors, OpenAI connection/timeout errors, Gemini server errors
+_RETRY_CLASSES = {"TransportError", "APIConnectionError", "ServerError"}
+
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*:\s*['\"]([\d.]+)s")
+
+
+def _causes(error: BaseException) -> Iterator[BaseException]:
+    """Yield an exception and the exceptions it was raised from."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> int | None:
+    """Return the HTTP status of a provider error, if it carries one."""
+    for cause in _causes(error):
+        for value in (getattr(cause, "status_code", None), getattr(cause, "code", None), getattr(getattr(cause, "response", None), "status_code", None)):
+            if isinstance(value, int) and 100 <= value <= 599:
+                return value
+    return None
+
+
+def retry_after(error: BaseException) -> float | None:
+    """
+    Return how long the provider asked to wait before retrying, if it said so.
+
+    Reads the `retry-after-ms` and `Retry-After` (seconds or HTTP date) response headers,
+    and Gemini's `retryDelay` error detail.
+
+    Args:
+        error (BaseException): The error raised by the chat model.
+
+    Returns:
+        float | None: The delay in seconds, or None.
+    """
+    for cause in _causes(error):
+        headers = getattr(getattr(cause, "response", None), "headers", None)
+        if headers:
+            try:
+                if headers.get("retry-after-ms"):
+                    return float(headers["retry-after-ms"]) / 1000
+                value = headers.get("retry-after")
+                if value:
+                    try:
+                        return float(value)
+                    except ValueError:
+                        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        match = _RETRY_DELAY.search(str(cause))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Return whether a failed LLM request is worth retrying.
+
+    Args:
+        error (BaseException): The error raised by the chat model.
+
+    Returns:
+        bool: True for rate limits, transient server errors, timeouts and connection errors.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    for cause in _causes(error):
+        if isinstance(cause, (TimeoutError, ConnectionError)):
+            return True
+        if any(cls.__name__ in _RETRY_CLASSES for cls in type(cause).__mro__):
+            return True
+    return False
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    Reservations may overdraw the bucket; the caller then waits until the deficit has been
+    refilled, so concurrent callers are served in order without polling.
+
+    Attributes:
+        per_minute (float): The refill rate, which is also the capacity.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens and return how long to wait before using them.
+
+        Args:
+            amount (float): Tokens to take; capped at the capacity.
+
+        Returns:
+            float: Seconds to wait (0 if the tokens were available).
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= min(amount, self.per_minute)
+            return max(0.0, -self._tokens * 60 / self.per_minute)
+
+    def adjust(self, amount: float):
+        """
+        Take (positive) or return (negative) tokens without waiting, e.g. to correct an estimate.
+
+        Args:
+            amount (float): Tokens to take.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.per_minute, self._tokens - amount)
+
+
+class RequestScheduler:
+    """
+    Admits, rate-limits and retries the LLM requests of one provider.
+
+    Attributes:
+        config (SchedulerConfig): The scheduler configuration.
+        name (str): The provider the scheduler belongs to, used in messages.
+        retries (int): Requests retried so far.
+        waited (float): Seconds spent waiting for the rate limits and `Retry-After` pauses.
+    """
+
+    def __init__(self, config: SchedulerConfig, name: str = "", rng: random.Random | None = None):
+        self.config = config
+        self.name = name
+        self.retries = 0
+        self.waited = 0.0
+        self._requests = TokenBucket(config.requests_per_minute) if config.requests_per_minute else None
+        self._tokens = TokenBucket(config.tokens_per_minute) if config.tokens_per_minute else None
+        self._paused_until = 0.0
+        self._random = rng or random.Random()
+        self._lock = threading.Lock()
+
+    def _admission_delay(self, estimated_tokens: int) -> float:
+        """Reserve capacity for a request and return how long to wait before sending it."""
+        delay = max(0.0, self._paused_until - time.monotonic())
+        if self._requests is not None:
+            delay = max(delay, self._requests.reserve(1))
+        if self._tokens is not None and estimated_tokens:
+            delay = max(delay, self._tokens.reserve(estimated_tokens))
+        if delay:
+            with self._lock:
+                self.waited += delay
+        return delay
+
+    def _retry_delay(self, attempt: int, error: BaseException) -> float | None:
+        """Return the wait before retrying a failed attempt, or None if it must not be retried."""
+        if attempt >= self.config.max_retries or not is_retryable(error):
+            return None
+        requested = retry_after(error)
+        if requested is not None:
+            delay = min(requested, self.config.max_backoff)
+            # Other requests to this provider would be refused too
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        else:
+            delay = self._random.uniform(0, min(self.config.max_backoff, self.config.initial_backoff * 2 ** attempt))
+        with self._lock:
+            self.retries += 1
+        click.echo(f"[RETRY] {self.name}: {type(error).__name__}: {error} (retry {attempt + 1}/{self.config.max_retries} in {delay:.1f}s)", err=True)
+        tracing.annotate_current({"ralph.llm.retries": attempt + 1})
+        return delay
+
+    def settle(self, estimated_tokens: int, usage: dict | None):
+        """
+        Correct the token bucket with the tokens a request actually used.
+
+        Args:
+            estimated_tokens (int): The estimate the request was admitted with.
+            usage (dict | None): The response's `usage_metadata`.
+        """
+        if self._tokens is not None and usage:
+            actual = usage.get("total_tokens") or (usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+            self._tokens.adjust(actual - estimated_tokens)
+
+    def call(self, request: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Run a request, waiting for the rate limits and retrying transient failures.
+
+        Args:
+            request (Callable[[], T]): Sends the request and returns the response.
+            estimated_tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+
+        Returns:
+            T: The response.
+        """
+        attempt = 0
+        while True:
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                time.sleep(delay)
+            try:
+                return request()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, request: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """
+        Run an async request, waiting for the rate limits and retrying transient failures.
+
+        Args:
+            request (Callable[[], Awaitable[T]]): Sends the request and returns the response.
+            estimated_tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+
+        Returns:
+            T: The response.
+        """
+        attempt = 0
+        while True:
+            delay = self._admission_delay(estimated_tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                return await request()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+_schedulers: dict[tuple, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def request_scheduler(config: RalphConfig) -> RequestScheduler | None:
+    """
+    Return the process-wide scheduler of a configuration's provider.
+
+    Args:
+        config (RalphConfig): The configuration; `aiclient` selects the provider and
+            `scheduler` configures the scheduler when it is first created.
+
+    Returns:
+        RequestScheduler | None: The shared scheduler, or None if scheduling is disabled.
+    """
+    if not config.scheduler.enabled:
+        return None
+    aiclient = config.aiclient
+    endpoint = aiclient.azure_endpoint or aiclient.github_api_base_url or aiclient.ollama_base_url
+    key = (aiclient.model_provider, str(endpoint or ""), aiclient.model)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = RequestScheduler(config.scheduler, name=f"{aiclient.model_provider}/{aiclient.model}")
+        return _schedulers[key]
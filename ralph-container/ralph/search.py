@@ -0,0 +1,238 @@
+"""
+Search module for Ralph.
+
+This module provides the in-memory content index behind the `search_code` tool. The
+index holds the text of every indexed workspace file (as listed by the workspace index,
+so `.gitignore` is honored) and a trigram posting list. A literal query only scans the
+files containing all of its trigrams. The index is built on the first search, refreshed
+from file modification times on later searches, and updated directly by `write_file`.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+from ralph.workspace import workspace_index
+
+# Files larger than this are not indexed
+MAX_INDEXED_FILE_BYTES = 1024 * 1024
+
+# Longest line returned in results
+MAX_LINE_CHARS = 200
+
+
+def _trigrams(text: str) -> set[str]:
+    """Return the set of trigrams of a (lowercased) text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass
+class _IndexedFile:
+    """Indexed content of one file (`text` is None for skipped large or binary files)."""
+    mtime_ns: int
+    size: int
+    text: str | None
+    trigrams: set[str]
+
+
+class ContentIndex:
+    """
+    Trigram index over the text files of a workspace.
+
+    Attributes:
+        root (str): The absolute workspace directory.
+        reads (int): Number of files (re)read into the index, for diagnostics.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.reads = 0
+        self._files: dict[str, _IndexedFile] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, rel: str):
+        """Drop a file from the index."""
+        entry = self._files.pop(rel, None)
+        if entry is None:
+            return
+        for trigram in entry.trigrams:
+            paths = self._postings.get(trigram)
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del self._postings[trigram]
+
+    def _index(self, rel: str, st: os.stat_result | None = None):
+        """(Re)read a file into the index, skipping large and binary files."""
+        self._remove(rel)
+        path = os.path.join(self.root, rel)
+        try:
+            st = st or os.stat(path)
+            if st.st_size > MAX_INDEXED_FILE_BYTES:
+                self._files[rel] = _IndexedFile(st.st_mtime_ns, st.st_size, None, set())
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        self.reads += 1
+        if b"\0" in data[:8192]:
+            self._files[rel] = _IndexedFile(st.st_mtime_ns, st.st_size, None, set())
+            return
+        text = data.decode("utf-8", errors="replace")
+        trigrams = _trigrams(text.lower())
+        self._files[rel] = _IndexedFile(st.st_mtime_ns, st.st_size, text, trigrams)
+        for trigram in trigrams:
+            self._postings.setdefault(trigram, set()).add(rel)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the workspace, rereading only changed files.
+        """
+        listed = set(workspace_index(self.root).files())
+        with self._lock:
+            for rel in [r for r in self._files if r not in listed]:
+                self._remove(rel)
+            for rel in listed:
+                try:
+                    st = os.stat(os.path.join(self.root, rel))
+                except OSError:
+                    self._remove(rel)
+                    continue
+                entry = self._files.get(rel)
+                if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+                    self._index(rel, st)
+
+    def update_file(self, path: str):
+        """
+        Reindex a single file after it was written.
+
+        Args:
+            path (str): The file, absolute or relative to the root.
+        """
+        rel = os.path.relpath(os.path.join(self.root, path), self.root).replace(os.sep, "/")
+        with self._lock:
+            self._index(rel)
+
+    def _candidates(self, query: str, regex: bool) -> list[str]:
+        """Return the files that may contain a match, using trigrams for literal queries."""
+        if regex or len(query) < 3:
+            return sorted(rel for rel, entry in self._files.items() if entry.text is not None)
+        paths: set[str] | None = None
+        for trigram in _trigrams(query.lower()):
+            found = self._postings.get(trigram, set())
+            paths = set(found) if paths is None else paths & found
+            if not paths:
+                return []
+        return sorted(paths or ())
+
+    def search(
+        self,
+        query: str,
+        path: str = ".",
+        pattern: str | None = None,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        context_lines: int = 1,
+        max_results: int = 50,
+    ) -> tuple[list[str], int]:
+        """
+        Search the indexed files.
+
+        Args:
+            query (str): Literal text, or a regular expression if `regex` is set.
+            path (str, optional): Directory to search, relative to the root. Defaults to ".".
+            pattern (str | None, optional): Glob restricting the files searched. Defaults to None.
+            regex (bool, optional): Treat the query as a regular expression. Defaults to False.
+            case_sensitive (bool, optional): Match case. Defaults to False.
+            context_lines (int, optional): Lines of context around each match. Defaults to 1.
+            max_results (int, optional): Maximum number of matches returned. Defaults to 50.
+
+        Returns:
+            tuple[list[str], int]: Result lines ("path:line: text" for matches, "path-line- text"
+                for context, "--" between groups) and the total number of matches.
+        """
+        self.refresh()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        matcher = re.compile(query if regex else re.escape(query), flags)
+
+        start = os.path.relpath(os.path.join(self.root, path), self.root).replace(os.sep, "/")
+        scope = None
+        if start != "." or pattern:
+            prefix = "" if start == "." else start + "/"
+            scope = {prefix + f for f in workspace_index(self.root).files(path, pattern=pattern)}
+
+        lines_out: list[str] = []
+        total = 0
+        with self._lock:
+            for rel in self._candidates(query, regex):
+                if scope is not None and rel not in scope:
+                    continue
+                lines = self._files[rel].text.splitlines()
+                last_shown = -1
+                for number, line in enumerate(lines):
+                    if not matcher.search(line):
+                        continue
+                    total += 1
+                    if total > max_results:
+                        continue
+                    first = max(number - context_lines, last_shown + 1)
+                    if lines_out and (last_shown < 0 or first > last_shown + 1):
+                        lines_out.append("--")
+                    for ctx in range(first, min(len(lines), number + context_lines + 1)):
+                        if ctx <= last_shown:
+                            continue
+                        sep = ":" if ctx == number else "-"
+                        lines_out.append(f"{rel}{sep}{ctx + 1}{sep} {lines[ctx][:MAX_LINE_CHARS]}")
+                        last_shown = ctx
+        return lines_out, total
+
+
+# One content index per workspace, built on first search
+_indexes: dict[str, ContentIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def content_index(workdir: str) -> ContentIndex:
+    """
+    Return the shared content index for a working directory, creating it on first use.
+
+    Args:
+        workdir (str): The working directory.
+
+    Returns:
+        ContentIndex: The index.
+    """
+    root = os.path.abspath(workdir)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = ContentIndex(root)
+        return _indexes[root]
+
+
+def built_index(workdir: str) -> ContentIndex | None:
+    """
+    Return the content index of a working directory if it has been built.
+
+    Args:
+        workdir (str): The working directory.
+
+    Returns:
+        ContentIndex | None: The index, or None if no search has run there yet.
+    """
+    return _indexes.get(os.path.abspath(workdir))
+
+
+def notify_write(workdir: str, path: str):
+    """
+    Update the content index of a workspace after a file was written, if it has been built.
+
+    Args:
+        workdir (str): The working directory.
+        path (str): The written file, absolute or relative to the workdir.
+    """
+    index = built_index(workdir)
+    if index is not None:
+        index.update_file(path)
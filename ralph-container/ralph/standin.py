@@ -0,0 +1,438 @@
+"""
+Stand-in LLM server for Ralph.
+
+This module serves a local, scripted imitation of the chat endpoints Ralph's providers
+talk to, so that concurrency, retries and streaming can be exercised without network
+access or model costs:
+
+- Ollama: `POST /api/chat` (NDJSON stream or a single JSON response), `GET /api/tags`
+  and `GET /api/version`. Point `aiclient.ollama_base_url` at the server.
+- OpenAI / Azure OpenAI: `POST .../chat/completions`, including
+  `/openai/deployments/<deployment>/chat/completions` (SSE stream or a single JSON
+  response). Point `aiclient.azure_endpoint` at the server; any API key is accepted.
+
+Replies come from a script: by default a few tool calls over the workspace followed by
+`done`, or recorded replies loaded from a file. Latency, token rate and errors are
+injected according to `StandinSettings`.
+"""
+
+import json
+import math
+import random
+import re
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+from pydantic import BaseModel, Field
+
+
+class StandinSettings(BaseModel):
+    """
+    Behaviour of the stand-in server.
+
+    Attributes:
+        latency (float): Seconds before the first byte of every response. Defaults to 0.
+        jitter (float): Extra latency drawn uniformly from [0, jitter] seconds. Defaults to 0.
+        tokens_per_second (float): Rate at which reply tokens are generated; 0 sends them
+            instantly. Defaults to 0.
+        error_rate (float): Fraction of requests answered with `error_status`. Defaults to 0.
+        error_status (int): HTTP status of injected errors. Defaults to 500.
+        steps (int): Tool calls of the default script before it calls `done`. Defaults to 4.
+        reply_words (int): Words of text accompanying each scripted reply. Defaults to 30.
+        responses (str | None): JSON or JSONL file of recorded replies, served in turn order
+            instead of the default script. Defaults to None.
+        seed (int | None): Seed of the jitter and error injection. Defaults to None.
+    """
+    latency: float = Field(default=0.0, ge=0, description="Seconds before the first byte of every response")
+    jitter: float = Field(default=0.0, ge=0, description="Extra latency drawn uniformly from [0, jitter] seconds")
+    tokens_per_second: float = Field(default=0.0, ge=0, description="Reply token rate; 0 sends tokens instantly")
+    error_rate: float = Field(default=0.0, ge=0, le=1, description="Fraction of requests answered with an error")
+    error_status: int = Field(default=500, ge=400, le=599, description="HTTP status of injected errors")
+    steps: int = Field(default=4, ge=0, description="Tool calls of the default script before it calls done")
+    reply_words: int = Field(default=30, ge=0, description="Words of text accompanying each scripted reply")
+    responses: str | None = Field(default=None, description="JSON or JSONL file of recorded replies")
+    seed: int | None = Field(default=None, description="Seed of the jitter and error injection")
+
+
+def _normalise_reply(data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert a recorded reply to `{"content": str, "tool_calls": [{"name", "args"}]}`.
+
+    Accepts the short form itself, an OpenAI chat completion (`choices[0].message`) and an
+    Ollama chat response (`message`).
+    """
+    if "choices" in data:
+        data = data["choices"][0]["message"]
+    elif "message" in data:
+        data = data["message"]
+
+    tool_calls = []
+    for call in data.get("tool_calls") or []:
+        function = call.get("function", call)
+        args = function.get("arguments", function.get("args", {}))
+        if isinstance(args, str):
+            args = json.loads(args or "{}")
+        tool_calls.append({"name": function["name"], "args": args})
+    return {"content": data.get("content") or "", "tool_calls": tool_calls}
+
+
+def load_responses(path: str) -> list[dict[str, Any]]:
+    """
+    Load recorded replies from a JSON list or a JSONL file.
+
+    Args:
+        path (str): The file to load.
+
+    Returns:
+        list[dict[str, Any]]: The replies, normalised to `{"content", "tool_calls"}`.
+
+    Raises:
+        ValueError: If the file contains no replies.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        items = json.loads(stripped)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not items:
+        raise ValueError(f"No recorded responses in {path}")
+    return [_normalise_reply(item) for item in items]
+
+
+class Script:
+    """
+    Chooses the reply to a conversation.
+
+    The turn of a conversation is the number of assistant messages it already contains.
+    Recorded replies are served in turn order, repeating the last one once they run out.
+    Without recorded replies, the default script makes `steps` tool calls over the
+    workspace (listing, reading, searching, writing notes) and then calls `done`.
+    """
+
+    def __init__(self, settings: StandinSettings):
+        self.settings = settings
+        self.recorded = load_responses(settings.responses) if settings.responses else None
+
+    def _scripted(self, turn: int) -> dict[str, Any]:
+        words = " ".join(f"step{turn}" if i % 6 == 0 else "progress" for i in range(self.settings.reply_words))
+        if turn >= self.settings.steps:
+            return {"content": words, "tool_calls": [{"name": "done", "args": {}}]}
+        actions = [
+            ("list_files", {"path": "."}),
+            ("read_file", {"path": "README.md"}),
+            ("search_code", {"query": "TODO"}),
+            ("write_file", {"path": f"notes/step_{turn}.md", "content": f"# Step {turn}\n\n{words}\n"}),
+        ]
+        name, args = actions[turn % len(actions)]
+        return {"content": words, "tool_calls": [{"name": name, "args": args}]}
+
+    def reply(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Return the reply to a conversation.
+
+        Args:
+            messages (list[dict[str, Any]]): The request's messages.
+
+        Returns:
+            dict[str, Any]: The reply as `{"content": str, "tool_calls": [{"name", "args"}]}`.
+        """
+        turn = sum(1 for message in messages if message.get("role") == "assistant")
+        if self.recorded:
+            return self.recorded[min(turn, len(self.recorded) - 1)]
+        return self._scripted(turn)
+
+
+def _tokens(text: str) -> list[str]:
+    """Split text into word-sized tokens, keeping the whitespace so they concatenate back."""
+    return re.findall(r"\s*\S+\s*", text) or ([text] if text else [])
+
+
+def _prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    """Estimate the prompt size in tokens (four characters per token)."""
+    return sum(len(json.dumps(message.get("content", ""))) for message in messages) // 4
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Return the q-th percentile of values (nearest rank).
+
+    Args:
+        values (list[float]): The values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves the Ollama and OpenAI chat endpoints from the server's script."""
+
+    protocol_version = "HTTP/1.1"
+    server: "_HTTPServer"
+
+    def log_message(self, format: str, *args: Any):
+        # Requests are counted in the server's records instead of logged
+        pass
+
+    # ---- transport helpers ----
+
+    def _send_json(self, status: int, body: Any, headers: dict[str, str] | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    # ---- routing ----
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            model = {"name": "standin", "model": "standin", "size": 0, "details": {"family": "standin"}}
+            self._send_json(200, {"models": [model]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "standin"})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/api/chat":
+            self._chat("ollama")
+        elif path.endswith("/chat/completions"):
+            self._chat("openai")
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def _chat(self, api: str):
+        standin = self.server.standin
+        started = time.perf_counter()
+        body = self._read_body()
+        messages = body.get("messages") or []
+        stream = body.get("stream", api == "ollama")
+        delay, fail = standin._draw()
+        time.sleep(delay)
+
+        if fail:
+            status = standin.settings.error_status
+            message = f"Injected error {status} from the stand-in server"
+            error = {"error": message} if api == "ollama" else {"error": {"message": message, "type": "server_error", "code": str(status)}}
+            headers = {"Retry-After": "1"} if status in (429, 503) else None
+            self._send_json(status, error, headers)
+            standin._record(api, status, started, 0)
+            return
+
+        reply = standin.script.reply(messages)
+        usage = (_prompt_tokens(messages), len(_tokens(reply["content"])) + sum(len(json.dumps(c["args"])) // 4 for c in reply["tool_calls"]))
+        model = body.get("model") or "standin"
+        if api == "ollama":
+            self._ollama(model, reply, usage, stream, started)
+        else:
+            self._openai(model, reply, usage, stream, bool((body.get("stream_options") or {}).get("include_usage")))
+        standin._record(api, 200, started, usage[1])
+
+    def _paced(self, reply: dict[str, Any]) -> Iterator[str]:
+        """Yield the reply's tokens at the configured token rate."""
+        interval = 1 / self.server.standin.settings.tokens_per_second if self.server.standin.settings.tokens_per_second else 0.0
+        for token in _tokens(reply["content"]):
+            if interval:
+                time.sleep(interval)
+            yield token
+
+    def _ollama(self, model: str, reply: dict[str, Any], usage: tuple[int, int], stream: bool, started: float):
+        tool_calls = [{"function": {"name": c["name"], "arguments": c["args"]}} for c in reply["tool_calls"]]
+        created = datetime.now(timezone.utc).isoformat()
+        final = {
+            "model": model,
+            "created_at": created,
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": usage[0],
+            "eval_count": usage[1],
+        }
+        if not stream:
+            content = "".join(self._paced(reply))
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            self._send_json(200, {**final, "message": message})
+            return
+
+        self._start_stream("application/x-ndjson")
+        for token in self._paced(reply):
+            chunk = {"model": model, "created_at": created, "message": {"role": "assistant", "content": token}, "done": False}
+            self._write_chunk((json.dumps(chunk) + "\n").encode("utf-8"))
+        if tool_calls:
+            chunk = {"model": model, "created_at": created, "message": {"role": "assistant", "content": "", "tool_calls": tool_calls}, "done": False}
+            self._write_chunk((json.dumps(chunk) + "\n").encode("utf-8"))
+        final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+        final["message"] = {"role": "assistant", "content": ""}
+        self._write_chunk((json.dumps(final) + "\n").encode("utf-8"))
+        self._end_stream()
+
+    def _openai(self, model: str, reply: dict[str, Any], usage: tuple[int, int], stream: bool, include_usage: bool):
+        completion_id = f"chatcmpl-standin-{time.monotonic_ns()}"
+        created = int(time.time())
+        tool_calls = [
+            {"id": f"call_{completion_id[-8:]}_{i}", "type": "function", "function": {"name": c["name"], "arguments": json.dumps(c["args"])}}
+            for i, c in enumerate(reply["tool_calls"])
+        ]
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        usage_body = {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)}
+        if not stream:
+            message = {"role": "assistant", "content": "".join(self._paced(reply))}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage_body,
+            })
+            return
+
+        def event(choices: list[dict[str, Any]], **extra: Any):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": choices, **extra}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        self._start_stream("text/event-stream")
+        event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for token in self._paced(reply):
+            event([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+        if tool_calls:
+            event([{"index": 0, "delta": {"tool_calls": [{"index": i, **call} for i, call in enumerate(tool_calls)]}, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if include_usage:
+            event([], usage=usage_body)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._end_stream()
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    standin: "StandinServer"
+
+
+class StandinServer:
+    """
+    A stand-in LLM server running on a background thread.
+
+    Use it as a context manager, or call `start` and `stop`. Every chat request is
+    recorded as `(api, status, latency seconds, output tokens)` in `records`.
+
+    Attributes:
+        settings (StandinSettings): The server's behaviour.
+        script (Script): Chooses the replies.
+        records (list[tuple[str, int, float, int]]): One record per chat request.
+    """
+
+    def __init__(self, settings: StandinSettings | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or StandinSettings()
+        self.script = Script(self.settings)
+        self.records: list[tuple[str, int, float, int]] = []
+        self._random = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.standin = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server, e.g. `http://127.0.0.1:11434`."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        """Start serving on a daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="ralph-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any):
+        self.stop()
+
+    def _draw(self) -> tuple[float, bool]:
+        """Draw the latency and whether to fail for one request."""
+        with self._lock:
+            jitter = self._random.uniform(0, self.settings.jitter) if self.settings.jitter else 0.0
+            fail = self._random.random() < self.settings.error_rate
+        return self.settings.latency + jitter, fail
+
+    def _record(self, api: str, status: int, started: float, output_tokens: int):
+        with self._lock:
+            self.records.append((api, status, time.perf_counter() - started, output_tokens))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Summarise the requests served so far.
+
+        Returns:
+            dict[str, Any]: Request and error counts, the error rate, output tokens and
+                p50/p95/p99/mean latency in milliseconds.
+        """
+        with self._lock:
+            records = list(self.records)
+        latencies = [latency for _, _, latency, _ in records]
+        errors = sum(1 for _, status, _, _ in records if status >= 400)
+        return {
+            "requests": len(records),
+            "errors": errors,
+            "error_rate": errors / len(records) if records else 0.0,
+            "output_tokens": sum(tokens for *_, tokens in records),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p95": round(percentile(latencies, 95) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            },
+        }
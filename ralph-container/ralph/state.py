@@ -8,7 +8,7 @@ from typing import Annotated, Sequence
 from pydantic import BaseModel, Field
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
-import operator
+from langgraph.managed import RemainingSteps
 
 class AgentState(BaseModel):
     """
@@ -17,9 +17,11 @@ class AgentState(BaseModel):
     Attributes:
         messages (Sequence[BaseMessage]): A sequence of messages in the conversation history.
             Annotated with `add_messages` to support appending new messages in the graph.
-        remaining_steps (int): The number of remaining steps allowed for the agent.
-            Annotated with `operator.add` to support decrementing/aggregating steps.
+        remaining_steps (int): The number of steps left before the recursion limit, managed by
+            LangGraph; the ReAct agent stops calling tools when it runs out.
+        context_tokens (int): Estimated number of tokens sent to the model on the latest step.
             Defaults to 0.
     """
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    remaining_steps: Annotated[int, operator.add] = Field(default=0)
+    remaining_steps: RemainingSteps = Field(default=25)
+    context_tokens: int = Field(default=0)
@@ -0,0 +1,161 @@
+"""
+Streaming module for Ralph.
+
+This module contains helpers for streamed model output: printing the agent's tokens
+as a graph step runs, and tracking tool-call chunks so that each tool call can be
+dispatched as soon as it has been fully received, before the rest of the message.
+"""
+
+import json
+from typing import Callable
+
+import click
+from langchain_core.messages import AIMessageChunk, BaseMessage
+
+
+def chunk_text(chunk: BaseMessage) -> str:
+    """
+    Return the printable text of a (streamed) message.
+
+    Args:
+        chunk (BaseMessage): The message or message chunk.
+
+    Returns:
+        str: The text content, ignoring non-text parts.
+    """
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def echo_agent_chunk(chunk: BaseMessage, metadata: dict, label: str = "") -> bool:
+    """
+    Print a streamed token of the agent node, preceded by `label` if given.
+
+    Args:
+        chunk (BaseMessage): The streamed message chunk.
+        metadata (dict): The stream metadata, identifying the graph node.
+        label (str, optional): Prefix printed before the text. Defaults to "".
+
+    Returns:
+        bool: True if anything was printed.
+    """
+    if metadata.get("langgraph_node") != "agent" or not isinstance(chunk, AIMessageChunk):
+        return False
+    text = chunk_text(chunk)
+    if text:
+        click.echo(f"{label}{text}", nl=False)
+    return bool(text)
+
+
+def stream_step(agent, inputs: dict | None, run_config: dict) -> dict:
+    """
+    Run one step with `agent.stream`, printing the agent's tokens as they arrive.
+
+    Args:
+        agent (CompiledGraph): The agent graph.
+        inputs (dict | None): The step input.
+        run_config (dict): The runtime configuration.
+
+    Returns:
+        dict: The state after the step.
+    """
+    result = None
+    streamed = False
+    for mode, payload in agent.stream(inputs, run_config, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result = payload
+        else:
+            streamed = echo_agent_chunk(*payload) or streamed
+    if streamed:
+        click.echo()
+    return result
+
+
+async def astream_step(agent, inputs: dict | None, run_config: dict, label: str) -> dict:
+    """
+    Run one step with `agent.astream_events`, printing the agent's tokens as they arrive.
+
+    Args:
+        agent (CompiledGraph): The agent graph.
+        inputs (dict | None): The step input.
+        run_config (dict): The runtime configuration.
+        label (str): Prefix printed before the streamed output.
+
+    Returns:
+        dict: The state after the step, read back from the checkpointer.
+    """
+    streamed = False
+    async for event in agent.astream_events(inputs, run_config, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            prefix = "" if streamed else label
+            streamed = echo_agent_chunk(event["data"]["chunk"], event.get("metadata", {}), prefix) or streamed
+    if streamed:
+        click.echo()
+    return (await agent.aget_state(run_config)).values
+
+
+class ToolCallTracker:
+    """
+    Reports each tool call of a streamed AI message once it is complete.
+
+    Providers stream tool calls as chunks sharing an `index`. A call is complete when a
+    chunk for a later index arrives, or when the stream ends.
+
+    Attributes:
+        on_complete (Callable[[dict, list[dict]], None]): Called with each completed tool call
+            and the calls completed before it, in order.
+        completed (list[dict]): The tool calls completed so far.
+    """
+
+    def __init__(self, on_complete: Callable[[dict, list[dict]], None]):
+        self.on_complete = on_complete
+        self.completed: list[dict] = []
+        self._reported: set = set()
+
+    def _report(self, tool_call_chunk: dict):
+        index = tool_call_chunk.get("index")
+        if index in self._reported or not tool_call_chunk.get("name") or not tool_call_chunk.get("id"):
+            return
+        self._reported.add(index)
+        try:
+            args = json.loads(tool_call_chunk.get("args") or "{}")
+        except json.JSONDecodeError:
+            # Leave malformed calls to the normal (post-message) handling
+            return
+        call = {"name": tool_call_chunk["name"], "args": args, "id": tool_call_chunk["id"], "type": "tool_call"}
+        earlier = list(self.completed)
+        self.completed.append(call)
+        self.on_complete(call, earlier)
+
+    def update(self, message: AIMessageChunk):
+        """
+        Inspect the accumulated message and report calls that are now complete.
+
+        Args:
+            message (AIMessageChunk): The message accumulated from the stream so far.
+        """
+        chunks = [c for c in message.tool_call_chunks if c.get("index") is not None]
+        if len(chunks) < 2:
+            return
+        latest = max(c["index"] for c in chunks)
+        for tool_call_chunk in chunks:
+            if tool_call_chunk["index"] < latest:
+                self._report(tool_call_chunk)
+
+    def finish(self, message: AIMessageChunk | None):
+        """
+        Report the remaining calls once the stream has ended.
+
+        Args:
+            message (AIMessageChunk | None): The fully accumulated message.
+        """
+        if message is None:
+            return
+        for tool_call_chunk in message.tool_call_chunks:
+            if tool_call_chunk.get("index") is not None:
+                self._report(tool_call_chunk)
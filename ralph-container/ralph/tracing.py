@@ -0,0 +1,189 @@
+"""
+Tracing module for Ralph.
+
+This module emits optional OpenTelemetry spans for loop runs, their iterations, each LLM
+call of the agent node and each tool execution. Spans carry the token counts, tool names,
+output sizes and command exit codes, following the OpenTelemetry GenAI conventions where
+they apply (`gen_ai.*` attributes).
+
+OpenTelemetry is an optional dependency: it is only imported when `tracing.enabled` is
+set, and if it is not installed Ralph warns once and runs without tracing. Until
+`configure_tracing` has installed a tracer, `span` yields None without creating anything,
+so instrumented code costs a function call and a None check when tracing is disabled.
+"""
+
+import contextlib
+import os
+import threading
+from typing import Any, Callable, Iterator
+
+import click
+
+from ralph.config import TracingConfig
+
+# Installed by configure_tracing; None while tracing is disabled
+_tracer: Any = None
+_provider: Any = None
+_error_status: Callable[[str], Any] | None = None
+_current_span: Callable[[], Any] | None = None
+_lock = threading.Lock()
+_warned = False
+
+
+def _exporter(settings: TracingConfig) -> Any:
+    """Return the span exporter selected by the configuration."""
+    if settings.exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        # Without an endpoint, the exporter follows OTEL_EXPORTER_OTLP_* (default localhost:4318)
+        return OTLPSpanExporter(endpoint=settings.endpoint) if settings.endpoint else OTLPSpanExporter()
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    class FileSpanExporter(ConsoleSpanExporter):
+        """Appends spans to a file it owns, closing it when the span processor shuts down."""
+
+        def shutdown(self):
+            super().shutdown()
+            self.out.close()
+
+    path = os.path.abspath(os.path.expanduser(settings.path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One JSON document per line
+    return FileSpanExporter(out=open(path, "a", encoding="utf-8"), formatter=lambda span: span.to_json(indent=None) + "\n")
+
+
+def configure_tracing(settings: TracingConfig) -> bool:
+    """
+    Install the process-wide tracer, if tracing is enabled.
+
+    The first successful call wins; later calls (e.g. from other loops of a fleet) reuse
+    the same tracer. A relative file exporter path is resolved against the current directory.
+    The provider shuts down when the process exits, exporting the remaining spans and
+    closing the trace file.
+
+    Args:
+        settings (TracingConfig): The tracing configuration.
+
+    Returns:
+        bool: Whether spans are being recorded.
+    """
+    global _tracer, _provider, _error_status, _current_span, _warned
+    if not settings.enabled:
+        return _tracer is not None
+    with _lock:
+        if _tracer is not None:
+            return True
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+            exporter = _exporter(settings)
+        except ImportError as e:
+            if not _warned:
+                _warned = True
+                click.echo(
+                    f"Warning: tracing is enabled but OpenTelemetry is not available ({e}); "
+                    "install it with `pip install 'ralph[otel]'` or `poetry install --extras otel`.",
+                    err=True,
+                )
+            return False
+
+        _provider = TracerProvider(resource=Resource.create({"service.name": settings.service_name}))
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+        _tracer = _provider.get_tracer("ralph")
+        _error_status = lambda description: trace.Status(trace.StatusCode.ERROR, description)
+        _current_span = trace.get_current_span
+        return True
+
+
+def flush_tracing():
+    """
+    Export the spans recorded so far, e.g. at the end of a run.
+    """
+    if _provider is not None:
+        _provider.force_flush()
+
+
+@contextlib.contextmanager
+def span(name: str, attributes: dict[str, Any] | None = None) -> Iterator[Any]:
+    """
+    Record a span around a block, as a child of the current span.
+
+    Args:
+        name (str): The span name.
+        attributes (dict[str, Any] | None, optional): Initial attributes. Defaults to None.
+
+    Yields:
+        Span | None: The span, or None if tracing is disabled.
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def _clean(attributes: dict[str, Any] | None) -> dict[str, Any]:
+    """Drop attributes without a value, which OpenTelemetry does not accept."""
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
+
+
+def set_attributes(current: Any, attributes: dict[str, Any]):
+    """
+    Add attributes to a span.
+
+    Args:
+        current (Span | None): The span; nothing is done if None.
+        attributes (dict[str, Any]): The attributes; None values are skipped.
+    """
+    if current is not None:
+        current.set_attributes(_clean(attributes))
+
+
+def set_error(current: Any, error_type: str, description: str):
+    """
+    Mark a span as failed.
+
+    Args:
+        current (Span | None): The span; nothing is done if None.
+        error_type (str): The `error.type` attribute (e.g. "tool_error").
+        description (str): The status description.
+    """
+    if current is None:
+        return
+    current.set_attribute("error.type", error_type)
+    if _error_status is not None:
+        current.set_status(_error_status(description))
+
+
+def annotate_current(attributes: dict[str, Any]):
+    """
+    Add attributes to the active span, for code that does not own a span (e.g. the command runner).
+
+    Args:
+        attributes (dict[str, Any]): The attributes; None values are skipped.
+    """
+    if _tracer is None or _current_span is None:
+        return
+    set_attributes(_current_span(), attributes)
+
+
+def usage_attributes(usage: dict | None) -> dict[str, Any]:
+    """
+    Return span attributes for a response's usage metadata.
+
+    Args:
+        usage (dict | None): The `usage_metadata` of an AI message.
+
+    Returns:
+        dict[str, Any]: The token count attributes.
+    """
+    usage = usage or {}
+    return {
+        "gen_ai.usage.input_tokens": usage.get("input_tokens"),
+        "gen_ai.usage.output_tokens": usage.get("output_tokens"),
+        "gen_ai.usage.cache_read.input_tokens": (usage.get("input_token_details") or {}).get("cache_read"),
+    }
@@ -0,0 +1,294 @@
+"""
+Workspace module for Ralph.
+
+This module maintains an index of the files in a working directory for the
+`list_files` tool. The index is built on first use and refreshed incrementally:
+a directory is only rescanned when its modification time (or that of its
+`.gitignore`) changes. Paths matched by `.gitignore` files and common bulky
+directories (`.git`, `node_modules`, virtualenvs, caches) are left out.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+# Directories that are never indexed, whatever the .gitignore says
+DEFAULT_EXCLUDES: frozenset[str] = frozenset({
+    ".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".ralph",
+})
+
+GITIGNORE = ".gitignore"
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) to a regular expression."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+@dataclass
+class IgnoreRule:
+    """
+    A single .gitignore rule.
+
+    Attributes:
+        base (str): Directory of the .gitignore, relative to the workspace root ("." for the root).
+        regex (re.Pattern): Compiled pattern, matched against paths relative to `base`.
+        negate (bool): Whether the rule re-includes matching paths ("!pattern").
+        dir_only (bool): Whether the rule only matches directories ("pattern/").
+    """
+    base: str
+    regex: re.Pattern
+    negate: bool = False
+    dir_only: bool = False
+
+
+def parse_gitignore(text: str, base: str = ".") -> list[IgnoreRule]:
+    """
+    Parse the contents of a .gitignore file.
+
+    Args:
+        text (str): The file contents.
+        base (str, optional): Directory of the file relative to the workspace root. Defaults to ".".
+
+    Returns:
+        list[IgnoreRule]: The rules, in file order.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A pattern containing a slash is relative to the .gitignore; otherwise it matches at any depth
+        if "/" in line:
+            regex = _glob_to_regex(line.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + _glob_to_regex(line)
+        rules.append(IgnoreRule(base, re.compile(regex + "$"), negate, dir_only))
+    return rules
+
+
+@dataclass
+class _DirEntry:
+    """Indexed contents of one directory."""
+    mtime_ns: int
+    ignore_mtime_ns: int | None
+    files: list[str] = field(default_factory=list)
+    subdirs: list[str] = field(default_factory=list)
+
+
+class WorkspaceIndex:
+    """
+    Incrementally refreshed index of the files in a workspace.
+
+    Attributes:
+        root (str): The absolute workspace directory.
+        scans (int): Number of directory scans performed, for diagnostics.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.scans = 0
+        self._dirs: dict[str, _DirEntry] = {}
+        self._rules: dict[str, list[IgnoreRule]] = {}
+        self._lock = threading.Lock()
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Return whether a path is excluded from the index.
+
+        Args:
+            rel_path (str): Path relative to the workspace root, using "/" separators.
+            is_dir (bool): Whether the path is a directory.
+
+        Returns:
+            bool: True if the path is excluded.
+        """
+        if is_dir and os.path.basename(rel_path) in DEFAULT_EXCLUDES:
+            return True
+
+        ignored = False
+        # Rules of outer .gitignore files first, so that deeper (and later) rules win
+        parts = rel_path.split("/")
+        for base in ["."] + ["/".join(parts[:i]) for i in range(1, len(parts))]:
+            if base not in self._rules:
+                continue
+            relative = rel_path if base == "." else rel_path[len(base) + 1:]
+            for rule in self._rules[base]:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.regex.match(relative):
+                    ignored = not rule.negate
+        return ignored
+
+    def _load_rules(self, rel_dir: str, abs_dir: str) -> int | None:
+        """Load the .gitignore of a directory and return its mtime, or None if it has none."""
+        path = os.path.join(abs_dir, GITIGNORE)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                self._rules[rel_dir] = parse_gitignore(f.read(), rel_dir)
+            return mtime_ns
+        except OSError:
+            self._rules.pop(rel_dir, None)
+            return None
+
+    def _refresh_dir(self, rel_dir: str, force: bool, seen: set[str]):
+        """Rescan a directory if it changed, then recurse into its subdirectories."""
+        seen.add(rel_dir)
+        abs_dir = self.root if rel_dir == "." else os.path.join(self.root, rel_dir)
+        try:
+            mtime_ns = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            return
+
+        entry = self._dirs.get(rel_dir)
+        try:
+            ignore_mtime_ns = os.stat(os.path.join(abs_dir, GITIGNORE)).st_mtime_ns
+        except OSError:
+            ignore_mtime_ns = None
+        rules_changed = entry is None or entry.ignore_mtime_ns != ignore_mtime_ns
+        if rules_changed:
+            ignore_mtime_ns = self._load_rules(rel_dir, abs_dir)
+
+        # Changed ignore rules affect the whole subtree, so it is rescanned
+        force = force or rules_changed
+        if force or entry.mtime_ns != mtime_ns:
+            entry = _DirEntry(mtime_ns, ignore_mtime_ns)
+            with os.scandir(abs_dir) as it:
+                for item in it:
+                    rel = item.name if rel_dir == "." else f"{rel_dir}/{item.name}"
+                    try:
+                        is_dir = item.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if self.ignored(rel, is_dir):
+                        continue
+                    (entry.subdirs if is_dir else entry.files).append(rel)
+            entry.files.sort()
+            entry.subdirs.sort()
+            self._dirs[rel_dir] = entry
+            self.scans += 1
+
+        for subdir in entry.subdirs:
+            self._refresh_dir(subdir, force, seen)
+
+    def refresh(self):
+        """
+        Bring the index up to date, rescanning only directories that changed.
+        """
+        with self._lock:
+            seen: set[str] = set()
+            self._refresh_dir(".", False, seen)
+            for rel_dir in [d for d in self._dirs if d not in seen]:
+                del self._dirs[rel_dir]
+                self._rules.pop(rel_dir, None)
+
+    def files(self, path: str = ".", max_depth: int | None = None, pattern: str | None = None) -> list[str]:
+        """
+        Return the indexed files under a directory.
+
+        Args:
+            path (str, optional): Directory to list, absolute or relative to the root. Defaults to ".".
+            max_depth (int | None, optional): Maximum depth below `path` (1 lists only its direct
+                files). Defaults to None (unlimited).
+            pattern (str | None, optional): Glob that the relative path or the file name must match;
+                "*" matches within a directory and "**/" any number of directories. Defaults to None.
+
+        Returns:
+            list[str]: Sorted file paths relative to `path`.
+        """
+        self.refresh()
+        start = self._relative(path)
+        prefix = "" if start == "." else start + "/"
+        # "*" stays within a directory; "**/" matches any number of directories, including none
+        matcher = re.compile(_glob_to_regex(pattern)) if pattern else None
+
+        results = []
+        with self._lock:
+            pending = [(start, 1)]
+            while pending:
+                rel_dir, depth = pending.pop()
+                entry = self._dirs.get(rel_dir)
+                if entry is None:
+                    continue
+                for rel in entry.files:
+                    relative = rel[len(prefix):]
+                    if matcher and not (matcher.fullmatch(relative) or matcher.fullmatch(os.path.basename(rel))):
+                        continue
+                    results.append(relative)
+                if max_depth is None or depth < max_depth:
+                    pending.extend((subdir, depth + 1) for subdir in entry.subdirs)
+        return sorted(results)
+
+    def _relative(self, path: str) -> str:
+        """Return a path relative to the root, using "/" separators."""
+        return os.path.relpath(os.path.abspath(os.path.join(self.root, path)), self.root).replace(os.sep, "/")
+
+    def indexed(self, path: str) -> bool:
+        """
+        Return whether a directory is part of the index (i.e. it exists and is not excluded).
+
+        Args:
+            path (str): Directory, absolute or relative to the root.
+
+        Returns:
+            bool: True if the directory is indexed.
+        """
+        return self._relative(path) in self._dirs
+
+
+# One index per workspace, shared by every loop in the process
+_indexes: dict[str, WorkspaceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def workspace_index(workdir: str) -> WorkspaceIndex:
+    """
+    Return the shared index for a working directory, creating it on first use.
+
+    Args:
+        workdir (str): The working directory.
+
+    Returns:
+        WorkspaceIndex: The index.
+    """
+    root = os.path.abspath(workdir)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = WorkspaceIndex(root)
+        return _indexes[root]
@@ -19,6 +19,7 @@ def test_ask_command():
         # Patch RalphConfig to return a mock config object
         with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir") as mock_config_cls:
             mock_config_obj = MagicMock()
+            mock_config_obj.aiclient.streaming = False
             mock_config_cls.return_value = mock_config_obj
 
             # Patch get_chain in ralph.llm
@@ -37,6 +38,32 @@ def test_ask_command():
         # Verify the chain was invoked with question
         mock_chain.invoke.assert_called_once_with({"question": "What is the capital of France?"})
 
+def test_ask_command_streaming():
+    runner = CliRunner()
+
+    with runner.isolated_filesystem():
+        with open("config.yaml", "w") as f:
+            f.write("logging:\n  version: 1\n")
+        os.makedirs("secrets", exist_ok=True)
+
+        # Mock a chain that streams its response in pieces
+        mock_chain = MagicMock()
+        mock_chain.stream.return_value = iter(["Paris ", "is the ", "capital."])
+
+        with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir") as mock_config_cls:
+            mock_config_obj = MagicMock()
+            mock_config_obj.aiclient.streaming = True
+            mock_config_obj.cache.active = False
+            mock_config_cls.return_value = mock_config_obj
+
+            with patch("ralph.llm.get_chain", return_value=mock_chain):
+                result = runner.invoke(cli, ["ask", "--config", "config.yaml", "--secrets", "secrets", "What is the capital of France?"])
+
+        assert result.exit_code == 0, f"Exit code: {result.exit_code}, Output: {result.output}"
+        assert "Paris is the capital.\n" in result.output
+        mock_chain.stream.assert_called_once_with({"question": "What is the capital of France?"})
+        mock_chain.invoke.assert_not_called()
+
 def test_ask_command_error():
     runner = CliRunner()
 
@@ -0,0 +1,62 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from ralph.agent import run_command
+from ralph.config import RalphConfig, LangchainConfig
+from ralph.graph import arun_loop
+
+
+def _config():
+    return RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False))
+
+
+def _scripted_llm():
+    """Return a mock chat model whose bound-tools runnable answers asynchronously."""
+    async def respond(messages, config):
+        if messages[-1].type == "human":
+            await asyncio.sleep(0.05)
+            return AIMessage(content="Writing.", tool_calls=[
+                {"name": "write_file", "args": {"path": "out.txt", "content": "hello"}, "id": "w1"},
+                {"name": "read_file", "args": {"path": "out.txt"}, "id": "r1"},
+            ])
+        return AIMessage(content="Done.", tool_calls=[{"name": "done", "args": {}, "id": "d1"}])
+
+    llm = MagicMock()
+    bound = MagicMock()
+    bound.ainvoke = AsyncMock(side_effect=respond)
+    llm.bind_tools.return_value = bound
+    return llm, bound
+
+
+def test_arun_loop_runs_workspaces_concurrently(tmp_path, capsys):
+    workdirs = []
+    for name in ("a", "b"):
+        workdir = tmp_path / name
+        workdir.mkdir()
+        workdirs.append(workdir)
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Write out.txt")
+
+    llm, bound = _scripted_llm()
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI", return_value=llm):
+        async def main():
+            await asyncio.gather(*(arun_loop(str(instructions), str(w), 3, _config()) for w in workdirs))
+        asyncio.run(main())
+
+    output = capsys.readouterr().out
+    for workdir in workdirs:
+        assert (workdir / "out.txt").read_text() == "hello"
+        assert f"[{workdir}] Objective met (agent signaled done)." in output
+    # The write is ordered before the read of the same path
+    assert output.count("[TOOL]: hello") == 2
+    assert bound.ainvoke.await_count == 4
+    # arun_loop does not change the process working directory
+    assert os.getcwd() not in [str(w) for w in workdirs]
+
+
+def test_run_command_async_variant(tmp_path):
+    config = {"configurable": {"workdir": str(tmp_path)}}
+    result = asyncio.run(run_command.ainvoke({"command": "pwd && echo oops >&2"}, config=config))
+    assert str(tmp_path) in result
+    assert "oops" in result
@@ -0,0 +1,32 @@
+from benchmarks.run import best_of, compare
+from benchmarks.suites import Profile, bench_loop, bench_react, bench_tools
+
+TINY = Profile(workspace_files=12, loop_iterations=4, react_iterations=2, react_steps=3, tool_repeats=2)
+
+
+def test_suites_run_against_the_scripted_model():
+    loop = bench_loop(TINY)
+    assert loop["iterations"] == 4
+    assert loop["iteration_overhead_p50_ms"] > 0
+    assert loop["peak_memory_kb"] > 0
+
+    react = bench_react(TINY)
+    # Each invocation makes one call per tool step plus the final answer
+    assert react["model_calls"] == TINY.react_iterations * (TINY.react_steps + 1)
+
+    tools = bench_tools(TINY)
+    assert {"read_file", "search_code", "apply_patch", "update_stories"} <= set(tools)
+    assert all(stats["calls_per_s"] > 0 for stats in tools.values())
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"tools": {"read_file": {"p50_ms": 10.0, "calls_per_s": 100.0}}, "loop": {"iterations": 4, "peak_memory_kb": 100.0}}
+    results = {"tools": {"read_file": {"p50_ms": 20.0, "calls_per_s": 40.0}}, "loop": {"iterations": 9, "peak_memory_kb": 104.0}}
+
+    regressions = compare(results, baseline, tolerance=0.5)
+    assert [line.split(":")[0] for line in regressions] == ["tools/read_file/calls_per_s", "tools/read_file/p50_ms"]
+    assert compare(baseline, baseline, tolerance=0.5) == []
+
+    merged = best_of([results, baseline])
+    assert merged["tools"]["read_file"] == {"p50_ms": 10.0, "calls_per_s": 100.0}
+    assert merged["loop"]["iterations"] == 9
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+from click.testing import CliRunner
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration
+from ralph.cache import SqliteLLMCache, llm_cache
+from ralph.cli import cli
+from ralph.config import CacheConfig, RalphConfig, LangchainConfig
+
+
+def _generation(text):
+    return [ChatGeneration(message=AIMessage(content=text, tool_calls=[{"name": "done", "args": {}, "id": "d1"}]))]
+
+
+def test_cache_round_trip_and_lru_eviction(tmp_path):
+    cache = SqliteLLMCache(tmp_path / "cache.sqlite", max_entries=2)
+
+    cache.update("p1", "llm", _generation("one"))
+    cache.update("p2", "llm", _generation("two"))
+    hit = cache.lookup("p1", "llm")
+    assert hit[0].message.content == "one"
+    assert hit[0].message.tool_calls[0]["name"] == "done"
+    # The model string is part of the key
+    assert cache.lookup("p1", "other-llm") is None
+
+    # p2 is now the least recently used entry and is evicted
+    cache.update("p3", "llm", _generation("three"))
+    assert len(cache) == 2
+    assert cache.lookup("p2", "llm") is None
+    assert cache.lookup("p3", "llm")[0].message.content == "three"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_read_only_cache_replays_without_recording(tmp_path):
+    SqliteLLMCache(tmp_path / "cache.sqlite").update("p1", "llm", _generation("one"))
+
+    cache = SqliteLLMCache(tmp_path / "cache.sqlite", mode="read-only")
+    cache.update("p2", "llm", _generation("two"))
+
+    assert cache.lookup("p1", "llm")[0].message.content == "one"
+    assert cache.lookup("p2", "llm") is None
+    assert len(cache) == 1
+
+
+def test_chat_model_replays_identical_requests(tmp_path):
+    cache = llm_cache(CacheConfig(mode="read-write", path=str(tmp_path / "cache.sqlite")))
+    assert llm_cache(CacheConfig(mode="off")) is None
+
+    # The fake model can only answer once; the second call must come from the cache
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Paris")]), cache=cache)
+    first = model.invoke([HumanMessage(content="Capital of France?", id="a")])
+    second = model.invoke([HumanMessage(content="Capital of France?", id="b")])
+
+    assert first.content == second.content == "Paris"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_mode_option_overrides_config(tmp_path):
+    (tmp_path / "config.yaml").write_text("logging:\n  version: 1\n")
+    (tmp_path / "secrets").mkdir()
+    config = RalphConfig(aiclient=LangchainConfig(model="gemini-pro", google_api_key="fake"))
+
+    runner = CliRunner()
+    with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir", return_value=config), \
+            patch("ralph.llm.get_chain") as mock_get_chain:
+        mock_get_chain.return_value.invoke.return_value = "Paris"
+        result = runner.invoke(cli, [
+            "ask", "--config", str(tmp_path / "config.yaml"), "--secrets", str(tmp_path / "secrets"),
+            "--cache-mode", "read-only", "Capital of France?",
+        ])
+
+    assert result.exit_code == 0, result.output
+    assert "Paris" in result.output
+    assert mock_get_chain.call_args.args[0].cache.mode == "read-only"
+    # Cached runs use whole responses, which the cache can answer
+    mock_get_chain.return_value.stream.assert_not_called()
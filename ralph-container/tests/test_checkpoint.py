@@ -0,0 +1,73 @@
+import asyncio
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, START, END
+from ralph.checkpoint import open_checkpointer, checkpoint_path
+from ralph.state import AgentState
+
+
+def _echo_graph(checkpointer):
+    def node(state: AgentState):
+        return {"messages": [AIMessage(content=f"step {len(state.messages)}")]}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", node)
+    workflow.add_edge(START, "agent")
+    workflow.add_edge("agent", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def test_checkpoint_file_is_created_in_workdir(tmp_path):
+    with open_checkpointer(str(tmp_path)) as saver:
+        graph = _echo_graph(saver)
+        graph.invoke({"messages": [("user", "go")]}, {"configurable": {"thread_id": "t1"}})
+
+    assert checkpoint_path(str(tmp_path)).exists()
+
+
+def test_resume_restores_history(tmp_path):
+    config = {"configurable": {"thread_id": "t1"}}
+    with open_checkpointer(str(tmp_path)) as saver:
+        graph = _echo_graph(saver)
+        graph.invoke({"messages": [("user", "go")]}, config)
+        graph.invoke({"messages": []}, config)
+
+    # A new process (new connection) sees the committed history
+    with open_checkpointer(str(tmp_path)) as saver:
+        graph = _echo_graph(saver)
+        messages = graph.get_state(config).values["messages"]
+        assert [m.content for m in messages] == ["go", "step 1", "step 2"]
+
+        result = graph.invoke({"messages": []}, config)
+        assert result["messages"][-1].content == "step 3"
+
+        # Other threads are independent
+        assert not graph.get_state({"configurable": {"thread_id": "other"}}).values
+
+
+def test_messages_are_stored_once(tmp_path):
+    config = {"configurable": {"thread_id": "t1"}}
+    with open_checkpointer(str(tmp_path)) as saver:
+        graph = _echo_graph(saver)
+        graph.invoke({"messages": [("user", "go")]}, config)
+        for _ in range(4):
+            graph.invoke({"messages": []}, config)
+
+        rows = saver.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        # 1 user message + 5 AI messages, each written once despite many checkpoints
+        assert rows == 6
+        checkpoints = saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        assert checkpoints > rows
+
+
+def test_deleting_a_thread_removes_its_messages(tmp_path):
+    with open_checkpointer(str(tmp_path)) as saver:
+        graph = _echo_graph(saver)
+        graph.invoke({"messages": [("user", "go")]}, {"configurable": {"thread_id": "t1"}})
+        graph.invoke({"messages": [("user", "go")]}, {"configurable": {"thread_id": "t2"}})
+
+        asyncio.run(saver.adelete_thread("t1"))
+
+        for table in ("checkpoints", "writes", "messages"):
+            threads = {row[0] for row in saver.conn.execute(f"SELECT thread_id FROM {table}")}
+            assert "t1" not in threads
+        assert [m.content for m in graph.get_state({"configurable": {"thread_id": "t2"}}).values["messages"]] == ["go", "step 1"]
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import signal
+import time
+from datetime import timedelta
+from unittest.mock import patch
+from ralph.agent import run_command
+from ralph.command import OutputBuffer, run_shell, arun_shell
+from ralph.config.tool import ToolBoxConfig, ToolConfig
+
+
+def test_output_buffer_keeps_head_and_tail():
+    buffer = OutputBuffer(10)
+    for chunk in (b"01234", b"56789", b"abcdefghij"):
+        buffer.feed(chunk)
+
+    assert buffer.total == 20
+    assert buffer.text() == "01234\n... [10 of 20 bytes omitted] ...\nfghij"
+
+    small = OutputBuffer(10)
+    small.feed(b"abc")
+    assert small.text() == "abc"
+
+
+def test_run_shell_caps_noisy_output(tmp_path):
+    result = run_shell("seq 1 100000; echo oops >&2; exit 3", str(tmp_path), timeout=10, max_bytes=100)
+
+    stdout = result.split("\nstderr:\n")[0]
+    assert stdout.startswith("stdout:\n1\n2\n")
+    assert "bytes omitted" in stdout
+    assert stdout.endswith("99999\n100000\n")
+    assert "oops" in result
+    assert result.endswith("exit code: 3")
+
+
+def _marker_alive(path):
+    """Return whether the background child is still appending to its file."""
+    deadline = time.monotonic() + 2
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    size = os.path.getsize(path)
+    time.sleep(0.3)
+    return os.path.getsize(path) != size
+
+
+def test_run_shell_timeout_kills_process_group(tmp_path):
+    marker = tmp_path / "ticks"
+    command = f"(while true; do echo tick >> {marker}; sleep 0.05; done) & sleep 30"
+
+    started = time.monotonic()
+    result = run_shell(command, str(tmp_path), timeout=0.5, max_bytes=1000)
+
+    assert time.monotonic() - started < 10
+    assert "timed out after 0.5s" in result
+    assert not _marker_alive(marker)
+
+
+def test_arun_shell_timeout_kills_process_group(tmp_path):
+    marker = tmp_path / "ticks"
+    command = f"(while true; do echo tick >> {marker}; sleep 0.05; done) & sleep 30"
+
+    result = asyncio.run(arun_shell(command, str(tmp_path), timeout=0.5, max_bytes=1000))
+
+    assert "timed out after 0.5s" in result
+    assert not _marker_alive(marker)
+
+
+def test_background_children_outlive_a_command_that_exits(tmp_path):
+    marker = tmp_path / "ticks"
+    command = f"(while true; do echo tick >> {marker}; sleep 0.05; done) >/dev/null 2>&1 & echo $!"
+
+    for run in (lambda: run_shell(command, str(tmp_path), timeout=10, max_bytes=1000),
+                lambda: asyncio.run(arun_shell(command, str(tmp_path), timeout=10, max_bytes=1000))):
+        result = run()
+        group = os.getpgid(int(result.split("stdout:\n")[1].split("\n")[0]))
+        try:
+            assert result.endswith("exit code: 0")
+            assert _marker_alive(marker)
+        finally:
+            os.killpg(group, signal.SIGKILL)
+
+
+def test_children_holding_the_output_pipes_are_killed_after_draining(tmp_path):
+    marker = tmp_path / "ticks"
+    command = f"(while true; do echo tick >> {marker}; sleep 0.05; done) & echo started"
+
+    with patch("ralph.command._DRAIN_TIMEOUT", 0.5):
+        started = time.monotonic()
+        result = run_shell(command, str(tmp_path), timeout=10, max_bytes=1000)
+        assert time.monotonic() - started < 5
+        assert "started" in result and result.endswith("exit code: 0")
+        assert not _marker_alive(marker)
+
+        result = asyncio.run(arun_shell(command, str(tmp_path), timeout=10, max_bytes=1000))
+        assert "started" in result
+        assert not _marker_alive(marker)
+
+
+def test_run_command_honors_tool_config(tmp_path):
+    toolbox = ToolBoxConfig(tools=[ToolConfig(name="run_command", timeout=timedelta(seconds=0.3), max_output_bytes=200)])
+    config = {"configurable": {"workdir": str(tmp_path), "toolbox": toolbox}}
+
+    assert "timed out after 0.3s" in run_command.invoke({"command": "sleep 5"}, config=config)
+    result = run_command.invoke({"command": "seq 1 10000"}, config=config)
+    assert "bytes omitted" in result
+    assert len(result) < 400
+
+
+def test_run_command_times_out_after_60_seconds_by_default(tmp_path):
+    toolboxes = [None, ToolBoxConfig(), ToolBoxConfig(tools=[ToolConfig(name="run_command", max_output_bytes=200)])]
+    for toolbox in toolboxes:
+        config = {"configurable": {"workdir": str(tmp_path), "toolbox": toolbox}}
+        with patch("ralph.agent.run_shell", return_value="ok") as run:
+            run_command.invoke({"command": "true"}, config=config)
+        assert run.call_args.args[2] == 60
+    # Other tools keep the general default
+    assert ToolBoxConfig().tool_config("read_file").timeout == timedelta(seconds=30)
@@ -0,0 +1,62 @@
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, RemoveMessage
+from ralph.context import ContextManager, message_text
+
+
+def _turn(n, output):
+    call_id = f"call{n}"
+    return [
+        AIMessage(content="", id=f"ai{n}", tool_calls=[{"name": "read_file", "args": {"path": f"f{n}"}, "id": call_id}]),
+        ToolMessage(content=output, tool_call_id=call_id, id=f"tool{n}"),
+    ]
+
+
+def test_count_is_cached_per_message():
+    manager = ContextManager(budget=1000)
+    msg = HumanMessage(content="x" * 40, id="h1")
+
+    assert manager.count(msg) == 10 + 4
+    assert manager._counts["h1"] == (40, 14)
+
+    # A replacement with the same id but different content is re-counted
+    changed = msg.model_copy(update={"content": "x" * 80})
+    assert manager.count(changed) == 20 + 4
+
+
+def test_compact_noop_under_budget():
+    manager = ContextManager(budget=1000)
+    messages = [HumanMessage(content="do it", id="h")] + _turn(1, "small")
+
+    updates, total = manager.compact(messages)
+
+    assert updates == []
+    assert total == manager.total(messages)
+
+
+def test_compact_truncates_older_tool_outputs_first():
+    manager = ContextManager(budget=400, keep_recent=2, truncate_tokens=16)
+    messages = [HumanMessage(content="do it", id="h")] + _turn(1, "a" * 1000) + _turn(2, "b" * 1000)
+
+    updates, total = manager.compact(messages)
+
+    assert total <= 400
+    assert [u.id for u in updates] == ["tool1"]
+    assert "truncated" in message_text(updates[0])
+    assert isinstance(updates[0], ToolMessage)
+
+
+def test_compact_evicts_whole_turns_and_keeps_task():
+    manager = ContextManager(budget=200, keep_recent=2, truncate_tokens=16)
+    messages = [HumanMessage(content="do it", id="h")]
+    for n in range(1, 5):
+        messages += _turn(n, "c" * 400)
+
+    updates, total = manager.compact(messages)
+
+    removed = {u.id for u in updates if isinstance(u, RemoveMessage)}
+    assert total <= 200
+    assert removed and "h" not in removed
+    # An AI message is never evicted without its tool output (and vice versa)
+    for n in range(1, 5):
+        assert (f"ai{n}" in removed) == (f"tool{n}" in removed)
+    # The recent tail is kept
+    assert "ai4" not in removed and "tool4" not in removed
@@ -0,0 +1,111 @@
+import threading
+import time
+from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from ralph.config.tool import ToolBoxConfig, ToolConfig
+from ralph.executor import ToolExecutor
+
+events = []
+lock = threading.Lock()
+active = {"now": 0, "max": 0}
+
+
+def _enter():
+    with lock:
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+
+
+def _exit():
+    with lock:
+        active["now"] -= 1
+
+
+@tool
+def read_file(path: str, config: RunnableConfig) -> str:
+    """Fake read."""
+    _enter()
+    time.sleep(0.05)
+    events.append(("read", path))
+    _exit()
+    return f"content of {path}"
+
+
+@tool
+def write_file(path: str, content: str, config: RunnableConfig) -> str:
+    """Fake write."""
+    _enter()
+    time.sleep(0.05)
+    events.append(("write", path))
+    _exit()
+    return f"wrote {path}"
+
+
+def _calls(*specs):
+    return [{"name": name, "args": args, "id": f"call{i}"} for i, (name, args) in enumerate(specs)]
+
+
+def _reset():
+    events.clear()
+    active.update(now=0, max=0)
+
+
+def test_results_in_call_order_and_concurrent():
+    _reset()
+    executor = ToolExecutor([read_file, write_file], ToolBoxConfig(max_concurrent=4))
+    calls = _calls(*[("read_file", {"path": f"f{i}"}) for i in range(4)])
+
+    results = executor.run(calls, {"configurable": {"workdir": "/tmp"}})
+
+    assert [r.tool_call_id for r in results] == ["call0", "call1", "call2", "call3"]
+    assert [r.content for r in results] == [f"content of f{i}" for i in range(4)]
+    assert active["max"] > 1
+
+
+def test_global_and_per_tool_limits():
+    _reset()
+    executor = ToolExecutor([read_file, write_file], ToolBoxConfig(max_concurrent=2))
+    executor.run(_calls(*[("read_file", {"path": f"f{i}"}) for i in range(5)]), {"configurable": {"workdir": "/tmp"}})
+    assert active["max"] == 2
+
+    _reset()
+    toolbox = ToolBoxConfig(max_concurrent=8, tools=[ToolConfig(name="read_file", max_instances=1)])
+    executor = ToolExecutor([read_file, write_file], toolbox)
+    executor.run(_calls(*[("read_file", {"path": f"f{i}"}) for i in range(3)]), {"configurable": {"workdir": "/tmp"}})
+    assert active["max"] == 1
+
+
+def test_writes_are_serialized_per_path():
+    _reset()
+    executor = ToolExecutor([read_file, write_file], ToolBoxConfig(max_concurrent=4))
+    calls = _calls(
+        ("write_file", {"path": "a.txt", "content": "1"}),
+        ("read_file", {"path": "./a.txt"}),
+        ("write_file", {"path": "a.txt", "content": "2"}),
+        ("read_file", {"path": "b.txt"}),
+    )
+
+    deps = executor.dependencies(calls, {"configurable": {"workdir": "/tmp"}})
+    assert deps == [[], [0], [0, 1], []]
+
+    executor.run(calls, {"configurable": {"workdir": "/tmp"}})
+    on_a = [e for e in events if e[1].endswith("a.txt")]
+    assert on_a == [("write", "a.txt"), ("read", "./a.txt"), ("write", "a.txt")]
+
+
+def test_batch_tools_depend_on_every_listed_path():
+    executor = ToolExecutor([read_file, write_file], ToolBoxConfig())
+    calls = _calls(
+        ("write_files", {"files": [{"path": "a.txt", "content": "1"}, {"path": "b.txt", "content": "2"}]}),
+        ("read_files", {"paths": ["c.txt", "b.txt"]}),
+        ("read_files", {"paths": ["c.txt"]}),
+    )
+
+    assert executor.dependencies(calls, {"configurable": {"workdir": "/tmp"}}) == [[], [0], []]
+
+
+def test_unknown_tool_returns_error_message():
+    executor = ToolExecutor([read_file], ToolBoxConfig())
+    results = executor.run(_calls(("nope", {})), {"configurable": {"workdir": "/tmp"}})
+    assert results[0].status == "error"
+    assert "nope is not a valid tool" in results[0].content
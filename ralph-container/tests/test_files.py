@@ -0,0 +1,140 @@
+from unittest.mock import patch
+import os
+import pytest
+from ralph.agent import read_file, read_files, write_files
+from ralph.config.tool import ToolBoxConfig, ToolConfig
+from ralph.files import read_window, atomic_write_many
+
+
+def _numbered(tmp_path, lines=100):
+    path = tmp_path / "numbers.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, lines + 1)))
+    return path
+
+
+def test_whole_small_file_has_no_header(tmp_path):
+    path = _numbered(tmp_path, 3)
+    assert read_window(str(path)) == "line 1\nline 2\nline 3\n"
+
+
+def test_line_range_reports_position_and_totals(tmp_path):
+    path = _numbered(tmp_path)
+    result = read_window(str(path), start_line=10, end_line=12)
+
+    header, body = result.split("\n", 1)
+    assert body == "line 10\nline 11\nline 12\n"
+    assert "lines 10-12" in header
+    assert "of 100 lines" in header
+    assert f"{path.stat().st_size} bytes total" in header
+
+
+def test_byte_range_and_cap_cut_at_line_break(tmp_path):
+    path = _numbered(tmp_path)
+
+    assert read_window(str(path), offset=7, length=7).endswith("\nline 2\n")
+
+    result = read_window(str(path), max_bytes=20)
+    header, body = result.split("\n", 1)
+    assert body == "line 1\nline 2\n"
+    assert "output capped at 20 bytes" in header
+    assert "lines 1-2" in header
+
+
+def test_large_files_are_memory_mapped(tmp_path):
+    path = _numbered(tmp_path, 1000)
+    with patch("ralph.files.MMAP_THRESHOLD", 0), patch("ralph.files._CHUNK", 64), \
+            patch("ralph.files.mmap.mmap", wraps=__import__("mmap").mmap) as mock_mmap:
+        result = read_window(str(path), start_line=500, end_line=501)
+
+    assert mock_mmap.called
+    assert result.split("\n", 1)[1] == "line 500\nline 501\n"
+    assert "of 1000 lines" in result
+
+
+def test_read_file_tool_uses_toolbox_cap(tmp_path):
+    _numbered(tmp_path)
+    toolbox = ToolBoxConfig(tools=[ToolConfig(name="read_file", max_output_bytes=14)])
+    config = {"configurable": {"workdir": str(tmp_path), "toolbox": toolbox}}
+
+    result = read_file.invoke({"path": "numbers.txt"}, config=config)
+    assert result.endswith("\nline 1\nline 2\n")
+    assert "capped at 14 bytes" in result
+
+    result = read_file.invoke({"path": "numbers.txt", "start_line": 100}, config=config)
+    assert result.endswith("\nline 100\n")
+
+
+def test_read_files_returns_each_file_with_a_header(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha\n")
+    (tmp_path / "b.txt").write_text("beta\n")
+    config = {"configurable": {"workdir": str(tmp_path)}}
+
+    result = read_files.invoke({"paths": ["a.txt", "b.txt", "missing.txt"]}, config=config)
+
+    assert result.startswith("==> a.txt <==\nalpha\n\n\n==> b.txt <==\nbeta\n")
+    assert "==> missing.txt <==\nError reading file missing.txt" in result
+
+
+def test_write_files_is_all_or_nothing(tmp_path):
+    config = {"configurable": {"workdir": str(tmp_path)}}
+    (tmp_path / "a.txt").write_text("old")
+
+    result = write_files.invoke({"files": [
+        {"path": "a.txt", "content": "new"},
+        {"path": "../outside.txt", "content": "x"},
+    ]}, config=config)
+    assert result.startswith("Error writing files (no files were changed)")
+    assert (tmp_path / "a.txt").read_text() == "old"
+
+    result = write_files.invoke({"files": [
+        {"path": "a.txt", "content": "new"},
+        {"path": "sub/b.txt", "content": "b"},
+    ]}, config=config)
+    assert result == "Successfully wrote 2 files: a.txt, sub/b.txt"
+    assert (tmp_path / "a.txt").read_text() == "new"
+    assert (tmp_path / "sub" / "b.txt").read_text() == "b"
+
+
+def test_atomic_write_many_cleans_up_on_failure(tmp_path):
+    (tmp_path / "a.txt").write_text("old")
+
+    with patch("ralph.files.os.fdopen", side_effect=[open(os.devnull, "w"), OSError("disk full")]):
+        with pytest.raises(OSError):
+            atomic_write_many([(str(tmp_path / "a.txt"), "new"), (str(tmp_path / "b.txt"), "b")])
+
+    assert sorted(os.listdir(tmp_path)) == ["a.txt"]
+    assert (tmp_path / "a.txt").read_text() == "old"
+
+
+def test_write_files_changes_nothing_when_a_target_cannot_be_replaced(tmp_path):
+    config = {"configurable": {"workdir": str(tmp_path)}}
+    (tmp_path / "a.txt").write_text("old")
+    (tmp_path / "sub").mkdir()
+
+    result = write_files.invoke({"files": [
+        {"path": "a.txt", "content": "new"},
+        {"path": "sub", "content": "x"},
+    ]}, config=config)
+
+    assert result.startswith("Error writing files (no files were changed)")
+    assert (tmp_path / "a.txt").read_text() == "old"
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "sub"]
+
+
+def test_atomic_write_many_restores_replaced_files_when_a_rename_fails(tmp_path):
+    (tmp_path / "a.txt").write_text("old")
+    real_replace = os.replace
+    calls = []
+
+    def replace(src, dst):
+        calls.append(dst)
+        if str(dst).endswith("c.txt"):
+            raise OSError("rename failed")
+        return real_replace(src, dst)
+
+    with patch("ralph.files.os.replace", side_effect=replace):
+        with pytest.raises(OSError, match="rename failed"):
+            atomic_write_many([(str(tmp_path / n), "new") for n in ("a.txt", "b.txt", "c.txt")])
+
+    assert sorted(os.listdir(tmp_path)) == ["a.txt"]
+    assert (tmp_path / "a.txt").read_text() == "old"
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from click.testing import CliRunner
+from langchain_core.messages import AIMessage
+from ralph.cli import cli
+from ralph.config import RalphConfig, LangchainConfig
+from ralph.fleet import FleetManifest, ModelPool
+
+
+def _config():
+    return RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False))
+
+
+def test_manifest_resolves_paths_relative_to_manifest(tmp_path):
+    manifest = tmp_path / "fleet.yaml"
+    manifest.write_text(
+        "- workdir: repo1\n  instruction_file: task.md\n  limit: 3\n"
+        "- workdir: /abs/repo2\n  instruction_file: task.md\n"
+    )
+
+    fleet = FleetManifest.from_yaml(manifest)
+
+    assert fleet.entries[0].workdir == str(tmp_path / "repo1")
+    assert fleet.entries[0].limit == 3
+    assert fleet.entries[1].workdir == "/abs/repo2"
+    assert fleet.entries[1].limit == 1
+
+
+def test_model_pool_shares_client_per_provider_config():
+    pool = ModelPool()
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI") as MockLLM:
+        config = _config()
+        assert pool.get(config) is pool.get(config.model_copy())
+        other = config.model_copy(update={"aiclient": config.aiclient.model_copy(update={"model": "gemini-flash"})})
+        pool.get(other)
+
+    assert MockLLM.call_count == 2
+    assert len(pool) == 2
+
+
+def test_fleet_command_runs_all_workspaces(tmp_path):
+    (tmp_path / "task.md").write_text("Finish.")
+    for name in ("repo1", "repo2", "repo3"):
+        (tmp_path / name).mkdir()
+    manifest = tmp_path / "fleet.yaml"
+    manifest.write_text("".join(f"- workdir: {n}\n  instruction_file: task.md\n  limit: 2\n" for n in ("repo1", "repo2", "repo3")))
+    (tmp_path / "config.yaml").write_text("logging:\n  version: 1\n")
+    (tmp_path / "secrets").mkdir()
+
+    active = {"now": 0, "max": 0}
+
+    async def respond(messages, config):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return AIMessage(content="Done.", tool_calls=[{"name": "done", "args": {}, "id": "d1"}],
+                         usage_metadata={"input_tokens": 100, "output_tokens": 10, "total_tokens": 110})
+
+    llm = MagicMock()
+    llm.bind_tools.return_value.ainvoke = AsyncMock(side_effect=respond)
+
+    runner = CliRunner()
+    with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir", return_value=_config()):
+        with patch("langchain_google_genai.ChatGoogleGenerativeAI", return_value=llm) as MockLLM:
+            result = runner.invoke(cli, [
+                "fleet", "--config", str(tmp_path / "config.yaml"), "--secrets", str(tmp_path / "secrets"),
+                "--max-llm-requests", "2", "--report", str(tmp_path / "report.json"), str(manifest),
+            ])
+
+    assert result.exit_code == 0, result.output
+    assert "Fleet finished: 3 workspaces, 1 model clients." in result.output
+    assert MockLLM.call_count == 1
+    assert active["max"] <= 2
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert [r["done"] for r in report] == [True, True, True]
+    assert sum(r["input_tokens"] for r in report) == 300
+    assert all(r["iterations"] == 1 for r in report)
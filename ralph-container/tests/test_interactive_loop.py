@@ -3,6 +3,7 @@ import click
 from click.testing import CliRunner
 from unittest.mock import MagicMock, patch
 from ralph.cli import cli
+from ralph.config import RalphConfig, LangchainConfig
 from langchain_core.messages import AIMessage
 
 def test_interactive_loop_flow():
@@ -19,15 +20,10 @@ def test_interactive_loop_flow():
 
         # Mock Config
         with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir") as mock_config_cls:
-            mock_config_obj = MagicMock()
-            mock_config_obj.aiclient.model_provider = "google_genai"
-            # Ensure model is a string to pass validation if real class is used (though we mock it)
-            mock_config_obj.aiclient.model = "gemini-pro"
-
-            # Return a valid fake key object
-            mock_key = MagicMock()
-            mock_key.get_secret_value.return_value = "fake"
-            mock_config_obj.aiclient.google_api_key = mock_key
+            # Use a real config so that numeric settings (e.g. the context budget) are valid
+            mock_config_obj = RalphConfig(
+                aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False)
+            )
             mock_config_cls.return_value = mock_config_obj
 
             # Mock LLM
@@ -5,6 +5,7 @@ from ralph.llm import get_chain
 def test_get_chain_no_api_key():
     # Mock RalphConfig
     mock_config = MagicMock()
+    mock_config.aiclient.model_provider = "google_genai"
     mock_config.aiclient.google_api_key = None
 
     with pytest.raises(ValueError, match="GOOGLE_API_KEY environment variable is not set"):
@@ -15,10 +16,13 @@ def test_get_chain_success():
     mock_config = MagicMock()
     # Configure the mock to return "dummy_key" when get_secret_value is called
     mock_config.aiclient.google_api_key.get_secret_value.return_value = "dummy_key"
+    mock_config.aiclient.model_provider = "google_genai"
     mock_config.aiclient.model = "gemini-pro"
+    mock_config.aiclient.timeout = 60
+    mock_config.cache.mode = "off"
 
     # We also need to patch ChatGoogleGenerativeAI to verify initialization
-    with patch("ralph.llm.ChatGoogleGenerativeAI") as mock_llm_class:
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI") as mock_llm_class:
         mock_llm_instance = MagicMock()
         mock_llm_class.return_value = mock_llm_instance
 
@@ -30,5 +34,7 @@ def test_get_chain_success():
         # Verify LLM was initialized with the key
         mock_llm_class.assert_called_once_with(
             model="gemini-pro",
-            google_api_key="dummy_key"
+            google_api_key="dummy_key",
+            timeout=60,
+            cache=None,
         )
@@ -20,6 +20,10 @@ def test_loop_command():
 
         with patch("ralph.config.RalphConfig.from_yaml_and_secrets_dir") as mock_config_cls:
             mock_config_obj = MagicMock()
+            mock_config_obj.aiclient.streaming = False
+            mock_config_obj.metrics.enabled = False
+            mock_config_obj.scheduler.enabled = False
+            mock_config_obj.prefetch.enabled = False
             mock_config_cls.return_value = mock_config_obj
 
             # Mock create_single_step_agent
@@ -31,29 +35,31 @@ def test_loop_command():
                 mock_msg_1 = AIMessage(content="I am working.")
                 mock_msg_2 = ToolMessage(content="RALPH_DONE", tool_call_id="1")
 
+                # The agent is compiled with a checkpointer, so run_loop only sends new
+                # input and the agent returns the full persisted history.
+                history = []
+
                 def invoke_side_effect(state, *args, **kwargs):
                     msgs = state["messages"]
                     # Convert input dict/tuples to Messages for the return value
                     # In real LangGraph, inputs are processed.
                     # We assume inputs are what run_loop passed: [("user", "Please...")]
                     # We convert them to HumanMessage for the result
-
-                    new_msgs = []
                     for m in msgs:
                         if isinstance(m, tuple) and m[0] == "user":
-                            new_msgs.append(HumanMessage(content=m[1]))
+                            history.append(HumanMessage(content=m[1]))
                         else:
-                            new_msgs.append(m)
+                            history.append(m)
 
                     # If this is the first call
-                    # We check if last message is user message (which means start of conversation)
                     # messages = [HumanMessage]
-                    if len(msgs) == 1:
-                        return {"messages": new_msgs + [mock_msg_1]}
+                    if len(history) == 1:
+                        history.append(mock_msg_1)
                     # If this is subsequent call
                     # messages = [HumanMessage, AIMessage]
                     else:
-                        return {"messages": new_msgs + [mock_msg_2]}
+                        history.append(mock_msg_2)
+                    return {"messages": list(history)}
 
                 mock_agent.invoke.side_effect = invoke_side_effect
 
@@ -66,3 +72,8 @@ def test_loop_command():
         assert "Starting iteration 2/2..." in result.output
         assert "[TOOL]: RALPH_DONE" in result.output
         assert "Objective met (agent signaled done)." in result.output
+
+        # The agent was compiled with a checkpointer and invoked with a thread id
+        assert mock_create_agent.call_args.kwargs["checkpointer"] is not None
+        run_config = mock_agent.invoke.call_args.args[1]
+        assert run_config["configurable"]["thread_id"]
@@ -0,0 +1,106 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from ralph.config import RalphConfig, LangchainConfig
+from ralph.config.tool import ToolBoxConfig
+from ralph.executor import ToolExecutor
+from ralph.graph import arun_loop
+from ralph.metrics import MetricsRecorder
+
+
+@tool
+def echo(text: str, config: RunnableConfig) -> str:
+    """Echo the text."""
+    return text
+
+
+@tool
+def fail(config: RunnableConfig) -> str:
+    """Always fail."""
+    raise RuntimeError("boom")
+
+
+def test_recorder_writes_iteration_records_and_totals(tmp_path):
+    path = tmp_path / "state" / "metrics.jsonl"
+    metrics = MetricsRecorder(str(path), workdir="/w", thread_id="t1")
+
+    metrics.llm_call(1.5, {"input_tokens": 100, "output_tokens": 20, "input_token_details": {"cache_read": 60}}, 0.5)
+    metrics.node("agent", 1.6)
+    metrics.tool_call("read_file", 0.25, 1000)
+    metrics.tool_call("read_file", 0.75, 24, error=True)
+    first = metrics.end_iteration(1, context_tokens=300)
+    metrics.llm_call(0.5, {"input_tokens": 50, "output_tokens": 5})
+    metrics.end_iteration(2, context_tokens=350)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["iteration"] for r in records] == [1, 2]
+    assert records[0] == first
+    assert first["workdir"] == "/w" and first["thread_id"] == "t1" and first["context_tokens"] == 300
+    assert first["llm"]["cached_input_tokens"] == 60 and first["llm"]["first_token"] == 0.5
+    assert first["tools"]["read_file"] == {"calls": 2, "seconds": 1.0, "bytes": 1024, "errors": 1}
+    # Each record only holds its own iteration
+    assert records[1]["llm"]["calls"] == 1 and records[1]["tools"] == {}
+
+    totals = metrics.totals()
+    assert totals["llm"]["calls"] == 2
+    assert totals["llm"]["input_tokens"] == 150
+    summary = metrics.summary()
+    assert "Metrics: 2 iterations" in summary
+    assert "tool:read_file" in summary and "node:agent" in summary
+    assert "1024" in summary
+
+
+def test_executor_records_each_tool_call():
+    metrics = MetricsRecorder()
+    executor = ToolExecutor([echo, fail], ToolBoxConfig(max_concurrent=4))
+    calls = [
+        {"name": "echo", "args": {"text": "héllo"}, "id": "c1"},
+        {"name": "fail", "args": {}, "id": "c2"},
+    ]
+    state = MagicMock()
+    state.messages = [AIMessage(content="", tool_calls=calls)]
+
+    executor(state, {"configurable": {"workdir": "/tmp", "metrics": metrics}})
+    record = metrics.end_iteration(1)
+
+    assert record["tools"]["echo"]["calls"] == 1
+    assert record["tools"]["echo"]["bytes"] == len("héllo".encode("utf-8"))
+    assert record["tools"]["fail"]["errors"] == 1
+    assert record["nodes"]["tools"] > 0
+
+
+def test_arun_loop_writes_metrics_and_summary(tmp_path, capsys):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Write out.txt")
+    usage = {"input_tokens": 200, "output_tokens": 10, "total_tokens": 210}
+
+    async def respond(messages, config):
+        if messages[-1].type == "human":
+            return AIMessage(content="Writing.", usage_metadata=usage, tool_calls=[
+                {"name": "write_file", "args": {"path": "out.txt", "content": "hello"}, "id": "w1"},
+            ])
+        return AIMessage(content="Done.", usage_metadata=usage, tool_calls=[{"name": "done", "args": {}, "id": "d1"}])
+
+    llm = MagicMock()
+    llm.bind_tools.return_value.ainvoke = AsyncMock(side_effect=respond)
+    config = RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False))
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI", return_value=llm):
+        report = asyncio.run(arun_loop(str(instructions), str(workdir), 3, config))
+
+    assert report.done
+    records = [json.loads(line) for line in (workdir / ".ralph" / "metrics.jsonl").read_text().splitlines()]
+    assert len(records) == 2
+    assert records[0]["thread_id"] == report.thread_id
+    assert records[0]["llm"]["calls"] == 1 and records[0]["llm"]["input_tokens"] == 200
+    assert records[0]["tools"]["write_file"]["calls"] == 1
+    assert set(records[0]["nodes"]) == {"context", "agent", "tools"}
+    assert records[1]["done"] is True
+
+    output = capsys.readouterr().out
+    assert f"[{workdir}] Metrics: 2 iterations" in output
+    assert "tool:write_file" in output
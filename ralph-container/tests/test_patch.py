@@ -0,0 +1,72 @@
+import pytest
+from ralph.agent import apply_patch, edit_file
+from ralph.patch import PatchError, apply_hunks, parse_unified_diff, replace_blocks
+
+TEXT = "".join(f"line {i}\n" for i in range(1, 11))
+
+DIFF = """diff --git a/f.txt b/f.txt
+--- a/f.txt
++++ b/f.txt
+@@ -2,3 +2,3 @@
+ line 2
+-line 3
++LINE 3
+ line 4
+@@ -8,2 +8,3 @@
+ line 8
++inserted
+ line 9
+"""
+
+
+def test_unified_diff_applies_with_offset():
+    [file_patch] = parse_unified_diff(DIFF)
+    assert file_patch.path == "f.txt"
+
+    expected = TEXT.replace("line 3\n", "LINE 3\n").replace("line 9\n", "inserted\nline 9\n")
+    assert apply_hunks(TEXT, file_patch.hunks) == expected
+    # Context found two lines further down than the header says
+    assert apply_hunks("a\nb\n" + TEXT, file_patch.hunks) == "a\nb\n" + expected
+
+
+def test_mismatched_hunk_reports_the_difference():
+    [file_patch] = parse_unified_diff(DIFF)
+
+    with pytest.raises(PatchError, match=r"hunk 1 .* line 3 should be 'line 3' but is 'line three'"):
+        apply_hunks(TEXT.replace("line 3", "line three"), file_patch.hunks, "f.txt")
+
+    with pytest.raises(PatchError, match="line counts"):
+        parse_unified_diff("--- a/f\n+++ b/f\n@@ -1 +1 @@\n-a\n+b\n+c\n")
+
+
+def test_replace_blocks_requires_a_unique_match():
+    assert replace_blocks("a = 1\nb = 2\n", [("a = 1", "a = 10"), ("b = 2\n", "")]) == "a = 10\n"
+
+    with pytest.raises(PatchError, match="edit 1: search text not found"):
+        replace_blocks("x\n", [("y", "z")])
+    with pytest.raises(PatchError, match="occurs 2 times"):
+        replace_blocks("x\nx\n", [("x", "z")])
+
+
+def test_edit_and_patch_tools(tmp_path):
+    config = {"configurable": {"workdir": str(tmp_path)}}
+    (tmp_path / "f.txt").write_text(TEXT)
+    (tmp_path / "old.txt").write_text("gone\n")
+
+    result = edit_file.invoke({"path": "f.txt", "edits": [{"search": "line 1\n", "replace": "first\n"}, {"search": "nope", "replace": ""}]}, config=config)
+    assert result.startswith("Error editing f.txt (file unchanged): edit 2")
+    assert (tmp_path / "f.txt").read_text() == TEXT
+
+    patch = DIFF + "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-gone\n"
+    result = apply_patch.invoke({"patch": patch}, config=config)
+
+    assert result == "Successfully patched f.txt, new.txt, old.txt (deleted)"
+    assert "LINE 3" in (tmp_path / "f.txt").read_text()
+    assert (tmp_path / "new.txt").read_text() == "hello\n"
+    assert not (tmp_path / "old.txt").exists()
+
+    # A failing hunk in the second file leaves the first untouched
+    bad = DIFF.replace("line 2", "line two") + "--- a/new.txt\n+++ b/new.txt\n@@ -1 +1 @@\n-hello\n+bye\n"
+    result = apply_patch.invoke({"patch": bad}, config=config)
+    assert result.startswith("Error applying patch (no files were changed): hunk 1")
+    assert (tmp_path / "new.txt").read_text() == "hello\n"
@@ -1,9 +1,12 @@
 import os
 import json
 import shutil
+import threading
 import pytest
-from unittest.mock import MagicMock
-from ralph.agent import update_prd, _get_workdir
+from unittest.mock import MagicMock, patch
+from ralph.agent import update_prd, update_stories, next_story, _get_workdir
+from ralph.prd import PrdStore
+from ralph.files import atomic_write
 
 # Mock RunnableConfig
 @pytest.fixture
@@ -75,3 +78,73 @@ def test_update_prd_handles_custom_id(mock_config, tmpdir):
         data = json.load(f)
 
     assert data["userStories"][0]["storyId"] == story_id
+
+def test_update_prd_upserts_by_story_id(mock_config, tmpdir):
+    """Test that update_prd updates an existing story instead of appending a duplicate."""
+    update_prd.func("First", mock_config, story_id="US-1")
+    result = update_prd.func("First (renamed)", mock_config, story_id="US-1", priority=2, passes=True)
+
+    assert result == "Successfully updated story 'US-1' in prd.json"
+    with open(os.path.join(str(tmpdir), "prd.json")) as f:
+        data = json.load(f)
+    assert data["userStories"] == [{"storyId": "US-1", "storyTitle": "First (renamed)", "passes": True, "priority": 2}]
+
+def test_update_stories_and_next_story(mock_config, tmpdir):
+    """Test batched status updates and the next-failing-story query."""
+    for story_id, priority in [("A", 3), ("B", 1), ("C", 2), ("D", None)]:
+        update_prd.func(f"Story {story_id}", mock_config, story_id=story_id, priority=priority)
+
+    assert json.loads(next_story.func(mock_config))["storyId"] == "B"
+
+    result = update_stories.func(["B", "C", "X"], mock_config, passes=True)
+    assert result == "Successfully updated 2 stories in prd.json; not found: X"
+    assert json.loads(next_story.func(mock_config))["storyId"] == "A"
+
+    update_stories.func(["A", "D"], mock_config, passes=True)
+    assert next_story.func(mock_config) == "All stories in prd.json pass."
+
+def test_prd_store_serializes_concurrent_writers(tmpdir):
+    """Test that concurrent upserts from separate stores do not lose updates, and writes are batched."""
+    path = os.path.join(str(tmpdir), "prd.json")
+    lock_path = os.path.join(str(tmpdir), "prd.lock")
+    stores = [PrdStore(path, lock_path) for _ in range(4)]
+
+    def add(store, n):
+        for i in range(10):
+            store.upsert(f"{n}-{i}", storyTitle="t")
+
+    threads = [threading.Thread(target=add, args=(store, n)) for n, store in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(PrdStore(path).stories()) == 40
+
+    store = stores[0]
+    with patch("ralph.prd.atomic_write", wraps=atomic_write) as write:
+        with store.transaction():
+            for i in range(10):
+                store.update([f"1-{i}"], passes=True)
+    write.assert_called_once()
+    assert all(s["passes"] for s in PrdStore(path).stories() if s["storyId"].startswith("1-"))
+    loads = store.loads
+    store.stories()
+    store.next_failing()
+    assert store.loads == loads
+
+def test_prd_store_rereads_a_same_size_rewrite_with_the_same_mtime(tmpdir):
+    """Test that another writer's same-size change is seen even if the mtime does not change."""
+    path = os.path.join(str(tmpdir), "prd.json")
+    store = PrdStore(path)
+    store.upsert("A", storyTitle="t", priority=1)
+    st = os.stat(path)
+
+    # Another process changes the priority 1 -> 2 and the mtime stays the same
+    other = PrdStore(path)
+    other.upsert("A", priority=2)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(path).st_size == st.st_size
+
+    store.upsert("B", storyTitle="u")
+    assert {s["storyId"]: s.get("priority") for s in PrdStore(path).stories()} == {"A": 2, "B": None}
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from ralph.agent import read_file, read_files
+from ralph.config import LangchainConfig, PrefetchConfig, RalphConfig
+from ralph.graph import arun_loop
+from ralph.metrics import MetricsRecorder
+from ralph.prefetch import FileCache, Prefetcher
+from ralph.search import content_index
+from ralph.standin import StandinServer, StandinSettings
+
+
+def test_file_cache_is_bounded_and_serves_only_unchanged_files(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / name
+        path.write_bytes(name.encode() * 40)
+        paths.append(str(path))
+    cache = FileCache(max_bytes=100)
+
+    for path in paths:
+        with open(path, "rb") as f:
+            cache.put(path, f.read(), os.fstat(f.fileno()))
+
+    # "a" was evicted to stay within 100 bytes
+    assert cache.bytes == 80
+    assert cache.get(paths[0]) is None
+    assert cache.get(paths[2]) == b"c" * 40
+
+    with open(paths[1], "a") as f:
+        f.write("changed")
+    assert cache.get(paths[1]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_file_cache_misses_same_size_rewrites_with_the_same_modification_time(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("old")
+    cache = FileCache(max_bytes=100)
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        cache.put(str(path), f.read(), st)
+
+    # An atomic replacement (new inode) stamped with the old modification time
+    (tmp_path / "new.txt").write_text("new")
+    os.utime(tmp_path / "new.txt", ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp_path / "new.txt", path)
+
+    assert cache.get(str(path)) is None
+
+
+def test_candidates_come_from_writes_instruction_and_last_listing(tmp_path):
+    for name in ("notes.md", "src/app.py", "src/util.py", "docs/guide.md", "big.log"):
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(name)
+    instructions = tmp_path / "task.md"
+    instructions.write_text("Fix the bug in src/util.py, see ../outside.txt and missing.py.")
+    (tmp_path / "prd.json").write_text(json.dumps({"userStories": [{"notes": "Update docs/guide.md"}]}))
+    messages = [
+        HumanMessage(content="Start"),
+        AIMessage(content="", tool_calls=[{"name": "list_files", "args": {"path": "src"}, "id": "l1"}]),
+        ToolMessage(content=["app.py", "util.py", "... 3 more files; call list_files again with offset=2"], name="list_files", tool_call_id="l1"),
+        AIMessage(content="", tool_calls=[{"name": "write_file", "args": {"path": "notes.md", "content": "x"}, "id": "w1"}]),
+        ToolMessage(content="Successfully wrote", name="write_file", tool_call_id="w1"),
+    ]
+    prefetcher = Prefetcher(str(tmp_path), PrefetchConfig(max_files=4))
+
+    candidates = prefetcher.candidates(messages, str(instructions))
+
+    rel = [os.path.relpath(path, tmp_path) for path in candidates]
+    assert rel == ["notes.md", "src/util.py", "docs/guide.md", "src/app.py"]
+
+
+def test_read_tools_serve_prefetched_files_and_record_hit_rate(tmp_path):
+    (tmp_path / "small.py").write_text("print('hi')\n")
+    (tmp_path / "large.txt").write_text("x" * 2000)
+    prefetcher = Prefetcher(str(tmp_path), PrefetchConfig(max_file_bytes=1000))
+    metrics = MetricsRecorder()
+    config = {"configurable": {"workdir": str(tmp_path), "prefetch": prefetcher, "metrics": metrics}}
+
+    assert prefetcher.warm([str(tmp_path / "small.py"), str(tmp_path / "large.txt")], config) == (1, 12)
+    assert read_file.invoke({"path": "small.py"}, config=config) == "print('hi')\n"
+    assert "small.py <==\nprint('hi')" in read_files.invoke({"paths": ["small.py", "large.txt"]}, config=config)
+
+    metrics.end_iteration(1)
+    assert metrics.totals()["prefetch"] == {"files": 1, "bytes": 12, "hits": 2, "misses": 1}
+    assert "2 hits, 1 misses (67% hit rate)" in metrics.summary()
+
+
+def test_prefetch_refreshes_a_built_search_index_in_the_background(tmp_path):
+    (tmp_path / "a.py").write_text("alpha\n")
+    index = content_index(str(tmp_path))
+    index.search("alpha")
+    reads = index.reads
+    (tmp_path / "a.py").write_text("alpha beta\n")
+    prefetcher = Prefetcher(str(tmp_path), PrefetchConfig())
+
+    prefetcher.start([HumanMessage(content="Start")], {"configurable": {"workdir": str(tmp_path)}})
+    prefetcher.wait(5)
+
+    assert index.reads == reads + 1
+    assert index.search("beta")[1] == 1
+    assert index.reads == reads + 1
+
+
+def test_loop_reads_files_prefetched_during_model_calls(tmp_path):
+    instructions = tmp_path / "task.md"
+    instructions.write_text("Keep notes.")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "README.md").write_text("TODO: write notes\n")
+
+    with StandinServer(StandinSettings(steps=2, latency=0.2)) as server:
+        config = RalphConfig(
+            aiclient=LangchainConfig(model_provider="ollama", model="standin", ollama_base_url=server.url, streaming=False),
+            prefetch=PrefetchConfig(enabled=True),
+        )
+        report = asyncio.run(arun_loop(str(instructions), str(workdir), 4, config))
+
+    assert report.done
+    records = [json.loads(line) for line in (workdir / ".ralph" / "metrics.jsonl").read_text().splitlines()]
+    # The second turn reads README.md, found by the first turn's list_files
+    assert records[1]["tools"]["read_file"]["calls"] == 1
+    assert records[1]["prefetch"]["hits"] == 1
+    assert records[1]["prefetch"]["misses"] == 0
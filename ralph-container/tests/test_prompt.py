@@ -0,0 +1,46 @@
+import os
+from ralph.agent import _load_instruction, update_instruction
+from ralph.prompt import AGENT_GUIDANCE, InstructionCache, build_system_prompt, instruction_cache, system_message
+
+
+def test_instruction_cache_rereads_only_changed_files(tmp_path):
+    path = tmp_path / "instructions.md"
+    path.write_text("first")
+    cache = InstructionCache()
+
+    assert cache.read(str(path)) == "first"
+    assert cache.read(str(path)) == "first"
+    assert cache.reads == 1
+
+    path.write_text("second, longer")
+    assert cache.read(str(path)) == "second, longer"
+    assert cache.reads == 2
+
+
+def test_update_instruction_refreshes_the_cache(tmp_path):
+    path = tmp_path / "instructions.md"
+    path.write_text("old")
+    config = {"configurable": {"instruction_path": str(path)}}
+    assert _load_instruction("fallback", config) == "old"
+    reads = instruction_cache.reads
+
+    update_instruction.invoke({"new_instruction": "new"}, config=config)
+
+    assert _load_instruction("fallback", config) == "new"
+    assert instruction_cache.reads == reads
+    os.remove(path)
+    assert _load_instruction("fallback", config) == "fallback"
+
+
+def test_system_prompt_is_stable_and_ordered():
+    prompt = build_system_prompt("Workspace prompt", "/work", "Do the thing")
+
+    assert prompt.startswith(AGENT_GUIDANCE + "\n\nWorkspace prompt\n\nYou are working in the directory: /work")
+    assert prompt.endswith("Your goal is to follow these instructions:\nDo the thing\n")
+    assert system_message("Workspace prompt", "/work", "Do the thing") is system_message("Workspace prompt", "/work", "Do the thing")
+
+    # A changed instruction only changes the tail of the prompt
+    changed = build_system_prompt("Workspace prompt", "/work", "Do another thing")
+    common = os.path.commonprefix([prompt, changed])
+    assert common.startswith(AGENT_GUIDANCE + "\n\nWorkspace prompt")
+    assert len(common) > len(prompt) - len("Do the thing\n")
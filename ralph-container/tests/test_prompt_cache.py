@@ -0,0 +1,129 @@
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from pydantic import ValidationError
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from ralph.agent import read_file, done
+from ralph.config import LangchainConfig, PromptCacheConfig
+from ralph.graph import LoopReport, _report_step
+from ralph import prompt_cache
+from ralph.prompt_cache import GeminiPromptCache, OpenAIPromptCache, PromptCache, prompt_cache_for
+
+TOOLS = [read_file, done]
+
+
+def _gemini(client, **settings):
+    llm = MagicMock()
+    llm.model = "gemini-test"
+    llm.bind.side_effect = lambda **kwargs: ("bound", kwargs)
+    return GeminiPromptCache(llm, TOOLS, PromptCacheConfig(**{"enabled": True, "min_tokens": 10, **settings}), "key",
+                             count_text=lambda text: len(text) // 4, client=client)
+
+
+def _client(names):
+    handles = []
+    for name in names:
+        handle = MagicMock()
+        handle.name = name
+        handles.append(handle)
+    client = MagicMock()
+    client.caches.create.side_effect = handles
+    return client
+
+
+def test_gemini_cached_content_is_created_once_and_reused():
+    client = _client(["cachedContents/1"])
+    system = SystemMessage(content="Stable prompt " * 50 + str(time.time()))
+    history = [HumanMessage(content="Go")]
+
+    model, messages = _gemini(client).prepare("with-tools", system, history)
+    assert model == ("bound", {"cached_content": "cachedContents/1"})
+    assert messages == history
+
+    # A second agent (e.g. the next iteration) reuses the handle
+    model, _ = _gemini(client).prepare("with-tools", system, history)
+    assert model == ("bound", {"cached_content": "cachedContents/1"})
+    assert client.caches.create.call_count == 1
+    config = client.caches.create.call_args.kwargs["config"]
+    assert config.system_instruction == system.content
+    assert config.ttl == "3600s"
+
+
+def test_gemini_cache_expiry_short_prefix_and_failure():
+    system = SystemMessage(content="Expiring prompt " * 50 + str(time.time()))
+    client = _client(["cachedContents/a", "cachedContents/b"])
+    cache = _gemini(client, ttl_seconds=120)
+    now = time.time()
+    with patch("ralph.prompt_cache.time.time", return_value=now):
+        assert cache.handle(system) == "cachedContents/a"
+        assert cache.handle(system) == "cachedContents/a"
+    # Within the expiry margin, so the content is recreated
+    with patch("ralph.prompt_cache.time.time", return_value=now + 61):
+        assert cache.handle(system) == "cachedContents/b"
+    with pytest.raises(ValidationError):
+        PromptCacheConfig(ttl_seconds=60)
+
+    short = SystemMessage(content="x")
+    model, messages = _gemini(client, min_tokens=100000).prepare("with-tools", short, [])
+    assert model == "with-tools" and messages == [short]
+
+    failing = MagicMock()
+    failing.caches.create.side_effect = RuntimeError("not supported")
+    system = SystemMessage(content="Failing prompt " * 50 + str(time.time()))
+    cache = _gemini(failing)
+    assert cache.prepare("with-tools", system, []) == ("with-tools", [system])
+    assert cache.prepare("with-tools", system, []) == ("with-tools", [system])
+    assert failing.caches.create.call_count == 1
+
+
+def test_gemini_cache_retries_transient_failures_and_creates_outside_the_shared_lock():
+    system = SystemMessage(content="Flaky prompt " * 50 + str(time.time()))
+    handle = MagicMock()
+    handle.name = "cachedContents/ok"
+    locked = []
+
+    def create(**kwargs):
+        locked.append(prompt_cache._gemini_lock.locked())
+        if len(locked) == 1:
+            raise TimeoutError("timed out")
+        return handle
+
+    client = MagicMock()
+    client.caches.create.side_effect = create
+    cache = _gemini(client)
+    now = time.time()
+    with patch("ralph.prompt_cache.time.time", return_value=now):
+        assert cache.handle(system) is None
+        assert cache.handle(system) is None
+    with patch("ralph.prompt_cache.time.time", return_value=now + 301):
+        assert cache.handle(system) == "cachedContents/ok"
+
+    assert locked == [False, False]
+    tools = client.caches.create.call_args.kwargs["config"].tools
+    assert [f.name for f in tools[0].function_declarations] == ["read_file", "done"]
+
+
+def test_provider_selection_and_openai_key():
+    settings = PromptCacheConfig(enabled=True)
+    azure = LangchainConfig(model="gpt", model_provider="azure_openai")
+    assert type(prompt_cache_for(None, TOOLS, PromptCacheConfig(), azure, len)) is PromptCache
+    strategy = prompt_cache_for(None, TOOLS, settings, azure, len)
+    assert isinstance(strategy, OpenAIPromptCache)
+
+    model = MagicMock()
+    system = SystemMessage(content="prompt")
+    strategy.prepare(model, system, [])
+    strategy.prepare(model, system, [])
+    keys = [c.kwargs["prompt_cache_key"] for c in model.bind.call_args_list]
+    assert keys[0] == keys[1] and keys[0].startswith("ralph-")
+
+
+def test_report_counts_cached_input_tokens():
+    report = LoopReport(workdir="/w")
+    usage = {"input_tokens": 1000, "output_tokens": 10, "total_tokens": 1010, "input_token_details": {"cache_read": 750}}
+    result = {"messages": [HumanMessage(content="Go"), AIMessage(content="Hi", usage_metadata=usage)]}
+
+    _report_step(1, result, [], report)
+
+    assert report.cached_input_tokens == 750
+    assert report.usage_summary() == "Tokens: 1000 input (750 cached, 250 uncached, 75% cache hit), 10 output"
@@ -14,6 +14,7 @@ def mock_config():
     config.aiclient.model_provider = "google_genai"
     config.aiclient.model = "gemini-pro"
     config.aiclient.temperature = 0
+    config.cache.mode = "off"
     return config
 
 def test_ensure_prompts_files_integration(tmp_path):
@@ -63,7 +64,7 @@ def test_initialize_agent_context_reads_prompt(tmp_path, mock_config):
     prompt_file.write_text(prompt_content, encoding="utf-8")
 
     # We need to mock ChatGoogleGenerativeAI to avoid making network calls
-    with patch("ralph.agent.ChatGoogleGenerativeAI") as MockLLM:
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI") as MockLLM:
         llm, tools, base_prompt = _initialize_agent_context(str(workdir), mock_config)
 
         assert prompt_content == base_prompt
@@ -73,7 +74,7 @@ def test_initialize_agent_context_fallback(tmp_path, mock_config):
     workdir = tmp_path
     # No prompts file created
 
-    with patch("ralph.agent.ChatGoogleGenerativeAI") as MockLLM:
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI") as MockLLM:
          llm, tools, base_prompt = _initialize_agent_context(str(workdir), mock_config)
 
          # Should be empty string if file missing
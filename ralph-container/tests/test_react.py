@@ -0,0 +1,43 @@
+import os
+from unittest.mock import MagicMock, patch
+from langchain_core.messages import AIMessage
+from ralph.config import RalphConfig, LangchainConfig
+from ralph.react import run_react
+
+
+def _config():
+    return RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False))
+
+
+def test_run_react_reuses_agent_and_model_across_iterations(tmp_path, capsys):
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Do something.")
+    prompt = tmp_path / "prompts" / "agent" / "prompt.md"
+    prompt.parent.mkdir(parents=True)
+    prompt.write_text("Base prompt")
+
+    def invoke(inputs, config):
+        if agent.invoke.call_count == 2:
+            # Changing the prompt file rebuilds the agent for the next iteration
+            prompt.write_text("Updated prompt")
+            os.utime(prompt, ns=(0, 10**18))
+        return {"messages": [AIMessage(content="Working.")]}
+
+    agent = MagicMock()
+    agent.invoke.side_effect = invoke
+
+    with patch("ralph.models.llm_model") as mock_llm_model, \
+            patch("langgraph.prebuilt.create_react_agent", return_value=agent) as mock_create:
+        run_react(str(instructions), str(tmp_path), 4, _config())
+
+    # One model client for the whole run; the agent is compiled again only after the prompt changed
+    assert mock_llm_model.call_count == 1
+    assert mock_create.call_count == 2
+    output = capsys.readouterr().out
+    assert output.count("(built)") == 2
+    assert output.count("(reused)") == 2
+
+    # Every iteration is a fresh thread with only the initial request
+    thread_ids = {call.kwargs["config"]["configurable"]["thread_id"] for call in agent.invoke.call_args_list}
+    assert len(thread_ids) == 4
+    assert all(len(call.args[0]["messages"]) == 1 for call in agent.invoke.call_args_list)
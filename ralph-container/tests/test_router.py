@@ -0,0 +1,128 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from ralph.config import LangchainConfig, RalphConfig, RouterConfig, SchedulerConfig
+from ralph.context import ContextManager
+from ralph.graph import arun_loop
+from ralph.models import llm_model
+from ralph.router import ModelRouter
+from ralph.standin import StandinServer, StandinSettings
+
+
+def _ollama(url, model, **extra):
+    return LangchainConfig(model_provider="ollama", model=model, ollama_base_url=url, streaming=False, **extra)
+
+
+def test_loop_fails_over_to_the_next_provider_and_tracks_routes(tmp_path):
+    instructions = tmp_path / "task.md"
+    instructions.write_text("Keep notes.")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "README.md").write_text("TODO\n")
+
+    with StandinServer(StandinSettings(error_rate=1.0, error_status=503)) as down, StandinServer(StandinSettings(steps=1)) as up:
+        config = RalphConfig(
+            aiclient=_ollama(down.url, "main"),
+            scheduler=SchedulerConfig(max_retries=1, initial_backoff=0.01),
+            router=RouterConfig(fallbacks=[_ollama(up.url, "backup", input_cost_per_million=2.0, output_cost_per_million=10.0)]),
+        )
+        report = asyncio.run(arun_loop(str(instructions), str(workdir), 4, config))
+
+    assert report.done and report.error is None
+    # The failed primary is retried once, then skipped while it cools down
+    assert down.stats()["requests"] == 2
+    assert up.stats()["requests"] == 2
+    records = [json.loads(line) for line in (workdir / ".ralph" / "metrics.jsonl").read_text().splitlines()]
+    first, second = records[0]["routes"], records[1]["routes"]
+    assert first["ollama/main"]["errors"] == 1
+    assert "ollama/main" not in second
+    assert first["ollama/backup"]["calls"] == second["ollama/backup"]["calls"] == 1
+    assert second["ollama/backup"]["cost"] > 0
+
+
+def test_all_routes_failing_raises_the_last_error():
+    config = RalphConfig(
+        aiclient=LangchainConfig(model_provider="google_genai", model="main", google_api_key="fake"),
+        scheduler=SchedulerConfig(enabled=False),
+        router=RouterConfig(fallbacks=[LangchainConfig(model_provider="google_genai", model="backup", google_api_key="fake")]),
+    )
+    router = ModelRouter(config, llm=MagicMock())
+    attempt = MagicMock(side_effect=[RuntimeError("main down"), RuntimeError("backup down")])
+
+    with patch("ralph.router.click.echo"):
+        with pytest.raises(RuntimeError, match="backup down"):
+            router.run(attempt)
+
+    assert [call.args[0].name for call in attempt.call_args_list] == ["google_genai/main", "google_genai/backup"]
+    # Both routes cool down; when all do, all are tried again
+    assert [route.name for route in router.candidates()] == ["google_genai/main", "google_genai/backup"]
+
+
+def test_cheap_model_summarizes_older_tool_outputs():
+    config = RalphConfig(
+        aiclient=LangchainConfig(model_provider="google_genai", model="main", google_api_key="fake"),
+        router=RouterConfig(cheap=LangchainConfig(model_provider="ollama", model="small", ollama_base_url="http://localhost:1")),
+    )
+    router = ModelRouter(config, llm=MagicMock())
+    cheap = MagicMock()
+    cheap.invoke.return_value = AIMessage(content="Lists 300 files under src/.", usage_metadata={"input_tokens": 900, "output_tokens": 8, "total_tokens": 908})
+    router.cheap._llm = cheap
+
+    manager = ContextManager(budget=200, keep_recent=1, truncate_tokens=50)
+    messages = [
+        HumanMessage(content="Start", id="h"),
+        AIMessage(content="", tool_calls=[{"name": "list_files", "args": {}, "id": "c1"}], id="a1"),
+        ToolMessage(content="src/file.py\n" * 300, tool_call_id="c1", id="t1"),
+        AIMessage(content="Done.", id="a2"),
+    ]
+    updates, total = manager.compact(messages, summarize=lambda text, tokens: router.complete(f"Summarize: {text}"))
+
+    assert updates[0].content.startswith("[Summary of 900 tokens of older tool output]\nLists 300 files")
+    assert total <= 200
+    assert "src/file.py" in cheap.invoke.call_args.args[0][0].content
+
+
+def test_cheap_model_recovers_tool_calls_written_as_text(tmp_path):
+    instructions = tmp_path / "task.md"
+    instructions.write_text("Read the README.")
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "README.md").write_text("hello\n")
+
+    recorded = tmp_path / "recovered.jsonl"
+    recorded.write_text(json.dumps({"content": 'Sure: {"name": "done", "arguments": {}}'}) + "\n")
+    llm = MagicMock()
+    llm.bind_tools.return_value.ainvoke = AsyncMock(return_value=AIMessage(content="I have finished, so I call done now."))
+
+    with StandinServer(StandinSettings(responses=str(recorded))) as cheap:
+        config = RalphConfig(
+            aiclient=LangchainConfig(model_provider="google_genai", model="main", google_api_key="fake", streaming=False),
+            router=RouterConfig(cheap=_ollama(cheap.url, "small")),
+        )
+        report = asyncio.run(arun_loop(str(instructions), str(workdir), 2, config, llm=llm))
+
+    assert report.done
+    assert cheap.stats()["requests"] == 1
+
+
+def test_github_provider_uses_the_openai_compatible_endpoint(monkeypatch):
+    openai = MagicMock()
+    monkeypatch.setitem(__import__("sys").modules, "langchain_openai", openai)
+    config = LangchainConfig(model_provider="github", model="openai/gpt-4.1", github_model_repo="octo/models", github_api_key="token")
+
+    llm_model(config, max_retries=0)
+
+    kwargs = openai.ChatOpenAI.call_args.kwargs
+    assert kwargs["model"] == "openai/gpt-4.1"
+    assert kwargs["base_url"] == "https://models.github.ai/inference"
+    assert kwargs["api_key"] == "token" and kwargs["max_retries"] == 0
+
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    with pytest.raises(ValueError, match="GITHUB_TOKEN"):
+        llm_model(config.model_copy(update={"github_api_key": None}))
+
+    monkeypatch.setitem(__import__("sys").modules, "langchain_openai", None)
+    with pytest.raises(ImportError, match=r"ralph\[openai\]"):
+        llm_model(config)
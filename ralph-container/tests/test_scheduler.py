@@ -0,0 +1,107 @@
+import asyncio
+import random
+from unittest.mock import MagicMock, patch
+import pytest
+from ralph.config import LangchainConfig, MetricsConfig, RalphConfig, SchedulerConfig
+from ralph.graph import arun_loop
+from ralph.scheduler import RequestScheduler, TokenBucket, is_retryable, request_scheduler, retry_after
+from ralph.standin import StandinServer, StandinSettings
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers=headers or {})
+
+
+def _scheduler(**overrides):
+    config = SchedulerConfig(**{"max_retries": 3, "initial_backoff": 0.5, "max_backoff": 10, **overrides})
+    return RequestScheduler(config, name="test", rng=random.Random(0))
+
+
+def test_retries_transient_errors_honouring_retry_after():
+    scheduler = _scheduler()
+    request = MagicMock(side_effect=[ProviderError(429, {"retry-after": "2"}), ProviderError(503), "ok"])
+
+    with patch("ralph.scheduler.time.sleep") as sleep:
+        assert scheduler.call(request) == "ok"
+
+    waits = [c.args[0] for c in sleep.call_args_list]
+    assert waits[0] == 2.0
+    # The 503 backs off by a jittered delay below initial_backoff * 2 (sleep is mocked, so
+    # the other waits are the provider pause set by Retry-After, which never elapses here)
+    assert [w for w in waits if w < 1.5] and all(w <= 2.0 for w in waits)
+    assert scheduler.retries == 2
+
+
+def test_does_not_retry_client_errors_or_beyond_max_retries():
+    scheduler = _scheduler()
+
+    with patch("ralph.scheduler.time.sleep"):
+        with pytest.raises(ProviderError):
+            scheduler.call(MagicMock(side_effect=ProviderError(400)))
+        assert scheduler.retries == 0
+
+        failing = MagicMock(side_effect=ProviderError(500))
+        with pytest.raises(ProviderError):
+            scheduler.call(failing)
+    assert failing.call_count == 4
+
+
+def test_classifies_errors_and_reads_retry_delays():
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(RuntimeError("wrapped"))
+    wrapped = RuntimeError("request failed")
+    wrapped.__cause__ = ProviderError(429)
+    assert is_retryable(wrapped)
+    assert retry_after(ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(RuntimeError("429 RESOURCE_EXHAUSTED {'retryDelay': '13s'}")) == 13.0
+    assert retry_after(ProviderError(500)) is None
+
+
+def test_token_bucket_and_shared_rate_limits():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(30) == pytest.approx(30, abs=0.1)
+
+    config = RalphConfig(
+        aiclient=LangchainConfig(model_provider="ollama", model="m", ollama_base_url="http://h:1"),
+        scheduler=SchedulerConfig(requests_per_minute=120),
+    )
+    other = config.model_copy(update={"aiclient": config.aiclient.model_copy(update={"temperature": 0.1})})
+    scheduler = request_scheduler(config)
+    assert request_scheduler(other) is scheduler
+    assert request_scheduler(config.model_copy(update={"scheduler": SchedulerConfig(enabled=False)})) is None
+
+    scheduler._requests = TokenBucket(120)
+    scheduler._requests.reserve(120)
+    with patch("ralph.scheduler.time.sleep") as sleep:
+        scheduler.call(lambda: "ok")
+    assert sleep.call_args.args[0] == pytest.approx(0.5, abs=0.05)
+
+
+def test_loops_survive_injected_server_errors(tmp_path):
+    instructions = tmp_path / "task.md"
+    instructions.write_text("Keep notes.")
+    workdirs = [tmp_path / f"w{i}" for i in range(3)]
+    for w in workdirs:
+        w.mkdir()
+        (w / "README.md").write_text("TODO\n")
+
+    with StandinServer(StandinSettings(steps=2, error_rate=0.3, seed=7)) as server:
+        config = RalphConfig(
+            aiclient=LangchainConfig(model_provider="ollama", model="standin", ollama_base_url=server.url, streaming=False),
+            metrics=MetricsConfig(enabled=False),
+            scheduler=SchedulerConfig(initial_backoff=0.01, max_retries=6),
+        )
+
+        async def run_all():
+            return await asyncio.gather(*(arun_loop(str(instructions), str(w), 5, config) for w in workdirs))
+
+        reports = asyncio.run(run_all())
+
+    assert [r.error for r in reports] == [None, None, None]
+    assert all(r.done for r in reports)
+    assert server.stats()["errors"] > 0
+    assert request_scheduler(config).retries == server.stats()["errors"]
@@ -0,0 +1,82 @@
+import os
+from ralph.agent import search_code, write_file
+from ralph.search import ContentIndex
+
+
+def _make_tree(root):
+    files = {
+        "src/app.py": "import os\n\ndef main():\n    return load_config()\n",
+        "src/config.py": "def load_config():\n    return {}\n",
+        "README.md": "Call Load_Config to start.\n",
+        "build/gen.py": "load_config()\n",
+        "data.bin": "load_config\0\0",
+    }
+    for rel, content in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (root / ".gitignore").write_text("build/\n")
+
+
+def test_search_finds_matches_with_context(tmp_path):
+    _make_tree(tmp_path)
+
+    lines, total = ContentIndex(str(tmp_path)).search("load_config", context_lines=1)
+
+    assert total == 3
+    assert lines == [
+        "README.md:1: Call Load_Config to start.",
+        "--",
+        "src/app.py-3- def main():",
+        "src/app.py:4:     return load_config()",
+        "--",
+        "src/config.py:1: def load_config():",
+        "src/config.py-2-     return {}",
+    ]
+
+
+def test_search_scope_case_and_regex(tmp_path):
+    _make_tree(tmp_path)
+    index = ContentIndex(str(tmp_path))
+
+    _, total = index.search("Load_Config", case_sensitive=True, context_lines=0)
+    assert total == 1
+
+    lines, _ = index.search(r"def \w+\(", regex=True, pattern="*.py", context_lines=0)
+    assert lines == ["src/app.py:3: def main():", "--", "src/config.py:1: def load_config():"]
+    lines, _ = index.search(r"def \w+\(", regex=True, pattern="src/**/*.py", context_lines=0)
+    assert lines == ["src/app.py:3: def main():", "--", "src/config.py:1: def load_config():"]
+
+    lines, _ = index.search("load_config", path=str(tmp_path / "src"), context_lines=0)
+    assert all(line.startswith("src/") or line == "--" for line in lines)
+
+
+def test_index_is_updated_incrementally(tmp_path):
+    _make_tree(tmp_path)
+    config = {"configurable": {"workdir": str(tmp_path)}}
+    search_code.invoke({"query": "load_config"}, config=config)
+    from ralph.search import content_index
+    index = content_index(str(tmp_path))
+    reads = index.reads
+
+    write_file.invoke({"path": "src/new.py", "content": "x = load_config()\n"}, config=config)
+    result = search_code.invoke({"query": "load_config", "context_lines": 0}, config=config)
+
+    assert "src/new.py:1: x = load_config()" in result
+    # Only the written file was read again
+    assert index.reads == reads + 1
+
+    os.remove(tmp_path / "src" / "config.py")
+    result = search_code.invoke({"query": "load_config"}, config=config)
+    assert "src/config.py" not in result
+
+
+def test_search_code_tool_limits_results(tmp_path):
+    (tmp_path / "many.txt").write_text("needle\n" * 20)
+    config = {"configurable": {"workdir": str(tmp_path)}}
+
+    result = search_code.invoke({"query": "needle", "max_results": 5, "context_lines": 0}, config=config)
+
+    assert result.splitlines()[-1] == "... 15 more matches; narrow the search with path or pattern"
+    assert len(result.splitlines()) == 6
+    assert search_code.invoke({"query": "missing"}, config=config) == "No matches for 'missing' in ."
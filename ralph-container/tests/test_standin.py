@@ -0,0 +1,86 @@
+import json
+import urllib.error
+import urllib.request
+from click.testing import CliRunner
+from langchain_core.messages import HumanMessage
+from langchain_ollama import ChatOllama
+from ralph.cli import cli
+from ralph.standin import StandinServer, StandinSettings, percentile
+
+
+def _post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode()
+
+
+def test_ollama_client_receives_scripted_tool_calls_and_usage():
+    with StandinServer(StandinSettings(steps=1, tokens_per_second=1000)) as server:
+        model = ChatOllama(model="standin", base_url=server.url)
+
+        first = model.invoke([HumanMessage(content="Start.")])
+        chunks = list(model.stream([HumanMessage(content="Start."), first, HumanMessage(content="Go on.")]))
+
+    assert first.tool_calls[0]["name"] == "list_files"
+    assert first.usage_metadata["output_tokens"] > 0
+    assert "step0" in first.content
+    assert len(chunks) > 2
+    streamed = chunks[0]
+    for chunk in chunks[1:]:
+        streamed += chunk
+    assert streamed.tool_calls[0]["name"] == "done"
+    assert [r[1] for r in server.records] == [200, 200]
+
+
+def test_openai_route_serves_recorded_replies_and_injects_errors(tmp_path):
+    recorded = tmp_path / "replies.jsonl"
+    recorded.write_text(
+        json.dumps({"choices": [{"message": {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "read_file", "arguments": "{\"path\": \"a.py\"}"}}]}}]}) + "\n"
+        + json.dumps({"content": "All done.", "tool_calls": []}) + "\n"
+    )
+    with StandinServer(StandinSettings(responses=str(recorded))) as server:
+        url = f"{server.url}/openai/deployments/gpt/chat/completions?api-version=2024-06-01"
+        completion = json.loads(_post(url, {"messages": [{"role": "user", "content": "Hi"}]}))
+        events = _post(url, {"messages": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": ""}], "stream": True,
+                             "stream_options": {"include_usage": True}}).split("\n\n")
+
+    call = completion["choices"][0]["message"]["tool_calls"][0]
+    assert call["function"] == {"name": "read_file", "arguments": "{\"path\": \"a.py\"}"}
+    assert completion["choices"][0]["finish_reason"] == "tool_calls"
+    assert events[-2] == "data: [DONE]"
+    chunks = [json.loads(e[len("data: "):]) for e in events[:-2]]
+    assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"]) == "All done."
+    assert chunks[-1]["usage"]["completion_tokens"] == 2
+
+    with StandinServer(StandinSettings(error_rate=1.0, error_status=429)) as server:
+        try:
+            _post(f"{server.url}/v1/chat/completions", {"messages": []})
+            assert False, "expected an injected error"
+        except urllib.error.HTTPError as e:
+            assert e.code == 429
+            assert e.headers["Retry-After"] == "1"
+    assert server.stats()["error_rate"] == 1.0
+
+
+def test_bench_command_reports_throughput_latency_and_errors(tmp_path):
+    report = tmp_path / "bench.json"
+
+    result = CliRunner().invoke(cli, ["bench", "--loops", "3", "--limit", "6", "--steps", "2", "--latency", "0.01", "--report", str(report)])
+
+    assert result.exit_code == 0, result.output
+    assert "3 done, 0 failed" in result.output
+    assert "request ms" in result.output and "p99" in result.output
+    data = json.loads(report.read_text())
+    assert data["requests"] == 9
+    assert data["iterations"] == 9
+    assert data["request_latency_ms"]["p50"] >= 10
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+# Cold-start budget for importing the CLI, in milliseconds
+BUDGET_MS = float(os.environ.get("RALPH_STARTUP_BUDGET_MS", "500"))
+
+HEAVY_PREFIXES = ("langchain", "langgraph", "langchain_google_genai", "google.genai", "pydantic", "yaml")
+
+
+def _import_profile(code: str) -> dict[str, int]:
+    """Run code in a fresh interpreter with -X importtime and return cumulative microseconds per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = int(cumulative)
+    return modules
+
+
+def _heavy(modules: dict[str, int]) -> list[str]:
+    return sorted(m for m in modules if m.startswith(HEAVY_PREFIXES))
+
+
+def test_trivial_commands_do_not_import_langchain_or_config():
+    for args in (["version"], ["--help"]):
+        modules = _import_profile(f"from ralph.cli import cli; cli({args!r}, standalone_mode=False)")
+        assert "ralph.cli" in modules
+        assert _heavy(modules) == [], f"ralph {' '.join(args)} imported {_heavy(modules)[:5]}"
+
+
+def test_agent_and_chain_modules_do_not_import_provider_sdks():
+    modules = _import_profile("import ralph.agent, ralph.llm, ralph.graph")
+
+    assert not [m for m in modules if m.startswith(("langchain_google_genai", "langchain_openai", "langchain_ollama"))]
+    assert "langgraph.prebuilt" not in modules
+
+
+def test_cli_cold_start_within_budget():
+    # Best of three runs, to keep scheduler noise out of the measurement
+    best = min(_import_profile("import ralph.cli")["ralph.cli"] for _ in range(3))
+
+    assert best / 1000 < BUDGET_MS, f"importing ralph.cli took {best / 1000:.0f} ms (budget {BUDGET_MS:.0f} ms)"
@@ -0,0 +1,128 @@
+import asyncio
+from unittest.mock import patch
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from ralph.config import RalphConfig, LangchainConfig
+from ralph.executor import ToolExecutor
+from ralph.graph import run_loop, arun_loop
+from ralph.streaming import ToolCallTracker
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that streams scripted chunks, one script entry per call."""
+    script: list
+    events: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self.script.pop(0):
+            if isinstance(chunk, str):
+                self.events.append(chunk)
+                continue
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = None
+        for chunk in self._stream(messages, stop, run_manager):
+            message = chunk if message is None else message + chunk
+        return ChatResult(generations=[ChatGeneration(message=message.message)])
+
+
+def _tool_chunk(index: int, args: str, name: str | None = None, id: str | None = None) -> AIMessageChunk:
+    return AIMessageChunk(content="", tool_call_chunks=[{"name": name, "args": args, "id": id, "index": index}])
+
+
+def _script():
+    return [
+        [
+            AIMessageChunk(content="Reading "),
+            AIMessageChunk(content="first."),
+            _tool_chunk(0, '{"path": "a.txt"}', "read_file", "r1"),
+            _tool_chunk(1, '{"path": "b.txt", ', "write_file", "w1"),
+            "stream-continues",
+            _tool_chunk(1, '"content": "new"}'),
+        ],
+        [AIMessageChunk(content="Done."), _tool_chunk(0, "{}", "done", "d1")],
+    ]
+
+
+def _config():
+    return RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake"))
+
+
+def _record_dispatch(events):
+    original = ToolExecutor.dispatch_early
+
+    def dispatch_early(self, call, earlier, config):
+        started = original(self, call, earlier, config)
+        events.append((call["name"], started))
+        return started
+    return dispatch_early
+
+
+def test_tool_call_tracker_reports_calls_when_complete():
+    reported = []
+    tracker = ToolCallTracker(lambda call, earlier: reported.append((call["id"], [c["id"] for c in earlier])))
+
+    message = _tool_chunk(0, '{"path": ', "read_file", "r1")
+    tracker.update(message)
+    message = message + _tool_chunk(0, '"a.txt"}')
+    tracker.update(message)
+    assert reported == []
+
+    message = message + _tool_chunk(1, '{"path": "b.txt"}', "read_file", "r2")
+    tracker.update(message)
+    assert reported == [("r1", [])]
+
+    tracker.finish(message)
+    tracker.finish(message)
+    assert reported == [("r1", []), ("r2", ["r1"])]
+
+
+def test_run_loop_streams_tokens_and_dispatches_reads_early(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "a.txt").write_text("original")
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Read a.txt")
+
+    llm = ScriptedChatModel(script=_script(), events=[])
+    events = llm.events
+    with patch("ralph.agent.llm_model", return_value=llm), \
+            patch.object(ToolExecutor, "dispatch_early", _record_dispatch(events)):
+        report = run_loop(str(instructions), str(workdir), 2, _config())
+
+    output = capsys.readouterr().out
+    assert "Reading first." in output
+    # The read started while the write call was still streaming; the write waited
+    assert events == [("read_file", True), "stream-continues", ("write_file", False), ("done", False)]
+    assert "[TOOL]: original" in output
+    assert (workdir / "b.txt").read_text() == "new"
+    assert report.done
+
+
+def test_arun_loop_streams_events_with_label(tmp_path, capsys):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    (workdir / "a.txt").write_text("original")
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Read a.txt")
+
+    llm = ScriptedChatModel(script=_script(), events=[])
+    report = asyncio.run(arun_loop(str(instructions), str(workdir), 2, _config(), llm=llm))
+
+    output = capsys.readouterr().out
+    assert f"[{workdir}] Reading first." in output
+    assert "[TOOL]: original" in output
+    assert (workdir / "b.txt").read_text() == "new"
+    assert report.done
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from ralph import tracing
+from ralph.agent import run_command
+from ralph.config import RalphConfig, LangchainConfig, TracingConfig
+from ralph.config.tool import ToolBoxConfig
+from ralph.executor import ToolExecutor
+from ralph.graph import arun_loop
+
+
+class FakeSpan:
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.status = None
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_status(self, status):
+        self.status = status
+
+
+class FakeTracer:
+    """Records spans in memory, tracking the current span per context like OpenTelemetry."""
+
+    def __init__(self):
+        import contextvars
+        self.spans = []
+        self.current = contextvars.ContextVar("current", default=None)
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        span = FakeSpan(name, attributes, self.current.get())
+        self.spans.append(span)
+        token = self.current.set(span)
+        try:
+            yield span
+        finally:
+            self.current.reset(token)
+
+    def named(self, prefix):
+        return [span for span in self.spans if span.name.startswith(prefix)]
+
+
+def _install(monkeypatch):
+    tracer = FakeTracer()
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    monkeypatch.setattr(tracing, "_current_span", tracer.current.get)
+    monkeypatch.setattr(tracing, "_error_status", lambda description: ("ERROR", description))
+    return tracer
+
+
+def test_disabled_tracing_records_nothing(monkeypatch, capsys):
+    monkeypatch.setattr(tracing, "_tracer", None)
+    assert tracing.configure_tracing(TracingConfig()) is False
+    with tracing.span("anything", {"a": 1}) as span:
+        assert span is None
+    tracing.set_attributes(span, {"a": 2})
+    tracing.annotate_current({"a": 3})
+
+    # Enabled without the OpenTelemetry SDK: warn once and keep running untraced
+    monkeypatch.setattr(tracing, "_warned", False)
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+    assert tracing.configure_tracing(TracingConfig(enabled=True)) is False
+    assert tracing.configure_tracing(TracingConfig(enabled=True)) is False
+    assert capsys.readouterr().err.count("OpenTelemetry is not available") == 1
+
+
+def test_file_exporter_closes_its_file_on_shutdown(monkeypatch, tmp_path):
+    class ConsoleSpanExporter:
+        def __init__(self, out, formatter):
+            self.out = out
+
+        def shutdown(self):
+            pass
+
+    export = MagicMock(ConsoleSpanExporter=ConsoleSpanExporter)
+    monkeypatch.setitem(sys.modules, "opentelemetry.sdk.trace.export", export)
+    exporter = tracing._exporter(TracingConfig(enabled=True, path=str(tmp_path / "traces" / "spans.jsonl")))
+
+    assert not exporter.out.closed
+    exporter.shutdown()
+    assert exporter.out.closed
+
+
+def test_tool_spans_carry_name_bytes_exit_code_and_errors(monkeypatch, tmp_path):
+    tracer = _install(monkeypatch)
+    executor = ToolExecutor([run_command], ToolBoxConfig())
+    config = {"configurable": {"workdir": str(tmp_path)}}
+
+    executor.run([{"name": "run_command", "args": {"command": "echo hi; exit 3"}, "id": "c1"}], config)
+    executor.run([{"name": "run_command", "args": {}, "id": "c2"}], config)
+
+    ok, failed = tracer.named("execute_tool run_command")
+    assert ok.attributes["gen_ai.tool.name"] == "run_command"
+    assert ok.attributes["gen_ai.tool.call.id"] == "c1"
+    assert ok.attributes["process.exit_code"] == 3
+    assert ok.attributes["ralph.command.timed_out"] is False
+    assert ok.attributes["ralph.tool.output_bytes"] > 0
+    assert ok.status is None
+    assert failed.attributes["error.type"] == "tool_error"
+    assert failed.status[0] == "ERROR"
+
+
+def test_arun_loop_spans_nest_iterations_llm_calls_and_tools(monkeypatch, tmp_path):
+    tracer = _install(monkeypatch)
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    instructions = tmp_path / "instructions.md"
+    instructions.write_text("Finish")
+    usage = {"input_tokens": 120, "output_tokens": 7, "total_tokens": 127}
+
+    async def respond(messages, config):
+        return AIMessage(content="Done.", usage_metadata=usage, tool_calls=[{"name": "done", "args": {}, "id": "d1"}])
+
+    llm = MagicMock()
+    llm.bind_tools.return_value.ainvoke = AsyncMock(side_effect=respond)
+    config = RalphConfig(aiclient=LangchainConfig(model_provider="google_genai", model="gemini-pro", google_api_key="fake", streaming=False))
+    with patch("langchain_google_genai.ChatGoogleGenerativeAI", return_value=llm):
+        report = asyncio.run(arun_loop(str(instructions), str(workdir), 2, config))
+
+    assert report.done
+    [loop] = tracer.named("ralph.loop")
+    [iteration] = tracer.named("ralph.iteration")
+    [chat] = tracer.named("chat gemini-pro")
+    [tool] = tracer.named("execute_tool done")
+    assert iteration.parent is loop and chat.parent is iteration and tool.parent is iteration
+    assert loop.attributes["ralph.done"] is True and loop.attributes["ralph.iterations"] == 1
+    assert loop.attributes["gen_ai.usage.input_tokens"] == 120
+    assert chat.attributes["gen_ai.request.model"] == "gemini-pro"
+    assert chat.attributes["gen_ai.usage.output_tokens"] == 7
+    assert iteration.attributes["ralph.done"] is True
@@ -0,0 +1,76 @@
+import os
+from ralph.agent import list_files
+from ralph.workspace import WorkspaceIndex, parse_gitignore
+
+
+def _make_tree(root):
+    for rel in ["README.md", "src/app.py", "src/util/helpers.py", "src/util/data.json",
+                "build/out.bin", "logs/run.log", "logs/keep.log",
+                ".git/HEAD", "node_modules/pkg/index.js", ".venv/lib/site.py"]:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (root / ".gitignore").write_text("# build output\n/build/\n*.log\n!keep.log\n")
+
+
+def test_index_honors_gitignore_and_default_excludes(tmp_path):
+    _make_tree(tmp_path)
+
+    files = WorkspaceIndex(str(tmp_path)).files()
+
+    assert files == [".gitignore", "README.md", "logs/keep.log", "src/app.py", "src/util/data.json", "src/util/helpers.py"]
+
+
+def test_nested_gitignore_applies_below_its_directory(tmp_path):
+    _make_tree(tmp_path)
+    (tmp_path / "src" / "util" / ".gitignore").write_text("data.json\n")
+    (tmp_path / "data.json").write_text("x")
+
+    files = WorkspaceIndex(str(tmp_path)).files()
+
+    assert "src/util/data.json" not in files
+    assert "data.json" in files
+    assert parse_gitignore("!keep.log\n")[0].negate
+
+
+def test_index_refresh_only_rescans_changed_directories(tmp_path):
+    _make_tree(tmp_path)
+    index = WorkspaceIndex(str(tmp_path))
+    index.files()
+    scans = index.scans
+
+    # Nothing changed: no directory is rescanned
+    index.files()
+    assert index.scans == scans
+
+    # A new file only rescans its own directory
+    (tmp_path / "src" / "new.py").write_text("x")
+    os.utime(tmp_path / "src", ns=(0, 10**18))
+    assert "src/new.py" in index.files()
+    assert index.scans == scans + 1
+
+    # Editing .gitignore rescans the subtree it governs
+    (tmp_path / ".gitignore").write_text("*.json\n")
+    os.utime(tmp_path / ".gitignore", ns=(0, 10**18))
+    files = index.files()
+    assert "src/util/data.json" not in files
+    assert "logs/run.log" in files
+
+
+def test_list_files_depth_pattern_and_pagination(tmp_path):
+    _make_tree(tmp_path)
+    config = {"configurable": {"workdir": str(tmp_path)}}
+
+    assert list_files.invoke({"path": "src", "max_depth": 1}, config=config) == ["app.py"]
+    assert list_files.invoke({"pattern": "*.py"}, config=config) == ["src/app.py", "src/util/helpers.py"]
+    # "**/" also matches files directly under src/; "*" does not descend
+    assert list_files.invoke({"pattern": "src/**/*.py"}, config=config) == ["src/app.py", "src/util/helpers.py"]
+    assert list_files.invoke({"pattern": "src/*"}, config=config) == ["src/app.py"]
+
+    page = list_files.invoke({"limit": 2}, config=config)
+    assert page[:2] == [".gitignore", "README.md"]
+    assert page[2] == "... 4 more files; call list_files again with offset=2"
+    assert list_files.invoke({"offset": 4, "limit": 2}, config=config) == ["src/util/data.json", "src/util/helpers.py"]
+
+    assert "excluded" in list_files.invoke({"path": "node_modules"}, config=config)[0]
+    assert list_files.invoke({"path": "src/app.py"}, config=config) == ["src/app.py"]